@@ -20,7 +20,8 @@ def main():
 
     # Step 2: Extract and export invoices to JSON using the latest logic
     from src.butterfly.rag.pdf_extractor import PDFDataExtractor
-    extractor = PDFDataExtractor()
+    from src.butterfly.rag.extraction_cache import ExtractionCache
+    extractor = PDFDataExtractor(cache=ExtractionCache())
     extractor.export_invoices_to_json(pdf_dir, os.path.join('data', 'invoice_data.json'))
     print("[INFO] Exported structured invoice data to data/invoice_data.json")
 
@@ -0,0 +1,97 @@
+"""
+Chunk count and index size of the recursive vs. the invoice-structured chunker.
+
+Usage:
+    python benchmarks/bench_chunking.py [pdf_directory] [--dim 768]
+
+Every page is chunked by each strategy and indexed in a FAISS store with
+deterministic fake embeddings of the given dimension (nomic-embed-text has 768),
+which is saved to measure its size on disk. Without a directory, sample invoice
+pages with 1 to 200 line items are used. The sample PDF corpus is written by
+benchmarks/make_sample_invoices.py:
+
+    python benchmarks/make_sample_invoices.py /tmp/invoices
+    PYTHONPATH=src python benchmarks/bench_chunking.py /tmp/invoices
+"""
+
+import argparse
+import os
+import tempfile
+
+import fitz
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from butterfly.rag.chunking import CHUNKERS
+
+SAMPLE_PAGE = """INVOICE
+# {number}
+Bill To:
+Annie Zypern
+Ship To:
+75217, Dallas, Texas, United States
+Date: 2012-03-16
+Ship Mode: Same Day
+Balance Due: $8.25
+Item Quantity Rate Amount
+{rows}Subtotal: $8.90
+Discount (20%): $1.78
+Shipping: $1.13
+Total: $8.25
+Notes:
+Thanks for your business!
+Terms:
+Order ID : CA-2012-AZ10750140-40904
+"""
+
+
+def sample_pages():
+    pages = []
+    for number, count in enumerate((1, 3, 10, 30, 60, 100, 200)):
+        rows = ''.join(f"Staples Round Ring Binders model {i} {i % 7 + 1} ${i % 50 + 1}.25 "
+                       f"${(i % 7 + 1) * (i % 50 + 1)}.75\n" for i in range(count))
+        pages.append((f"invoice_{36000 + number}.pdf", SAMPLE_PAGE.format(number=36000 + number, rows=rows)))
+    return pages
+
+
+def load_pages(pdf_directory):
+    pages = []
+    for filename in sorted(os.listdir(pdf_directory)):
+        if filename.endswith('.pdf'):
+            try:
+                with fitz.open(os.path.join(pdf_directory, filename)) as doc:
+                    pages.extend((filename, page.get_text()) for page in doc if page.get_text().strip())
+            except Exception as e:
+                print(f"Skipping {filename}: {e}")
+    return pages
+
+
+def index_size(texts, metadatas, dim):
+    """Bytes on disk of a FAISS store over the chunks."""
+    store = FAISS.from_texts(texts, DeterministicFakeEmbedding(size=dim), metadatas=metadatas)
+    with tempfile.TemporaryDirectory() as directory:
+        store.save_local(directory)
+        return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_directory", nargs="?")
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pdf_directory) if args.pdf_directory else sample_pages()
+    print(f"Pages: {len(pages)}, text: {sum(len(text) for _, text in pages)} chars")
+    print(f"{'chunker':<10} {'chunks':>7} {'embedded chars':>15} {'index bytes':>12}")
+    for name, chunker_class in CHUNKERS.items():
+        chunker = chunker_class()
+        texts, metadatas = [], []
+        for filename, text in pages:
+            for chunk, extra in chunker.chunk_page(text, filename):
+                texts.append(chunk)
+                metadatas.append(dict(extra, source=filename))
+        print(f"{name:<10} {len(texts):>7} {sum(map(len, texts)):>15} {index_size(texts, metadatas, args.dim):>12}")
+
+
+if __name__ == "__main__":
+    main()
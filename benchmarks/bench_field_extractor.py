@@ -0,0 +1,119 @@
+"""
+Microbenchmark: legacy per-field line rescans vs. the single-pass FieldExtractor.
+
+Usage:
+    python benchmarks/bench_field_extractor.py [pdf_directory] [--repeat N]
+
+Without a directory, clean and OCR-noisy sample invoice pages are used, both as
+printed and padded to 500 line items. With a directory every page
+text is checked for identical results before timing.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import fitz
+
+from butterfly.rag.field_extractor import FieldExtractor
+
+# The legacy heuristics live with the parity test that checks FieldExtractor against them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests"))
+from test_field_extractor import legacy_fields  # noqa: E402
+
+SAMPLE_PAGE = """INVOICE
+# 36397
+Bill To:
+Annie Zypern
+Ship To:
+75217, Dallas, Texas, United States
+Date: 2012-03-16
+Ship Mode: Same Day
+Balance Due: $8.25
+Item Quantity Rate Amount
+Staples Round Ring Binders 2 $4.45 $8.90
+Subtotal: $8.90
+Discount (20%): $1.78
+Shipping: $1.13
+Total: $8.25
+Notes:
+Thanks for your business!
+Terms:
+Order ID : CA-2012-AZ10750140-40904
+"""
+
+# Typical Tesseract output for the same invoice: most markers are misread
+NOISY_PAGE = """Sensors INVOICE
+#96397
+te Mar 162012
+Bil To Ship To
+Ship Me: Same Day
+'Annie Zypern
+75217, Dallas, Texas, nite Staten
+Balance Due: $8.25
+tem Quanity Rate Amount
+Staples Round Ring Binders 2 445 $8.90
+Subiota: $8.90
+Discount (20%): $178
+Shipping: s113
+Tota: $825
+'Thanks fr business!
+your ID : (Order CA-202-A210750140-40904
+"""
+
+
+def with_items(page, subtotal_marker, count=500):
+    """Pad a sample page's item table to `count` lines."""
+    head, tail = page.split(subtotal_marker, 1)
+    rows = ''.join(f"Binder model {i} {i % 7 + 1} ${i % 50 + 1}.25 ${(i % 7 + 1) * (i % 50 + 1)}.75\n" for i in range(count))
+    return head + rows + subtotal_marker + tail
+
+
+def load_pages(pdf_directory):
+    pages = []
+    for filename in sorted(os.listdir(pdf_directory)):
+        if filename.endswith('.pdf'):
+            try:
+                with fitz.open(os.path.join(pdf_directory, filename)) as doc:
+                    pages.extend(page.get_text().split('\n') for page in doc)
+            except Exception as e:
+                print(f"Skipping {filename}: {e}")
+    return pages
+
+
+def bench(name, pages, fields, repeat):
+    # Best of five runs, to keep scheduler noise out of the comparison
+    legacy = min(timeit.repeat(lambda: [legacy_fields(lines) for lines in pages], number=repeat, repeat=5))
+    single = min(timeit.repeat(lambda: [fields.extract(lines) for lines in pages], number=repeat, repeat=5))
+    per_page = repeat * len(pages)
+    print(f"{name:<14} {legacy / per_page * 1e6:10.1f} {single / per_page * 1e6:10.1f} {legacy / single:8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_directory", nargs="?")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.pdf_directory:
+        corpus = {"corpus": load_pages(args.pdf_directory)}
+    else:
+        corpus = {
+            "clean": [SAMPLE_PAGE.split('\n')],
+            "ocr-noisy": [NOISY_PAGE.split('\n')],
+            "clean-500": [with_items(SAMPLE_PAGE, "Subtotal").split('\n')],
+            "ocr-noisy-500": [with_items(NOISY_PAGE, "Subiota").split('\n')],
+        }
+    fields = FieldExtractor()
+
+    pages = [lines for group in corpus.values() for lines in group]
+    mismatches = sum(legacy_fields(lines) != fields.extract(lines) for lines in pages)
+    print(f"Pages checked: {len(pages)}, mismatches: {mismatches}")
+    print(f"{'pages':<14} {'legacy us':>10} {'single us':>10} {'speedup':>9}")
+    for name, group in corpus.items():
+        bench(name, group, fields, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
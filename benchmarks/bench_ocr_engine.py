@@ -0,0 +1,98 @@
+"""
+Benchmark: OCR throughput of each engine backend.
+
+Usage:
+    python benchmarks/bench_ocr_engine.py pdf_path [--pages N] [--dpi DPI] [--workers N ...]
+        [--easyocr-batch N ...]
+
+The first N pages are rendered once, binarized like the extractor does, and then
+recognized by each backend that is available: pytesseract as called today (one
+``tesseract`` process per page, model reloaded every time), the C API engine with
+each requested pool size (model loaded once per worker, images passed in memory) and
+EasyOCR on the CPU with each requested number of text crops per forward pass (pages
+detected four at a time). Pages per second and whether the text matches pytesseract
+are reported; EasyOCR segments text differently, so for it the number of words
+found is shown instead.
+"""
+
+import argparse
+import shutil
+import time
+
+import cv2
+import fitz
+import numpy as np
+import pytesseract
+
+from butterfly.core.render import render_page
+from butterfly.ocr.easyocr_engine import EasyOCREngine
+from butterfly.ocr.tesseract_capi import TesseractAPIEngine, load_libtesseract
+
+
+def load_pages(pdf_path, pages, dpi):
+    with fitz.open(pdf_path) as doc:
+        images = [np.asarray(render_page(doc[i], dpi).convert("L")) for i in range(min(pages, len(doc)))]
+    return [cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1] for gray in images]
+
+
+def pytesseract_baseline(images, dpi):
+    return [pytesseract.image_to_string(image, config=f"--dpi {dpi}") for image in images]
+
+
+def report(name, seconds, texts, reference):
+    same = "-" if reference is None else f"{sum(a == b for a, b in zip(texts, reference))}/{len(texts)}"
+    print(f"{name:<22} {seconds:8.2f} {len(texts) / seconds:9.2f} {same:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_path")
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--easyocr-batch", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    images = load_pages(args.pdf_path, args.pages, args.dpi)
+    print(f"{len(images)} pages at {args.dpi} DPI")
+    print(f"{'backend':<22} {'seconds':>8} {'pages/s':>9} {'same text':>9}")
+
+    reference = None
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd):
+        start = time.perf_counter()
+        reference = pytesseract_baseline(images, args.dpi)
+        report("pytesseract", time.perf_counter() - start, reference, None)
+    else:
+        print("pytesseract            skipped (tesseract executable not found)")
+
+    if load_libtesseract() is None:
+        print("capi                   skipped (libtesseract not found; set TESSERACT_LIBRARY)")
+    else:
+        for workers in args.workers:
+            with TesseractAPIEngine(workers) as engine:
+                # The first call per worker loads the model; time the steady state, like a daemon
+                list(engine.map(images[:workers], dpi=args.dpi))
+                start = time.perf_counter()
+                texts = list(engine.map(images, dpi=args.dpi))
+                report(f"capi x{workers}", time.perf_counter() - start, texts, reference)
+
+    reader = None
+    for batch_size in args.easyocr_batch:
+        try:
+            engine = EasyOCREngine(batch_size=batch_size, reader=reader)
+        except ImportError:
+            print("easyocr                skipped (easyocr not installed)")
+            return
+        # The models are loaded once and shared by every batch size
+        reader = engine.reader
+        with engine:
+            list(engine.map(images[:1]))
+            start = time.perf_counter()
+            words = sum(len(page) for page in engine.map(images, "words"))
+            seconds = time.perf_counter() - start
+            name, found = f"easyocr batch {batch_size}", f"{words} words"
+            print(f"{name:<22} {seconds:8.2f} {len(images) / seconds:9.2f} {found:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: the old RGB -> PIL -> NumPy -> BGR -> gray render chain vs. render_gray.
+
+Usage:
+    python benchmarks/bench_render.py pdf_path [--pages N] [--dpi DPI] [--repeat N]
+
+For the first N pages both paths produce the grayscale array OCR consumes; the
+time per page and the bytes of frame buffers allocated per page are reported, and
+the two outputs are compared.
+"""
+
+import argparse
+import timeit
+
+import cv2
+import fitz
+import numpy as np
+from PIL import Image
+
+from butterfly.core.render import render_gray
+
+
+def legacy_gray(page, dpi):
+    """The chain every OCR path used: four full-frame copies after rasterizing in RGB."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    return cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_path")
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with fitz.open(args.pdf_path) as doc:
+        pages = [doc[i] for i in range(min(args.pages, len(doc)))]
+        pixels = sum(render_gray(page, args.dpi).size for page in pages) / len(pages)
+        # RGB pixmap, pix.samples bytes, PIL image, np.array, BGR array, gray array
+        buffers = {"legacy": 3 * 5 + 1, "render_gray": 1}
+        print(f"{len(pages)} pages at {args.dpi} DPI, {pixels / 1e6:.1f} Mpx per page")
+        print(f"{'path':<12} {'ms/page':>9} {'MB/page':>9}")
+        for name, render in (("legacy", legacy_gray), ("render_gray", render_gray)):
+            seconds = min(timeit.repeat(lambda: [render(page, args.dpi) for page in pages],
+                                        number=1, repeat=args.repeat)) / len(pages)
+            print(f"{name:<12} {seconds * 1000:9.1f} {buffers[name] * pixels / 1e6:9.1f}")
+        diff = max(int(np.abs(legacy_gray(page, args.dpi).astype(int) - render_gray(page, args.dpi)).max())
+                   for page in pages)
+        print(f"max pixel difference: {diff}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: the legacy line-based item parser vs. the word-box extract_table_items.
+
+Usage:
+    python benchmarks/bench_table_extractor.py [--rows N] [--repeat N]
+
+Two synthetic invoice pages with N line items are generated in memory: one laid
+out as a real table (right-aligned number columns, thousands separators and
+wrapped item names) and one as reflowed text with one item per line. For each
+page the time to parse the items from an already parsed text page is reported,
+together with how many items each parser got exactly right.
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+import fitz
+
+from butterfly.core.table_extractor import extract_table_items
+
+# The legacy line parser lives with the parity test that keeps it as a reference
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests"))
+from test_field_extractor import legacy_line_items  # noqa: E402
+
+FONT_SIZE = 6
+ROW_HEIGHT = 8
+
+
+def right_aligned(page, x, y, text):
+    page.insert_text((x - fitz.get_text_length(text, fontsize=FONT_SIZE), y), text, fontsize=FONT_SIZE)
+
+
+def make_pages(rows):
+    """Return (aligned page, reflowed page, expected items)."""
+    rng = random.Random(0)
+    expected = []
+    for i in range(rows):
+        quantity, rate = rng.randint(1, 20), rng.randint(100, 250000) / 100
+        expected.append({"item": f"Avery Durable Binder {i}", "quantity": float(quantity),
+                         "unit_price": rate, "amount": round(quantity * rate, 2)})
+
+    height = 100 + ROW_HEIGHT * (rows + rows // 25 + 2)
+    doc = fitz.open()
+    aligned = doc.new_page(height=height)
+    aligned.insert_text((40, 40), "Item", fontsize=FONT_SIZE)
+    for x, header in [(400, "Quantity"), (480, "Rate"), (560, "Amount")]:
+        right_aligned(aligned, x, 40, header)
+    y = 40
+    for i, item in enumerate(expected):
+        y += ROW_HEIGHT
+        aligned.insert_text((40, y), item["item"], fontsize=FONT_SIZE)
+        for x, value in [(400, f"{item['quantity']:.0f}"), (480, f"${item['unit_price']:,.2f}"),
+                         (560, f"${item['amount']:,.2f}")]:
+            right_aligned(aligned, x, y, value)
+        if i % 25 == 0:
+            y += ROW_HEIGHT
+            aligned.insert_text((40, y), "with extended warranty", fontsize=FONT_SIZE)
+    aligned.insert_text((40, y + ROW_HEIGHT), "Subtotal: $1.00", fontsize=FONT_SIZE)
+    aligned_expected = [dict(item, item=item["item"] + (" with extended warranty" if i % 25 == 0 else ""))
+                        for i, item in enumerate(expected)]
+
+    reflowed = doc.new_page(height=height)
+    lines = ["Item Quantity Rate Amount"]
+    lines += [f"{item['item']} {item['quantity']:.0f} ${item['unit_price']:.2f} ${item['amount']:.2f}"
+              for item in expected]
+    lines.append("Subtotal: $1.00")
+    for i, line in enumerate(lines):
+        reflowed.insert_text((40, 40 + ROW_HEIGHT * i), line, fontsize=FONT_SIZE)
+    # Page objects go stale once another page is added, so hand out fresh ones
+    return doc, [(doc[0], aligned_expected), (doc[1], expected)]
+
+
+def correct(items, expected):
+    return sum(a == b for a, b in zip(items or [], expected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    doc, pages = make_pages(args.rows)
+    print(f"{'page':<10} {'parser':<7} {'ms/page':>9} {'correct':>9}")
+    for name, (page, expected) in zip(("aligned", "reflowed"), pages):
+        textpage = page.get_textpage()
+        parsers = {
+            "lines": lambda: legacy_line_items(page.get_text("text", textpage=textpage).split('\n')),
+            "words": lambda: extract_table_items(page.get_text("words", textpage=textpage)),
+        }
+        for parser_name, parse in parsers.items():
+            # Best of five runs, to keep scheduler noise out of the comparison
+            seconds = min(timeit.repeat(parse, number=args.repeat, repeat=5)) / args.repeat
+            print(f"{name:<10} {parser_name:<7} {seconds * 1000:9.2f} {correct(parse(), expected):>5}/{len(expected)}")
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
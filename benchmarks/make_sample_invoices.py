@@ -0,0 +1,56 @@
+"""
+Write the sample invoice corpus the benchmarks' pdf_directory figures are measured on.
+
+Usage:
+    python benchmarks/make_sample_invoices.py output_directory
+
+Eight text-layer invoices named invoice_<customer>_<number>.pdf, one of them 40
+pages long (47 pages in total), each page with five line items, plus one file that
+is not a PDF, so the error handling of directory runs is exercised too. The corpus
+is generated from a fixed seed and is the same on every run.
+"""
+
+import argparse
+import os
+import random
+
+import fitz
+
+CUSTOMERS = ["Aaron Hawkins", "Annie Zypern", "Aaron Bergman", "Bob Ray"]
+INVOICES = 8
+LONG_INVOICE = 3  # index of the invoice that repeats its page
+LONG_INVOICE_PAGES = 40
+
+
+def page_lines(number, customer, index):
+    lines = ["INVOICE", f"# {number}", "Bill To:", customer, "Ship To:", "Dallas, Texas",
+             f"Date: 2012-03-{10 + index}", "Ship Mode: Same Day", "Item Quantity Rate Amount"]
+    for i in range(5):
+        lines.append(f"Staples Binder {i} {i + 1} ${10 + i}.50 ${(i + 1) * (10 + i) + 0.5:.2f}")
+    lines += ["Subtotal: $100.00", "Discount (20%): $20.00", "Shipping: $5.00", f"Total: ${85 + index}.25",
+              "Notes:", "Thanks for your business!"]
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output_directory")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_directory, exist_ok=True)
+    rng = random.Random(1)
+    for index in range(INVOICES):
+        customer, number = rng.choice(CUSTOMERS), 36000 + index
+        doc = fitz.open()
+        for _ in range(LONG_INVOICE_PAGES if index == LONG_INVOICE else 1):
+            page = doc.new_page()
+            for row, line in enumerate(page_lines(number, customer, index)):
+                page.insert_text((72, 72 + 14 * row), line)
+        doc.save(os.path.join(args.output_directory, f"invoice_{customer.replace(' ', '_')}_{number}.pdf"))
+        doc.close()
+    with open(os.path.join(args.output_directory, "invoice_broken_1.pdf"), "wb") as f:
+        f.write(b"not a pdf")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import sys
 import os
 from PIL import Image
-import pytesseract
 from src.butterfly.visualization.ocr_visualizer import OCRVisualizer
+from src.butterfly.core.render import iter_gray_pages
+from src.butterfly.ocr.engine import get_default_engine
 try:
     import fitz  # PyMuPDF
 except ImportError:
@@ -10,22 +11,15 @@ except ImportError:
     sys.exit(1)
 
 def pdf_to_images(pdf_path):
-    doc = fitz.open(pdf_path)
-    images = []
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        pix = page.get_pixmap()
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        images.append(img)
-    return images
+    """Yield one grayscale page array at a time (72 DPI, PyMuPDF's default) so long PDFs stay cheap."""
+    for _, img in iter_gray_pages(pdf_path, dpi=72, prefetch=1):
+        yield img
 
 def extract_ocr_data(img):
-    data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
     text_regions = []
-    for i in range(len(data['text'])):
-        if int(data['conf'][i]) > 0 and data['text'][i].strip():
-            (x, y, w, h) = (data['left'][i], data['top'][i], data['width'][i], data['height'][i])
-            text_regions.append(((x, y, x + w, y + h), data['text'][i]))
+    for word in get_default_engine().image_to_words(img, min_confidence=0):
+        (x, y, w, h) = (word['bbox']['x'], word['bbox']['y'], word['bbox']['width'], word['bbox']['height'])
+        text_regions.append(((x, y, x + w, y + h), word['text']))
     return text_regions
 
 def main():
@@ -36,18 +30,15 @@ def main():
     if not os.path.exists(pdf_path):
         print(f"File not found: {pdf_path}")
         sys.exit(1)
-    images = pdf_to_images(pdf_path)
     output_dir = "ocr_visualization_output"
     os.makedirs(output_dir, exist_ok=True)
     visualizer = OCRVisualizer()
-    for i, img in enumerate(images):
+    for i, img in enumerate(pdf_to_images(pdf_path)):
         text_regions = extract_ocr_data(img)
         print(f"\n--- Page {i+1} OCR Text ---")
         print(' '.join([t[1] for t in text_regions]))
         out_path = os.path.join(output_dir, f"page_{i+1}_ocr.png")
-        import numpy as np
-        img_np = np.array(img)
-        visualizer.draw_ocr_results(img_np, text_regions, output_path=out_path)
+        visualizer.draw_ocr_results(img, text_regions, output_path=out_path)
         print(f"[Saved visualization to {out_path}]")
 
 if __name__ == "__main__":
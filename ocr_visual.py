@@ -2,9 +2,10 @@ import sys
 import os
 import json
 from PIL import Image
-import pytesseract
 import numpy as np
 from src.butterfly.visualization.ocr_visualizer import OCRVisualizer
+from src.butterfly.core.render import iter_gray_pages
+from src.butterfly.ocr.engine import get_default_engine
 
 try:
     import fitz  # PyMuPDF
@@ -21,26 +22,19 @@ except ImportError:
     print("[Warning] pymongo not installed. OCR results will not be saved to MongoDB.")
 
 def pdf_to_images(pdf_path):
-    doc = fitz.open(pdf_path)
-    images = []
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        pix = page.get_pixmap()
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        images.append(img)
-    return images
+    """Yield one grayscale page array at a time (72 DPI, PyMuPDF's default) so long PDFs stay cheap."""
+    for _, img in iter_gray_pages(pdf_path, dpi=72, prefetch=1):
+        yield img
 
 def extract_ocr_data(img):
-    data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
     text_regions = []
-    for i in range(len(data['text'])):
-        if int(data['conf'][i]) > 0 and data['text'][i].strip():
-            (x, y, w, h) = (data['left'][i], data['top'][i], data['width'][i], data['height'][i])
-            text_regions.append({
-                "bbox": [x, y, x + w, y + h],
-                "text": data['text'][i],
-                "conf": int(data['conf'][i])
-            })
+    for word in get_default_engine().image_to_words(img, min_confidence=0):
+        (x, y, w, h) = (word['bbox']['x'], word['bbox']['y'], word['bbox']['width'], word['bbox']['height'])
+        text_regions.append({
+            "bbox": [x, y, x + w, y + h],
+            "text": word['text'],
+            "conf": round(word['confidence'] * 100)
+        })
     return text_regions
 
 def main():
@@ -51,7 +45,6 @@ def main():
     if not os.path.exists(pdf_path):
         print(f"File not found: {pdf_path}")
         sys.exit(1)
-    images = pdf_to_images(pdf_path)
     output_dir = "ocr_visualization_output"
     os.makedirs(output_dir, exist_ok=True)
     visualizer = OCRVisualizer()
@@ -59,14 +52,13 @@ def main():
         "pdf_file": pdf_path,
         "pages": []
     }
-    for i, img in enumerate(images):
+    for i, img in enumerate(pdf_to_images(pdf_path)):
         text_regions = extract_ocr_data(img)
         # Sort regions top-to-bottom, then left-to-right
         text_regions = sorted(text_regions, key=lambda r: (r['bbox'][1], r['bbox'][0]))
         page_text = ' '.join([region['text'] for region in text_regions])
-        img_np = np.array(img)
         out_path = os.path.join(output_dir, f"page_{i+1}_ocr.png")
-        visualizer.draw_ocr_results(img_np, [(tuple(region['bbox']), region['text']) for region in text_regions], output_path=out_path)
+        visualizer.draw_ocr_results(img, [(tuple(region['bbox']), region['text']) for region in text_regions], output_path=out_path)
         print(f"[Saved visualization to {out_path}]")
         ocr_results["pages"].append({
             "page_number": i+1,
@@ -0,0 +1,209 @@
+"""
+Compact columnar storage for OCR word boxes.
+
+Instead of one JSON object per word, the words of many images are stored as a few
+flat arrays (struct of arrays) in one uncompressed ``.npz`` file:
+
+- ``text``: UTF-8 bytes of all words, back to back (uint8)
+- ``text_offsets``: start of each word in ``text``, plus the end (int64, words + 1)
+- ``bbox``: x, y, width, height of each word (int16, or int32 for very large images)
+- ``confidence``: confidence of each word, 0-1 (float16)
+- ``image_offsets``: index of each image's first word, plus the end (int64, images + 1)
+- ``image_names``: file name of each image
+
+Because the archive is not compressed, :func:`load_columns` can memory-map every
+array, so opening millions of word boxes costs no parsing and reads pages lazily.
+"""
+
+import os
+import struct
+import zipfile
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from ..ocr.engine import OCRWord
+
+COLUMNS_FILENAME = "ocr_results.npz"
+
+# Size of a zip local file header before its variable-length name and extra fields
+_LOCAL_HEADER_SIZE = 30
+
+_ARRAY_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+def pack_words(words: Sequence[OCRWord]) -> Dict[str, np.ndarray]:
+    """
+    Convert the words of one image to columns.
+
+    Args:
+        words: Words in the shared schema (see OCRWord)
+
+    Returns:
+        Dictionary with the ``text``, ``text_offsets``, ``bbox`` and ``confidence`` arrays
+    """
+    encoded = [word["text"].encode("utf-8") for word in words]
+    offsets = np.zeros(len(words) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=offsets[1:])
+    bbox = np.array([[w["bbox"]["x"], w["bbox"]["y"], w["bbox"]["width"], w["bbox"]["height"]] for w in words],
+                    dtype=np.int64).reshape(-1, 4)
+    return {
+        "text": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "text_offsets": offsets,
+        "bbox": bbox,
+        "confidence": np.array([w["confidence"] for w in words], dtype=np.float16),
+    }
+
+
+def save_columns(path: str, image_names: Sequence[str], packed: Sequence[Mapping[str, np.ndarray]]) -> None:
+    """
+    Write the packed words of several images to one ``.npz`` file.
+
+    The file is written next to its destination and renamed into place, so readers
+    never see a partial file.
+
+    Args:
+        path: Destination file
+        image_names: Name of each image
+        packed: pack_words output of each image, in the same order
+    """
+    counts = [len(columns["confidence"]) for columns in packed]
+    image_offsets = np.zeros(len(packed) + 1, dtype=np.int64)
+    np.cumsum(counts, out=image_offsets[1:])
+    text = np.concatenate([columns["text"] for columns in packed] or [np.zeros(0, np.uint8)])
+    # Each image's offsets start at 0; shift them by the text length of the images before it
+    text_starts = np.cumsum([0] + [len(columns["text"]) for columns in packed[:-1]])
+    text_offsets = np.concatenate(
+        [columns["text_offsets"][:-1] + start for columns, start in zip(packed, text_starts)] + [[len(text)]]
+    ).astype(np.int64)
+    bbox = np.concatenate([columns["bbox"] for columns in packed] or [np.zeros((0, 4), np.int64)])
+    bbox_type = np.int16 if bbox.size == 0 or (bbox.min() >= -2**15 and bbox.max() < 2**15) else np.int32
+    arrays = {
+        "text": text,
+        "text_offsets": text_offsets,
+        "bbox": bbox.astype(bbox_type),
+        "confidence": np.concatenate([columns["confidence"] for columns in packed] or [np.zeros(0, np.float16)]),
+        "image_offsets": image_offsets,
+        "image_names": np.array(list(image_names), dtype=np.str_),
+    }
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        # Uncompressed, so that load_columns can memory-map the arrays
+        np.savez(f, **arrays)
+    os.replace(temp_path, path)
+
+
+def _memmap_npz(path: str) -> Dict[str, np.ndarray]:
+    """Memory-map every array of an uncompressed ``.npz`` file."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed and cannot be memory-mapped; load it with mmap=False")
+            f.seek(info.header_offset)
+            name_length, extra_length = struct.unpack("<HH", f.read(_LOCAL_HEADER_SIZE)[26:30])
+            f.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            shape, fortran_order, dtype = _ARRAY_HEADER_READERS[version](f)
+            name = info.filename[:-len(".npy")]
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                         order="F" if fortran_order else "C")
+    return arrays
+
+
+class OCRColumns:
+    """
+    Read access to words stored by save_columns.
+    """
+
+    def __init__(self, arrays: Mapping[str, np.ndarray]):
+        """
+        Wrap loaded (or memory-mapped) column arrays.
+
+        Args:
+            arrays: The arrays described in the module docstring
+        """
+        self.text = arrays["text"]
+        self.text_offsets = arrays["text_offsets"]
+        self.bbox = arrays["bbox"]
+        self.confidence = arrays["confidence"]
+        self.image_offsets = arrays["image_offsets"]
+        self.image_names = [str(name) for name in arrays["image_names"]]
+        self._index = {name: i for i, name in enumerate(self.image_names)}
+
+    def __len__(self) -> int:
+        return len(self.image_names)
+
+    @property
+    def word_count(self) -> int:
+        """Number of words over all images."""
+        return len(self.confidence)
+
+    def word_range(self, image: str) -> slice:
+        """
+        Rows of an image's words in the word-level arrays.
+
+        Args:
+            image: Image file name
+
+        Returns:
+            Slice into ``bbox``, ``confidence`` and ``text_offsets``
+        """
+        i = self._index[image]
+        return slice(int(self.image_offsets[i]), int(self.image_offsets[i + 1]))
+
+    def texts(self, image: str) -> List[str]:
+        """
+        Texts of an image's words.
+
+        Args:
+            image: Image file name
+
+        Returns:
+            One string per word
+        """
+        rows = self.word_range(image)
+        offsets = self.text_offsets[rows.start:rows.stop + 1]
+        data = bytes(self.text[offsets[0]:offsets[-1]])
+        start = int(offsets[0])
+        return [data[a - start:b - start].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+    def words(self, image: str) -> List[OCRWord]:
+        """
+        Words of an image in the shared schema, as process_images writes them to JSON.
+
+        Args:
+            image: Image file name
+
+        Returns:
+            List of words with text, bbox and confidence
+        """
+        rows = self.word_range(image)
+        boxes = self.bbox[rows].tolist()
+        # float16 holds about three significant digits; rounding restores Tesseract's whole percents
+        confidences = np.round(self.confidence[rows].astype(np.float64), 3).tolist()
+        return [{"text": text, "bbox": {"x": x, "y": y, "width": width, "height": height}, "confidence": confidence}
+                for text, (x, y, width, height), confidence in zip(self.texts(image), boxes, confidences)]
+
+
+def load_columns(path: str, mmap: bool = True) -> OCRColumns:
+    """
+    Open a file written by save_columns.
+
+    Args:
+        path: Path of the ``.npz`` file
+        mmap: Memory-map the arrays instead of reading them into memory
+
+    Returns:
+        OCRColumns over the file's arrays
+    """
+    if mmap:
+        return OCRColumns(_memmap_npz(path))
+    with np.load(path) as npz:
+        return OCRColumns({name: npz[name] for name in npz.files})
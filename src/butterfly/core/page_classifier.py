@@ -0,0 +1,152 @@
+"""
+Cheap per-page routing between text-layer extraction, full-page OCR and region OCR.
+
+Regions worth OCR'ing on a page with a text layer are images and filled vector paths
+(e.g. a stamp or a total converted to outlines) that no text block overlaps; their OCR
+text is merged back with the text blocks in reading order (see merge_in_reading_order).
+"""
+
+import time
+from typing import Any, Dict, List, Tuple
+
+import fitz
+
+# Routes a page can take
+ROUTE_TEXT = "text"      # the native text layer is complete
+ROUTE_OCR = "ocr"        # scanned page: OCR the whole page
+ROUTE_HYBRID = "hybrid"  # text layer plus images or drawings that carry no text: OCR only those regions
+
+# Text-free shapes closer than this (in points) are OCR'd as one region
+REGION_GAP = 6.0
+
+Rect = Tuple[float, float, float, float]
+
+
+def _area(rect: Rect) -> float:
+    return max(0.0, rect[2] - rect[0]) * max(0.0, rect[3] - rect[1])
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _cluster(rects: List[Rect], gap: float = REGION_GAP) -> List[Rect]:
+    """Merge rectangles that overlap or lie within ``gap`` of each other into their bounding boxes."""
+    clusters: List[List[float]] = []
+    for rect in sorted(rects, key=lambda r: r[1]):
+        grown = (rect[0] - gap, rect[1] - gap, rect[2] + gap, rect[3] + gap)
+        merged = list(rect)
+        for cluster in [c for c in clusters if _intersects(grown, c)]:
+            clusters.remove(cluster)
+            merged = [min(merged[0], cluster[0]), min(merged[1], cluster[1]),
+                      max(merged[2], cluster[2]), max(merged[3], cluster[3])]
+        clusters.append(merged)
+    # A merge can make a cluster reach one it was checked against earlier
+    if len(clusters) < len(rects):
+        return _cluster([tuple(c) for c in clusters], gap)
+    return [tuple(c) for c in clusters]
+
+
+def merge_in_reading_order(blocks: List[Tuple[float, float, float, float, str]]) -> str:
+    """
+    Join text blocks (native or OCR'd) top to bottom, left to right.
+
+    Blocks that overlap vertically by at least half the shorter one's height form a row
+    and are read left to right.
+
+    Args:
+        blocks: ``(x0, y0, x1, y1, text)`` tuples
+
+    Returns:
+        Page text with one block per paragraph, newline-terminated
+    """
+    rows: List[List[Tuple[float, float, float, float, str]]] = []
+    for block in sorted(blocks, key=lambda b: (b[1], b[0])):
+        if rows:
+            top, bottom = min(b[1] for b in rows[-1]), max(b[3] for b in rows[-1])
+            overlap = min(bottom, block[3]) - max(top, block[1])
+            if overlap >= 0.5 * min(bottom - top, block[3] - block[1]):
+                rows[-1].append(block)
+                continue
+        rows.append([block])
+    texts = [b[4].strip() for row in rows for b in sorted(row, key=lambda b: b[0])]
+    return "".join(t + "\n" for t in texts if t)
+
+
+def classify_page(
+    page: fitz.Page,
+    min_text_chars: int = 50,
+    scan_coverage: float = 0.6,
+    min_region_coverage: float = 0.02,
+) -> Dict[str, Any]:
+    """
+    Decide how a page should be extracted from its text-block and image-coverage stats.
+
+    The text layer is parsed exactly once; the returned ``text`` and ``words`` are what
+    ``page.get_text()`` and ``page.get_text("words")`` would give, so callers never need
+    to extract them again.
+
+    Args:
+        page: PyMuPDF page
+        min_text_chars: Pages with less native text than this are treated as scans
+        scan_coverage: Fraction of the page covered by images above which the page is
+            considered scanned unless the text layer actually covers those images
+        min_region_coverage: Smallest text-free region (as a fraction of the page) worth
+            OCR'ing on an otherwise digital page; on pages with less than min_text_chars
+            of text every region is OCR'd
+
+    Returns:
+        Dictionary with ``route``, ``text``, ``words``, ``blocks`` (text blocks as
+        ``(x0, y0, x1, y1, text)``), ``ocr_regions`` (rects to OCR for hybrid pages) and
+        the stats and time the decision was based on
+    """
+    start = time.perf_counter()
+    textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+    text = page.get_text("text", textpage=textpage)
+    words = page.get_text("words", textpage=textpage)
+    blocks = [b for b in page.get_text("blocks", textpage=textpage) if b[6] == 0]
+    page_rect = tuple(page.rect)
+    page_area = _area(page_rect) or 1.0
+
+    images: List[Rect] = []
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page.rect
+        if not bbox.is_empty:
+            images.append(tuple(bbox))
+
+    text_chars = len(text.strip())
+    image_coverage = min(1.0, sum(_area(r) for r in images) / page_area)
+    text_coverage = min(1.0, sum(_area(b[:4]) for b in blocks) / page_area)
+    # Text drawn over an image (e.g. an invisible OCR layer) means the image needs no OCR
+    bare_images = [r for r in images if not any(_intersects(r, b[:4]) for b in blocks)]
+    image_text_chars = sum(len(b[4].strip()) for b in blocks if any(_intersects(r, b[:4]) for r in images))
+    # Filled vector paths away from any text: outlined glyphs, logos, stamps
+    paths = [tuple(fitz.Rect(rect) & page.rect) for kind, rect in page.get_bboxlog() if kind == "fill-path"]
+    bare_paths = [r for r in paths if _area(r) > 0 and not any(_intersects(r, b[:4]) for b in blocks)]
+
+    regions = _cluster(bare_images + bare_paths)
+    if text_chars >= min_text_chars:
+        regions = [r for r in regions if _area(r) / page_area >= min_region_coverage]
+
+    if images and image_coverage >= scan_coverage and image_text_chars < min_text_chars:
+        # Scanned page, possibly with a short digital stamp or header outside the scan
+        route = ROUTE_OCR
+    elif regions:
+        route = ROUTE_HYBRID
+    else:
+        # Without anything to OCR, only an empty text layer (e.g. a blank scan) is worth a full pass
+        route = ROUTE_TEXT if text_chars else ROUTE_OCR
+
+    return {
+        "route": route,
+        "text": text,
+        "words": words,
+        "blocks": [tuple(b[:5]) for b in blocks],
+        "ocr_regions": regions if route == ROUTE_HYBRID else [],
+        "text_chars": text_chars,
+        "text_blocks": len(blocks),
+        "text_coverage": round(text_coverage, 4),
+        "image_count": len(images),
+        "image_coverage": round(image_coverage, 4),
+        "classify_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
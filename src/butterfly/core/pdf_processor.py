@@ -1,8 +1,7 @@
 import os
 import fitz
 from pathlib import Path
-import easyocr
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterator, Optional, Any, Tuple, Union
 import json
 from tqdm import tqdm
 from PIL import Image
@@ -10,103 +9,203 @@ import io
 import cv2
 import numpy as np
 import pytesseract
+from .render import iter_gray_pages, iter_page_images, render_gray
+from .resolution import DEFAULT_MIN_DPI, choose_dpi
+from .table_extractor import extract_table_items, words_from_ocr_results
+from .preprocess import DEFAULT_MIN_CONFIDENCE, Rerender, denoise, ocr_data, to_gray
+from .pipeline import OCRPipeline
+from .ocr_columns import COLUMNS_FILENAME, pack_words, save_columns
+from ..ocr.engine import BACKENDS, OCREngine, get_default_engine, get_engine, words_from_data
+from ..utils.parallel import imap_ordered, resolve_workers
+
+# Words OCR'd with this confidence (0-100) or less are dropped from the results
+MIN_WORD_CONFIDENCE = 60
+
+# Assume uniform block of text
+OCR_CONFIG = '--psm 6'
+
+# process_images output: a JSON file per image, or one columnar .npz file per directory
+OUTPUT_FORMATS = ("json", "npz")
 
 class PDFProcessor:
-    def __init__(self):
-        """Initialize the PDF processor."""
-        # Set Tesseract path for macOS
+    def __init__(self, resolution_dpi: int = 300, ocr_engine: Union[OCREngine, str, None] = None,
+                 min_confidence: float = DEFAULT_MIN_CONFIDENCE, min_dpi: Optional[int] = DEFAULT_MIN_DPI):
+        """
+        Initialize the PDF processor.
+        
+        Args:
+            resolution_dpi: Render resolution (the highest one when adapting it per page)
+            ocr_engine: Engine used for OCR, or the name of a backend whose shared engine
+                to use ("capi", "pytesseract" or "easyocr"; default: the process-wide
+                default engine)
+            min_confidence: Mean Tesseract confidence (0-100) below which pages are
+                re-rendered at resolution_dpi and text lines re-OCR'd after denoising
+            min_dpi: Lowest resolution ocr_pdf may choose for pages with large print
+                (None: always render at resolution_dpi)
+        """
+        self.resolution_dpi = resolution_dpi
+        self.zoom = resolution_dpi / 72  # Default PDF resolution is 72 DPI
+        self.min_dpi = min_dpi
+        # Set Tesseract path for macOS (used when OCR falls back to the executable)
         pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
+        self._ocr_engine = ocr_engine
+        self.min_confidence = min_confidence
+    
+    @property
+    def ocr_engine(self) -> OCREngine:
+        """OCR engine, created on first use."""
+        if self._ocr_engine is None:
+            self._ocr_engine = get_default_engine()
+        elif isinstance(self._ocr_engine, str):
+            self._ocr_engine = get_engine(self._ocr_engine)
+        return self._ocr_engine
+    
+    @property
+    def reader(self) -> OCREngine:
+        """Alias of ocr_engine."""
+        return self.ocr_engine
     
     def pdf_to_images(self, pdf_path: str) -> List[Image.Image]:
         """
         Convert a PDF file to a list of PIL Images.
         
+        This holds every page in memory at once; prefer iter_page_images for long documents.
+        
         Args:
             pdf_path: Path to the PDF file
             
         Returns:
             List of PIL Images, one for each page
         """
-        images = []
-        doc = fitz.open(pdf_path)
+        return [img for _, img in self.iter_page_images(pdf_path)]
+    
+    def iter_page_images(self, pdf_path: str, prefetch: int = 0) -> Iterator[Tuple[int, Image.Image]]:
+        """
+        Render a PDF one page at a time at resolution_dpi.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            prefetch: Number of pages to render ahead in a background thread
+            
+        Yields:
+            Zero-based page number and PIL Image of the page
+        """
+        return iter_page_images(pdf_path, dpi=self.resolution_dpi, prefetch=prefetch)
+    
+    def iter_gray_pages(self, pdf_path: str, prefetch: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Render a PDF one page at a time at resolution_dpi straight to grayscale arrays.
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            pix = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))  # 300 DPI
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            images.append(img)
+        This skips the RGB image and color conversions; the arrays can be passed to
+        ocr_page / perform_ocr directly.
         
-        doc.close()
-        return images
+        Args:
+            pdf_path: Path to the PDF file
+            prefetch: Number of pages to render ahead in a background thread
+            
+        Yields:
+            Zero-based page number and the page as a 2D uint8 array
+        """
+        return iter_gray_pages(pdf_path, dpi=self.resolution_dpi, prefetch=prefetch)
     
-    def preprocess_image(self, image: Image.Image) -> np.ndarray:
+    def preprocess_image(self, image: Union[Image.Image, np.ndarray]) -> np.ndarray:
         """
-        Preprocess image for better OCR results.
+        Apply the full (expensive) preprocessing tier to an image.
+        
+        OCR no longer runs this on every page; see ocr_page.
         
         Args:
-            image: PIL Image to preprocess
+            image: PIL Image or grayscale array to preprocess
             
         Returns:
             Preprocessed image as numpy array
         """
-        # Convert to numpy array
-        img = np.array(image)
+        # Adaptive threshold, non-local-means denoising and sharpening
+        return denoise(to_gray(image))
+    
+    def ocr_page(self, image: Union[Image.Image, np.ndarray], dpi: Optional[int] = None,
+                 rerender: Optional[Rerender] = None) -> Dict[str, Any]:
+        """
+        Perform tiered OCR on an image.
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        The image is OCR'd after a cheap Otsu binarization; only lines whose confidence
+        is below min_confidence are denoised and OCR'd again (the whole page if most of
+        it is uncertain).
         
-        # Apply adaptive thresholding
-        thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
+        Args:
+            image: PIL Image or grayscale array (see iter_gray_pages) to process
+            dpi: Resolution the image was rendered at, if known
+            rerender: Returns a higher-resolution (image, dpi) to try when the page
+                scores low; boxes are then in that render's pixels
+            
+        Returns:
+            Dictionary with the OCR "results" (as returned by perform_ocr) and
+            "preprocessing" statistics: tier, confidence, regions, dpi and ms
+        """
+        tiered = ocr_data(self.ocr_engine, image, self.min_confidence, config=OCR_CONFIG, dpi=dpi, rerender=rerender)
+        return _page_result(tiered)
+    
+    def perform_ocr(self, image: Union[Image.Image, np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Perform OCR on an image with the configured engine.
         
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(thresh)
+        Args:
+            image: PIL Image or grayscale array (see iter_gray_pages) to process
+            
+        Returns:
+            Words with their text, bbox and confidence (see OCRWord)
+        """
+        return self.ocr_page(image)["results"]
+    
+    def ocr_pdf(self, pdf_path: str, pipeline: Optional[OCRPipeline] = None) -> Iterator[Dict[str, Any]]:
+        """
+        OCR a PDF page by page at an adaptive resolution.
         
-        # Sharpen
-        kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-        sharpened = cv2.filter2D(denoised, -1, kernel)
+        Each page is rendered at the lowest DPI between min_dpi and resolution_dpi that
+        keeps its glyphs large enough for Tesseract (see choose_dpi), and re-rendered at
+        resolution_dpi only if the result scores below min_confidence.
         
-        return sharpened
+        Args:
+            pdf_path: Path to the PDF file
+            pipeline: If given, pages are rendered, binarized and OCR'd concurrently by
+                its stage pools (with its engine) instead of one after another here
+            
+        Yields:
+            ocr_page output for each page, plus its "page_number" (1-based)
+        """
+        if pipeline is not None:
+            with fitz.open(pdf_path) as doc:
+                tasks = [(pdf_path, page_num, None) for page_num in range(doc.page_count)]
+            for (_, page_num, _), tiered, error in pipeline.run(tasks, "data", OCR_CONFIG, self.min_confidence,
+                                                                  self.resolution_dpi, self.min_dpi):
+                if error is not None:
+                    raise error
+                ocr_page = _page_result(tiered)
+                ocr_page["page_number"] = page_num + 1
+                yield ocr_page
+            return
+        with fitz.open(pdf_path) as doc:
+            for page_num, page in enumerate(doc):
+                dpi = choose_dpi(page, None, self.min_dpi, self.resolution_dpi)
+                rerender = None
+                if dpi < self.resolution_dpi:
+                    rerender = lambda page=page: (render_gray(page, self.resolution_dpi), self.resolution_dpi)
+                ocr_page = self.ocr_page(render_gray(page, dpi), dpi, rerender)
+                ocr_page["page_number"] = page_num + 1
+                yield ocr_page
     
-    def perform_ocr(self, image: Image.Image) -> List[Dict[str, Any]]:
+    def extract_line_items(self, ocr_results: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
         """
-        Perform OCR on an image using Tesseract.
+        Extract invoice line items from the word boxes returned by perform_ocr.
         
         Args:
-            image: PIL Image to process
+            ocr_results: OCR results of one page
             
         Returns:
-            List of dictionaries containing OCR results
-        """
-        # Preprocess the image
-        processed_img = self.preprocess_image(image)
-        
-        # Perform OCR with Tesseract
-        ocr_data = pytesseract.image_to_data(
-            processed_img,
-            output_type=pytesseract.Output.DICT,
-            config='--psm 6'  # Assume uniform block of text
-        )
-        
-        # Convert to our format
-        results = []
-        n_boxes = len(ocr_data['text'])
-        for i in range(n_boxes):
-            if int(ocr_data['conf'][i]) > 60:  # Confidence threshold
-                results.append({
-                    'text': ocr_data['text'][i],
-                    'bbox': {
-                        'x': ocr_data['left'][i],
-                        'y': ocr_data['top'][i],
-                        'width': ocr_data['width'][i],
-                        'height': ocr_data['height'][i]
-                    },
-                    'confidence': float(ocr_data['conf'][i]) / 100.0
-                })
-        
-        return results
+            List of items (item, quantity, unit_price, amount), or None if the page
+            has no item table
+        """
+        return extract_table_items(words_from_ocr_results(ocr_results))
     
     def save_ocr_results(self, results: List[Dict[str, Any]], output_path: str) -> None:
         """
@@ -134,23 +233,89 @@ class PDFProcessor:
             if filename.lower().endswith('.pdf'):
                 pdf_path = os.path.join(pdf_directory, filename)
                 print(f"Processing {pdf_path}...")
-                converted_images = self.pdf_to_images(pdf_path)
-                if converted_images:
+                # Pages are rendered and dropped one at a time; only the count is kept
+                converted_pages = sum(1 for _ in self.iter_gray_pages(pdf_path))
+                if converted_pages:
                     print(f"All pages converted successfully for {pdf_path}!")
                 else:
                     print(f"Conversion failed for {pdf_path}.")
 
-    def process_images(self, image_directory: str) -> None:
+    def _ocr_image(self, image_path: str, output_format: str) -> Tuple[Optional[Dict[str, np.ndarray]], Dict[str, Any]]:
+        """OCR one image file; JSON results are written next to it, columnar ones are returned packed."""
+        with Image.open(image_path) as image:
+            ocr_page = self.ocr_page(image)
+        if output_format == "json":
+            with Path(image_path).with_suffix(".json").open("w") as f:
+                json.dump(ocr_page["results"], f)
+            return None, ocr_page["preprocessing"]
+        return pack_words(ocr_page["results"]), ocr_page["preprocessing"]
+
+    def process_images(self, image_directory: str, workers: int = 1, output_format: str = "json") -> None:
         """
         Process all JPEG images in a directory with OCR.
         
+        With workers > 1 the images are OCR'd in a process pool, each worker with its
+        own engine of the same backend; an image that fails there is reported and
+        skipped instead of stopping the run.
+        
         Args:
             image_directory: Path to directory containing JPEG images
+            workers: Number of worker processes (1: OCR in this process; None or 0:
+                one per CPU)
+            output_format: "json" for a file of word dicts next to each image, or "npz"
+                for all words in one columnar file (see ocr_columns), COLUMNS_FILENAME
+                in the directory
         """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
         image_paths = sorted(list(Path(image_directory).glob("*.jpeg")))
+        tasks = [(str(image_path), output_format) for image_path in image_paths]
+        preprocessing = {}
+        names, packed = [], []
         
-        for image_path in tqdm(image_paths, desc="Processing Images"):
-            ocr_page = self.perform_ocr(Image.open(image_path))
-            
-            with image_path.with_suffix(".json").open("w") as f:
-                json.dump(ocr_page, f) 
\ No newline at end of file
+        serial = resolve_workers(workers) == 1
+        if serial:
+            outcomes = ((task, self._ocr_image(*task), None) for task in tasks)
+        else:
+            # Engines cannot be pickled; workers create their own of the same backend
+            backend = self._ocr_engine if isinstance(self._ocr_engine, str) else getattr(self._ocr_engine, "name", None)
+            initargs = (self.resolution_dpi, self.min_confidence, self.min_dpi, backend if backend in BACKENDS else None)
+            outcomes = imap_ordered(_ocr_image_task, tasks, workers, initializer=_init_worker, initargs=initargs)
+        
+        for (image_path, _), result, error in tqdm(outcomes, total=len(tasks), desc="Processing Images"):
+            name = os.path.basename(image_path)
+            if error is not None:
+                print(f"OCR failed for {image_path}: {error}")
+                continue
+            columns, preprocessing[name] = result
+            if columns is not None:
+                names.append(name)
+                packed.append(columns)
+        
+        if output_format == "npz":
+            save_columns(os.path.join(image_directory, COLUMNS_FILENAME), names, packed)
+        # Which tier each image needed, for tuning min_confidence
+        if preprocessing:
+            with open(os.path.join(image_directory, "preprocessing.json"), "w") as f:
+                json.dump(preprocessing, f, indent=2)
+        if serial and self.ocr_engine.cache is not None:
+            print(f"OCR cache: {self.ocr_engine.cache.stats()}")
+
+
+def _page_result(tiered: Dict[str, Any]) -> Dict[str, Any]:
+    """ocr_page output from an ocr_data result."""
+    data = tiered.pop("data")
+    return {"results": words_from_data(data, MIN_WORD_CONFIDENCE), "preprocessing": tiered}
+
+
+# Per-process processor used by the parallel process_images runs
+_worker_processor = None
+
+def _init_worker(resolution_dpi: int, min_confidence: float, min_dpi: Optional[int], backend: Optional[str]):
+    """Create the processor (and through it the OCR engine) used inside a pool worker."""
+    global _worker_processor
+    _worker_processor = PDFProcessor(resolution_dpi, ocr_engine=backend, min_confidence=min_confidence, min_dpi=min_dpi)
+
+def _ocr_image_task(task: Tuple[str, str]) -> Tuple[Optional[Dict[str, np.ndarray]], Dict[str, Any]]:
+    """OCR one image file inside a pool worker."""
+    return _worker_processor._ocr_image(*task)
@@ -0,0 +1,361 @@
+"""
+Staged OCR pipeline: pages are rendered, preprocessed and OCR'd by separate pools at once.
+
+Render workers (processes) rasterize pages with MuPDF at the DPI choose_dpi picks,
+preprocessing workers (processes) apply the cheap Otsu tier, and OCR workers (threads
+driving the OCR engine, whose calls release the GIL) recognize the result, escalating
+to a full-resolution re-render or denoising when unsure (see preprocess). The stages are
+connected by bounded queues, so a slow stage holds the others back instead of piling
+pages up in memory, and page buffers travel between the processes in shared memory:
+only a small descriptor is pickled. The busy time of every stage is measured, so the
+pools can be sized for the hardware from :meth:`OCRPipeline.report`.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import fitz
+import numpy as np
+
+from .preprocess import DEFAULT_MIN_CONFIDENCE, binarize, ocr_data, ocr_text
+from .render import DEFAULT_DPI, render_gray
+from .resolution import DEFAULT_MIN_DPI, choose_dpi
+from ..ocr.engine import OCREngine, get_default_engine
+
+STAGE_RENDER = "render"
+STAGE_PREPROCESS = "preprocess"
+STAGE_OCR = "ocr"
+STAGES = (STAGE_RENDER, STAGE_PREPROCESS, STAGE_OCR)
+
+# Pages waiting between two stages, per worker of the receiving stage
+DEFAULT_QUEUE_SIZE = 2
+
+# Seconds between checks that the worker processes are still alive
+_POLL_SECONDS = 1.0
+
+# Zero-based page number and, for part of a page, the clip rectangle in PDF points
+PageTask = Tuple[str, int, Optional[Sequence[float]]]
+
+
+def _share(array: np.ndarray) -> SharedMemory:
+    """Copy an array into a new shared memory block."""
+    block = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, np.uint8, block.buf)[...] = array
+    return block
+
+
+def _release(block: SharedMemory, unlink: bool = False) -> None:
+    try:
+        block.close()
+    except BufferError:
+        # An array still refers to the mapping; it is unmapped when that array is freed
+        pass
+    if unlink:
+        block.unlink()
+
+
+def _render_worker(tasks: multiprocessing.Queue, rendered: multiprocessing.Queue) -> None:
+    """Render stage: rasterize pages into shared memory until a None task arrives."""
+    doc, doc_path = None, None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, pdf_path, page_num, clip, min_dpi, max_dpi = task
+        start = time.perf_counter()
+        try:
+            if pdf_path != doc_path:
+                if doc is not None:
+                    doc.close()
+                    doc, doc_path = None, None
+                doc, doc_path = fitz.open(pdf_path), pdf_path
+            page = doc[page_num]
+            clip = fitz.Rect(clip) if clip is not None else None
+            dpi = choose_dpi(page, clip, min_dpi, max_dpi)
+            gray = render_gray(page, dpi, clip)
+            block = _share(gray)
+            rendered.put((index, block.name, gray.shape, dpi, None, time.perf_counter() - start))
+            del gray
+            _release(block)
+        except Exception as e:
+            # Exceptions are passed on as text: not every one of them can be pickled
+            rendered.put((index, None, None, None, f"{type(e).__name__}: {e}", time.perf_counter() - start))
+    if doc is not None:
+        doc.close()
+
+
+def _preprocess_worker(rendered: multiprocessing.Queue, prepared: multiprocessing.Queue) -> None:
+    """Preprocessing stage: binarize rendered pages into shared memory until None arrives."""
+    while True:
+        item = rendered.get()
+        if item is None:
+            break
+        index, name, shape, dpi, error, render_seconds = item
+        start = time.perf_counter()
+        binary_name = None
+        if error is None:
+            try:
+                block = SharedMemory(name=name)
+                gray = np.ndarray(shape, np.uint8, block.buf)
+                binary = binarize(gray)
+                del gray
+                _release(block)
+                binary_block = _share(binary)
+                binary_name = binary_block.name
+                _release(binary_block)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        prepared.put((index, name, binary_name, shape, dpi, error, render_seconds, time.perf_counter() - start))
+
+
+class OCRPipeline:
+    """
+    Long-lived render, preprocessing and OCR pools that OCR pages concurrently.
+
+    Use it as a context manager, or call :meth:`close`, to stop the worker processes.
+    One :meth:`run` is processed at a time.
+    """
+
+    def __init__(self, render_workers: int = 1, preprocess_workers: int = 1, ocr_workers: Optional[int] = None,
+                 engine: Optional[OCREngine] = None, queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        Start the render and preprocessing processes.
+
+        Args:
+            render_workers: Number of render processes
+            preprocess_workers: Number of preprocessing processes
+            ocr_workers: Number of pages OCR'd at once (default: the engine's pool size)
+            engine: OCR engine (default: the process-wide default engine)
+            queue_size: Pages that may wait in front of each worker of a stage
+        """
+        self.engine = engine or get_default_engine()
+        self.workers = {STAGE_RENDER: render_workers, STAGE_PREPROCESS: preprocess_workers,
+                        STAGE_OCR: ocr_workers or self.engine.workers}
+        # Spawned, not forked: the parent runs threads (the OCR engine's among them)
+        context = multiprocessing.get_context("spawn")
+        self._tasks = context.Queue(maxsize=queue_size * render_workers)
+        self._rendered = context.Queue(maxsize=queue_size * preprocess_workers)
+        self._prepared = context.Queue(maxsize=queue_size * self.workers[STAGE_OCR])
+        self._processes = (
+            [context.Process(target=_render_worker, args=(self._tasks, self._rendered), daemon=True)
+             for _ in range(render_workers)]
+            + [context.Process(target=_preprocess_worker, args=(self._rendered, self._prepared), daemon=True)
+               for _ in range(preprocess_workers)]
+        )
+        for process in self._processes:
+            process.start()
+        self._ocr_pool = ThreadPoolExecutor(max_workers=self.workers[STAGE_OCR], thread_name_prefix="pipeline-ocr")
+        self._docs: Dict[str, fitz.Document] = {}
+        self._docs_lock = threading.Lock()
+        self._busy = dict.fromkeys(STAGES, 0.0)
+        self._items = dict.fromkeys(STAGES, 0)
+        self._stats_lock = threading.Lock()
+        self._wall = 0.0
+
+    def _rerender(self, pdf_path: str, page_num: int, clip: Optional[fitz.Rect], dpi: int) -> Tuple[np.ndarray, int]:
+        """Full-resolution render for a page the OCR stage is unsure about (MuPDF is not thread-safe)."""
+        with self._docs_lock:
+            doc = self._docs.get(pdf_path)
+            if doc is None:
+                doc = self._docs[pdf_path] = fitz.open(pdf_path)
+            return render_gray(doc[page_num], dpi, clip).copy(), dpi
+
+    def _add_busy(self, stage: str, seconds: float) -> None:
+        with self._stats_lock:
+            self._busy[stage] += seconds
+            self._items[stage] += 1
+
+    def _ocr(self, task: PageTask, item: Tuple, output: str, config: str, min_confidence: float,
+             max_dpi: int) -> Dict[str, Any]:
+        """OCR stage: recognize one prepared page from shared memory."""
+        _, name, binary_name, shape, dpi, _, render_seconds, preprocess_seconds = item
+        start = time.perf_counter()
+        block, binary_block = SharedMemory(name=name), SharedMemory(name=binary_name)
+        try:
+            gray = np.ndarray(shape, np.uint8, block.buf)
+            binary = np.ndarray(shape, np.uint8, binary_block.buf)
+            pdf_path, page_num, clip = task
+            rerender = None
+            if dpi < max_dpi:
+                clip_rect = fitz.Rect(clip) if clip is not None else None
+                rerender = lambda: self._rerender(pdf_path, page_num, clip_rect, max_dpi)
+            ocr = ocr_text if output == "text" else ocr_data
+            result = ocr(self.engine, gray, min_confidence, config, dpi, rerender, binary=binary)
+            del gray, binary
+        finally:
+            _release(block, unlink=True)
+            _release(binary_block, unlink=True)
+        result["render_ms"] = round(render_seconds * 1000, 3)
+        result["preprocess_ms"] = round(preprocess_seconds * 1000, 3)
+        self._add_busy(STAGE_OCR, time.perf_counter() - start)
+        return result
+
+    def _check_workers(self) -> None:
+        dead = [process for process in self._processes if not process.is_alive()]
+        if dead:
+            raise RuntimeError(f"{len(dead)} pipeline worker process(es) died (exit code {dead[0].exitcode})")
+
+    def run(self, tasks: Iterable[PageTask], output: str = "text", config: str = "",
+            min_confidence: float = DEFAULT_MIN_CONFIDENCE, max_dpi: int = DEFAULT_DPI,
+            min_dpi: Optional[int] = DEFAULT_MIN_DPI) -> Iterator[Tuple[PageTask, Optional[Dict[str, Any]],
+                                                                          Optional[BaseException]]]:
+        """
+        OCR pages through the pipeline, yielding results in task order.
+
+        Args:
+            tasks: (pdf path, zero-based page number, clip rectangle or None) per page
+            output: "text" for ocr_text results, "data" for ocr_data results
+            config: Tesseract options
+            min_confidence: Mean word confidence (0-100) below which a page is escalated
+            max_dpi: Highest render resolution, used to re-render unsure pages
+            min_dpi: Lowest render resolution choose_dpi may pick (None: always max_dpi)
+
+        Yields:
+            ``(task, result, error)`` per task: the ocr_text / ocr_data result (plus the
+            page's "render_ms" and "preprocess_ms"), or the error that stopped it
+        """
+        if output not in ("text", "data"):
+            raise ValueError(f"Unsupported pipeline output: {output}")
+        tasks = list(tasks)
+        started = time.perf_counter()
+        futures: Dict[int, Future] = {}
+        arrived = threading.Condition()
+        stop = threading.Event()
+        # Bounds the pages held in shared memory by the OCR stage
+        slots = threading.Semaphore(self.workers[STAGE_OCR] * 2)
+
+        def release(_future: Future) -> None:
+            slots.release()
+
+        fed = [0]
+        feeding = threading.Event()
+        feeding.set()
+        submitted: List[Future] = []
+
+        def feed() -> None:
+            try:
+                for index, (pdf_path, page_num, clip) in enumerate(tasks):
+                    while not stop.is_set():
+                        try:
+                            self._tasks.put((index, pdf_path, page_num, clip and tuple(clip), min_dpi, max_dpi),
+                                            timeout=_POLL_SECONDS)
+                            fed[0] += 1
+                            break
+                        except queue.Full:
+                            continue
+            finally:
+                feeding.clear()
+
+        def fail_all(error: BaseException) -> None:
+            with arrived:
+                for index in range(len(tasks)):
+                    if index not in futures:
+                        futures[index] = Future()
+                        futures[index].set_exception(error)
+                arrived.notify_all()
+
+        def dispatch() -> None:
+            received = 0
+            # After an early stop, the pages already fed are still drained so that the
+            # next run does not receive them and their shared memory is freed
+            while received < len(tasks) and not (stop.is_set() and not feeding.is_set() and received >= fed[0]):
+                try:
+                    item = self._prepared.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    try:
+                        self._check_workers()
+                    except RuntimeError as e:
+                        fail_all(e)
+                        return
+                    continue
+                received += 1
+                index, name, binary_name, error = item[0], item[1], item[2], item[5]
+                self._add_busy(STAGE_RENDER, item[6])
+                if name is not None and error is None:
+                    self._add_busy(STAGE_PREPROCESS, item[7])
+                if error is not None or stop.is_set():
+                    future = Future()
+                    future.set_exception(RuntimeError(error or "pipeline run was stopped"))
+                    for block_name in (name, binary_name):
+                        if block_name is not None:
+                            SharedMemory(name=block_name).unlink()
+                else:
+                    slots.acquire()
+                    future = self._ocr_pool.submit(self._ocr, tasks[index], item, output, config,
+                                                   min_confidence, max_dpi)
+                    future.add_done_callback(release)
+                    submitted.append(future)
+                with arrived:
+                    futures[index] = future
+                    arrived.notify_all()
+
+        threads = [threading.Thread(target=feed, daemon=True), threading.Thread(target=dispatch, daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            for index, task in enumerate(tasks):
+                with arrived:
+                    arrived.wait_for(lambda: index in futures)
+                    future = futures.pop(index)
+                try:
+                    yield task, future.result(), None
+                except Exception as e:
+                    yield task, None, e
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            # OCR still running for an abandoned run may re-render through the open documents
+            wait(submitted)
+            with self._docs_lock:
+                for doc in self._docs.values():
+                    doc.close()
+                self._docs.clear()
+            self._wall += time.perf_counter() - started
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Utilization of each stage over all runs so far.
+
+        A stage near 1.0 is the bottleneck and deserves more workers; one well below
+        the others can give workers up.
+
+        Returns:
+            Per stage: workers, items, busy seconds and utilization (busy time divided by
+            wall time times workers)
+        """
+        with self._stats_lock:
+            return {
+                stage: {
+                    "workers": self.workers[stage],
+                    "items": self._items[stage],
+                    "busy_s": round(self._busy[stage], 3),
+                    "utilization": round(self._busy[stage] / (self._wall * self.workers[stage]), 3)
+                    if self._wall else 0.0,
+                }
+                for stage in STAGES
+            }
+
+    def close(self) -> None:
+        """Stop the worker processes and the OCR threads."""
+        render_workers = self._processes[:self.workers[STAGE_RENDER]]
+        for _ in render_workers:
+            self._tasks.put(None)
+        for process in render_workers:
+            process.join()
+        for _ in self._processes[len(render_workers):]:
+            self._rendered.put(None)
+        for process in self._processes:
+            process.join()
+        self._ocr_pool.shutdown(wait=True)
+
+    def __enter__(self) -> "OCRPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,253 @@
+"""
+Tiered OCR preprocessing: a cheap binarization first, denoising only where Tesseract is unsure.
+
+Every image is OCR'd after grayscale + Otsu thresholding. Only when the mean word
+confidence of the result is below a threshold is the expensive tier (adaptive
+threshold, non-local-means denoising and sharpening) run: on the whole image for plain
+text, or only on the bands of low-confidence lines for word boxes. The better-scoring
+result is kept and the tier that was needed is reported, so the confidence threshold
+can be tuned against the extra cost. Images rendered at a reduced resolution (see
+resolution.choose_dpi) can be re-rendered at full resolution before denoising is tried.
+
+Each tier runs inside the engine call, so when the engine has a result cache, a hit
+for the image and tier skips the preprocessing as well as the OCR.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ..ocr.engine import TSV_COLUMNS, OCREngine, OCRData, mean_confidence
+
+TIER_OTSU = "otsu"
+TIER_DENOISE_REGIONS = "denoise-regions"
+TIER_DENOISE = "denoise"
+# Ordered from cheapest to most expensive
+TIERS = (TIER_OTSU, TIER_DENOISE_REGIONS, TIER_DENOISE)
+
+DEFAULT_MIN_CONFIDENCE = 70.0
+
+# Images with fewer pixels darker than BLANK_INK_LEVEL than this share are treated as blank
+BLANK_INK_SHARE = 0.001
+BLANK_INK_LEVEL = 128
+
+# Low-confidence lines closer than this (in pixels) are denoised as one band
+REGION_PADDING = 8
+# When the low-confidence bands cover more than this share of the image, the whole image is escalated
+MAX_REGION_SHARE = 0.5
+
+
+def to_gray(image: Any) -> np.ndarray:
+    """
+    Convert a PIL Image or RGB/RGBA/grayscale array to a grayscale array.
+
+    Args:
+        image: Image to convert
+
+    Returns:
+        2D uint8 array
+    """
+    if isinstance(image, Image.Image):
+        image = np.asarray(image.convert("L") if image.mode != "L" else image)
+    if image.ndim == 3:
+        code = cv2.COLOR_RGBA2GRAY if image.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+        image = cv2.cvtColor(image, code)
+    return image
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Cheap tier: global Otsu threshold."""
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def denoise(gray: np.ndarray) -> np.ndarray:
+    """Expensive tier: adaptive threshold, non-local-means denoising and sharpening."""
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    denoised = cv2.fastNlMeansDenoising(thresh)
+    kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+    return cv2.filter2D(denoised, -1, kernel)
+
+
+def is_blank(gray: np.ndarray) -> bool:
+    """Whether a grayscale image has (almost) no ink on it."""
+    return np.count_nonzero(gray < BLANK_INK_LEVEL) < BLANK_INK_SHARE * gray.size
+
+
+def _better(candidate: Optional[float], current: Optional[float]) -> bool:
+    return candidate is not None and (current is None or candidate > current)
+
+
+def _unsure(confidence: Optional[float], gray: np.ndarray, min_confidence: float) -> bool:
+    """Whether a result should be escalated: low confidence, or no words on a page with ink."""
+    return confidence < min_confidence if confidence is not None else not is_blank(gray)
+
+
+# Callable returning a higher-resolution render of the same area, with its DPI
+Rerender = Callable[[], Tuple[Any, int]]
+
+
+def _precomputed(tier: Callable[[np.ndarray], np.ndarray], result: Optional[np.ndarray]) -> Callable:
+    """The tier itself, or a stand-in returning its result computed elsewhere, cached under the tier's name."""
+    if result is None:
+        return tier
+
+    def apply(gray: np.ndarray) -> np.ndarray:
+        return result
+
+    apply.__module__, apply.__qualname__ = tier.__module__, tier.__qualname__
+    return apply
+
+
+def ocr_text(engine: OCREngine, image: Any, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+             config: str = "", dpi: Optional[int] = None, rerender: Optional[Rerender] = None,
+             binary: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    OCR an image to text, escalating to the denoising tier when confidence is low.
+
+    When the cheap tier finds no words at all the image is escalated too, unless it is
+    blank. If ``rerender`` is given, a higher-resolution render is tried before denoising.
+
+    Args:
+        engine: OCR engine
+        image: PIL Image or array
+        min_confidence: Mean word confidence (0-100) below which the image is escalated
+        config: Tesseract options
+        dpi: Render resolution, if known
+        rerender: Returns ``(image, dpi)`` at a higher resolution, when low confidence may
+            be due to the resolution
+        binary: The image's cheap tier, if it was already computed (e.g. by OCRPipeline)
+
+    Returns:
+        Dictionary with the text, the deepest tier that was run, the mean confidence of
+        the kept text, whether escalating improved it, the DPI of the kept text, whether
+        the image was re-rendered, the number of pixels OCR'd and the time spent
+    """
+    start = time.perf_counter()
+    gray = to_gray(image)
+    pixels = gray.size
+    text, confidence = engine.image_to_scored_string(gray, config, dpi, _precomputed(binarize, binary))
+    tier, improved, rerendered, kept_dpi = TIER_OTSU, False, False, dpi
+    if rerender is not None and _unsure(confidence, gray, min_confidence):
+        image, dpi = rerender()
+        gray, rerendered = to_gray(image), True
+        pixels += gray.size
+        sharper_text, sharper_confidence = engine.image_to_scored_string(gray, config, dpi, binarize)
+        if _better(sharper_confidence, confidence):
+            text, confidence, improved, kept_dpi = sharper_text, sharper_confidence, True, dpi
+    if _unsure(confidence, gray, min_confidence):
+        tier = TIER_DENOISE
+        pixels += gray.size
+        denoised_text, denoised_confidence = engine.image_to_scored_string(gray, config, dpi, denoise)
+        if _better(denoised_confidence, confidence):
+            text, confidence, improved, kept_dpi = denoised_text, denoised_confidence, True, dpi
+    return {"text": text, "tier": tier, "confidence": confidence, "improved": improved, "dpi": kept_dpi,
+            "rerendered": rerendered, "pixels": pixels, "ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def _word_rows(data: OCRData) -> List[Dict[str, Any]]:
+    """Word-level rows (level 5, non-empty text) of image_to_data output."""
+    return [dict(zip(TSV_COLUMNS, row)) for row in zip(*(data[column] for column in TSV_COLUMNS))
+            if row[0] == 5 and str(row[-1]).strip()]
+
+
+def _rows_to_data(rows: List[Dict[str, Any]]) -> OCRData:
+    return {column: [row[column] for row in rows] for column in TSV_COLUMNS}
+
+
+def _low_confidence_bands(rows: List[Dict[str, Any]], min_confidence: float,
+                          height: int) -> List[Tuple[int, int]]:
+    """Merge the vertical extents of low-confidence lines into padded bands."""
+    lines: Dict[Tuple[int, int, int], List[Dict[str, Any]]] = {}
+    for row in rows:
+        lines.setdefault((row["block_num"], row["par_num"], row["line_num"]), []).append(row)
+    spans = sorted(
+        (min(w["top"] for w in words), max(w["top"] + w["height"] for w in words))
+        for words in lines.values()
+        if sum(w["conf"] for w in words) / len(words) < min_confidence
+    )
+    bands: List[List[int]] = []
+    for top, bottom in spans:
+        top, bottom = max(0, top - REGION_PADDING), min(height, bottom + REGION_PADDING)
+        if bands and top <= bands[-1][1]:
+            bands[-1][1] = max(bands[-1][1], bottom)
+        else:
+            bands.append([top, bottom])
+    return [(top, bottom) for top, bottom in bands]
+
+
+def _in_band(row: Dict[str, Any], band: Tuple[int, int]) -> bool:
+    centre = row["top"] + row["height"] / 2
+    return band[0] <= centre < band[1]
+
+
+def ocr_data(engine: OCREngine, image: Any, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+             config: str = "", dpi: Optional[int] = None, rerender: Optional[Rerender] = None,
+             binary: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    OCR an image to word boxes, denoising only the low-confidence parts.
+
+    Lines whose mean word confidence is below ``min_confidence`` are grouped into
+    full-width bands; each band is cropped, denoised and OCR'd again, and its words
+    replace the original ones when they score higher. If the bands cover most of the
+    image, or no words are found on an image that is not blank, the whole image is
+    denoised instead. If ``rerender`` is given and the page as a whole scores low, a
+    higher-resolution render replaces the image first when it reads better.
+
+    Args:
+        engine: OCR engine
+        image: PIL Image or array
+        min_confidence: Mean word confidence (0-100) below which a line is denoised
+        config: Tesseract options
+        dpi: Render resolution, if known
+        rerender: Returns ``(image, dpi)`` at a higher resolution
+        binary: The image's cheap tier, if it was already computed (e.g. by OCRPipeline)
+
+    Returns:
+        Dictionary with the word-level ``data`` (``image_to_data`` layout, word rows
+        only, in reading order, in pixels at the returned ``dpi``), the deepest tier that
+        was run, the page's mean word confidence, the number of bands that were
+        denoised, whether the image was re-rendered, the number of pixels OCR'd and the
+        time spent
+    """
+    start = time.perf_counter()
+    gray = to_gray(image)
+    pixels = gray.size
+    rows = _word_rows(engine.image_to_data(gray, config, dpi, _precomputed(binarize, binary)))
+    tier, regions, rerendered = TIER_OTSU, 0, False
+    if rerender is not None and _unsure(mean_confidence(_rows_to_data(rows)), gray, min_confidence):
+        sharper_image, sharper_dpi = rerender()
+        sharper_gray, rerendered = to_gray(sharper_image), True
+        pixels += sharper_gray.size
+        sharper = _word_rows(engine.image_to_data(sharper_gray, config, sharper_dpi, binarize))
+        if _better(mean_confidence(_rows_to_data(sharper)), mean_confidence(_rows_to_data(rows))):
+            # Boxes are in the new render's pixels from here on
+            gray, rows, dpi = sharper_gray, sharper, sharper_dpi
+    bands = _low_confidence_bands(rows, min_confidence, gray.shape[0])
+    unreadable = not rows and not is_blank(gray)
+    if unreadable or sum(bottom - top for top, bottom in bands) > MAX_REGION_SHARE * gray.shape[0]:
+        tier = TIER_DENOISE
+        pixels += gray.size
+        denoised = _word_rows(engine.image_to_data(gray, config, dpi, denoise))
+        if _better(mean_confidence(_rows_to_data(denoised)), mean_confidence(_rows_to_data(rows))):
+            rows = denoised
+    elif bands:
+        tier, regions = TIER_DENOISE_REGIONS, len(bands)
+        crops = [gray[top:bottom] for top, bottom in bands]
+        pixels += sum(crop.size for crop in crops)
+        for band, data in zip(bands, engine.map(crops, "data", config, dpi, denoise)):
+            replacement = _word_rows(data)
+            for row in replacement:
+                row["top"] += band[0]
+            original = [row for row in rows if _in_band(row, band)]
+            if not _better(mean_confidence(_rows_to_data(replacement)), mean_confidence(_rows_to_data(original))):
+                continue
+            # Splice the band's new words in where its old words started, keeping reading order
+            first = next((i for i, row in enumerate(rows) if _in_band(row, band)), len(rows))
+            kept = [row for row in rows if not _in_band(row, band)]
+            rows = kept[:first] + replacement + kept[first:]
+    data = _rows_to_data(rows)
+    return {"data": data, "tier": tier, "confidence": mean_confidence(data), "regions": regions, "dpi": dpi,
+            "rerendered": rerendered, "pixels": pixels, "ms": round((time.perf_counter() - start) * 1000, 3)}
@@ -0,0 +1,153 @@
+"""
+Streaming page rendering: PDF pages are rasterized one at a time instead of all at once.
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+import fitz
+import numpy as np
+from PIL import Image
+
+DEFAULT_DPI = 300
+
+# Sentinel that ends the prefetch queue
+_DONE = object()
+
+
+def render_page(page: fitz.Page, dpi: int = DEFAULT_DPI) -> Image.Image:
+    """
+    Render one page to an RGB image; the intermediate pixmap is released immediately.
+
+    Args:
+        page: PyMuPDF page
+        dpi: Render resolution
+
+    Returns:
+        PIL Image of the page
+    """
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    del pix
+    return img
+
+
+class _PixmapBuffer:
+    """Exposes a pixmap's samples to NumPy and keeps the pixmap alive while arrays use them."""
+
+    def __init__(self, pix: fitz.Pixmap):
+        self._pix = pix
+        self.__array_interface__ = {
+            "shape": (pix.height, pix.width) if pix.n == 1 else (pix.height, pix.width, pix.n),
+            "strides": (pix.stride, 1) if pix.n == 1 else (pix.stride, pix.n, 1),
+            "typestr": "|u1",
+            # A raw pointer makes NumPy keep this object (and so the pixmap) as the array's base
+            "data": (pix.samples_ptr, False),
+            "version": 3,
+        }
+
+
+def render_gray(page: fitz.Page, dpi: int = DEFAULT_DPI, clip: Optional[fitz.Rect] = None) -> np.ndarray:
+    """
+    Render one page, or a clip of it, straight to an 8-bit grayscale array.
+
+    MuPDF rasterizes directly into a one-channel pixmap and the array is a view of its
+    samples, so no RGB frame, PIL image or color conversion copy is made. The pixmap is
+    freed when the last array referring to it is.
+
+    Args:
+        page: PyMuPDF page
+        dpi: Render resolution
+        clip: Area of the page to render, in PDF points (default: the whole page)
+
+    Returns:
+        2D uint8 array of shape (height, width)
+    """
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), colorspace=fitz.csGRAY, alpha=False, clip=clip)
+    return np.asarray(_PixmapBuffer(pix))
+
+
+def _render_pages(pdf_path: str, dpi: int, pages: Optional[Sequence[int]],
+                  render: Callable[[fitz.Page, int], Any]) -> Iterator[Tuple[int, Any]]:
+    with fitz.open(pdf_path) as doc:
+        for page_num in (range(len(doc)) if pages is None else pages):
+            yield page_num, render(doc[page_num], dpi)
+
+
+def iter_page_images(pdf_path: str, dpi: int = DEFAULT_DPI, prefetch: int = 0,
+                     pages: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Yield ``(page_number, image)`` for each page of a PDF, rendering lazily.
+
+    Only the page being consumed is held in memory (plus up to ``prefetch`` pages rendered
+    ahead by a background thread), so peak memory does not grow with document length.
+    Stopping the iteration early also stops the background renderer.
+
+    Args:
+        pdf_path: Path to the PDF file
+        dpi: Render resolution
+        prefetch: Number of pages to render ahead while the caller works on the current one
+        pages: Zero-based page numbers to render (default: all pages)
+
+    Yields:
+        Zero-based page number and the page as an RGB PIL Image
+    """
+    return _iter_rendered(pdf_path, dpi, prefetch, pages, render_page)
+
+
+def iter_gray_pages(pdf_path: str, dpi: int = DEFAULT_DPI, prefetch: int = 0,
+                    pages: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Like :func:`iter_page_images`, but yields zero-copy grayscale arrays (see render_gray).
+
+    This is the input OCR wants; use it wherever the page is not needed in color.
+
+    Yields:
+        Zero-based page number and the page as a 2D uint8 array
+    """
+    return _iter_rendered(pdf_path, dpi, prefetch, pages, render_gray)
+
+
+def _iter_rendered(pdf_path: str, dpi: int, prefetch: int, pages: Optional[Sequence[int]],
+                   render: Callable[[fitz.Page, int], Any]) -> Iterator[Tuple[int, Any]]:
+    if prefetch <= 0:
+        yield from _render_pages(pdf_path, dpi, pages, render)
+        return
+
+    rendered: "queue.Queue" = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                rendered.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in _render_pages(pdf_path, dpi, pages, render):
+                if not put(item):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(_DONE)
+
+    producer = threading.Thread(target=produce, name="page-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = rendered.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            del item
+    finally:
+        stop.set()
+        producer.join()
@@ -0,0 +1,198 @@
+"""
+Size-bounded on-disk cache of rendered PDF pages.
+
+Pages are stored as image files keyed by the PDF's content hash, the render settings
+and the image format, next to a small manifest per document listing its pages. A
+repeat render of an unchanged PDF is answered from the manifest without opening the
+PDF in MuPDF. Files are written to a temporary name and renamed into place, and once
+the cached files exceed the byte budget the least recently used ones are deleted.
+Only files whose names carry a cache key are ever evicted, so other files in the
+directory are left alone.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, IO, List, Optional, Set, Tuple
+
+import fitz
+import numpy as np
+
+from .render import render_gray
+from .resolution import choose_dpi
+from ..utils.file_utils import file_content_hash
+
+DEFAULT_RENDER_DIR = os.path.join("data", "ocr_images")
+DEFAULT_RENDER_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_JPEG_QUALITY = 90
+
+# Image format -> file extension; "gray" is a raw 2D uint8 array that np.load can memory-map
+IMAGE_FORMATS = {"jpeg": ".jpeg", "png": ".png", "gray": ".npy"}
+
+MANIFEST_SUFFIX = ".pages.json"
+_CACHED_FILE = re.compile(r"\.[0-9a-f]{16}(\.jpeg|\.png|\.npy|\.pages\.json)$")
+
+
+class RenderCache:
+    """
+    Rendered pages of PDFs, stored as files in one directory under a byte budget.
+    """
+
+    def __init__(self, directory: str = DEFAULT_RENDER_DIR, max_bytes: int = DEFAULT_RENDER_CACHE_BYTES,
+                 image_format: str = "jpeg", jpeg_quality: int = DEFAULT_JPEG_QUALITY):
+        """
+        Set up the cache directory.
+
+        Args:
+            directory: Directory the page images are written to
+            max_bytes: Upper bound on the total size of cached files
+            image_format: "jpeg", "png" (both RGB) or "gray" (raw grayscale .npy)
+            jpeg_quality: JPEG quality (1-100) when image_format is "jpeg"
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.image_format = image_format
+        self.jpeg_quality = jpeg_quality
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _key(self, content_hash: str, dpi: int, min_dpi: Optional[int]) -> str:
+        """Short key of one document rendered with one set of settings."""
+        quality = self.jpeg_quality if self.image_format == "jpeg" else None
+        payload = json.dumps([content_hash, dpi, min_dpi, self.image_format, quality])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def render_pdf(self, pdf_path: str, dpi: int = 300, min_dpi: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Render every page of a PDF, or return the cached renders.
+
+        Args:
+            pdf_path: Path to the PDF file
+            dpi: Render resolution (the highest one when min_dpi is set)
+            min_dpi: If set, each page is rendered at the lowest DPI between min_dpi and
+                dpi that keeps its text large enough for OCR (see choose_dpi)
+
+        Returns:
+            Path and render DPI of each page, in page order
+        """
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        key = self._key(file_content_hash(pdf_path), dpi, min_dpi)
+        manifest_path = os.path.join(self.directory, f"{base_name}.{key}{MANIFEST_SUFFIX}")
+        pages = self._cached_pages(manifest_path)
+        if pages is not None:
+            with self._lock:
+                self.hits += 1
+            return pages
+
+        with self._lock:
+            self.misses += 1
+        pages = []
+        with fitz.open(pdf_path) as doc:
+            for page_num, page in enumerate(doc):
+                page_dpi = dpi if min_dpi is None else choose_dpi(page, None, min_dpi, dpi)
+                path = os.path.join(self.directory, f"{base_name}_page_{page_num + 1}.{key}"
+                                                    f"{IMAGE_FORMATS[self.image_format]}")
+                if os.path.exists(path):
+                    # Left over from a manifest that was evicted before its pages
+                    os.utime(path)
+                else:
+                    _write_atomic(path, self._encoder(page, page_dpi))
+                pages.append((path, page_dpi))
+        manifest = {"pages": [{"file": os.path.basename(path), "dpi": page_dpi} for path, page_dpi in pages]}
+        _write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+        self.evict(keep={manifest_path, *(path for path, _ in pages)})
+        return pages
+
+    def _cached_pages(self, manifest_path: str) -> Optional[List[Tuple[str, int]]]:
+        """Pages listed in a manifest if all of them are still on disk, marked as recently used."""
+        try:
+            with open(manifest_path, "rb") as f:
+                manifest = json.load(f)
+            pages = [(os.path.join(self.directory, page["file"]), page["dpi"]) for page in manifest["pages"]]
+            for path, _ in pages:
+                os.utime(path)
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return pages
+
+    def _encoder(self, page: fitz.Page, dpi: int) -> Callable[[IO[bytes]], None]:
+        """Function that renders a page and writes it to a file in the cache's format."""
+        if self.image_format == "gray":
+            return lambda f: np.save(f, render_gray(page, dpi))
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+        if self.image_format == "jpeg":
+            return lambda f: f.write(pixmap.tobytes(output="jpeg", jpg_quality=self.jpeg_quality))
+        return lambda f: f.write(pixmap.tobytes(output="png"))
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(last use, size, path) of every cached file."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if _CACHED_FILE.search(entry.name) and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, keep: Optional[Set[str]] = None) -> int:
+        """
+        Delete least recently used files until the cache fits in max_bytes.
+
+        Args:
+            keep: Paths that must not be deleted (e.g. the pages just returned)
+
+        Returns:
+            Number of bytes freed
+        """
+        keep = {os.path.abspath(path) for path in keep or ()}
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in entries:
+            if total - freed <= self.max_bytes:
+                break
+            if os.path.abspath(path) in keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            freed += size
+            with self._lock:
+                self.evictions += 1
+        return freed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report cached files, their size, document hits and misses and evicted files.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        entries = self._entries()
+        return {"files": len(entries), "bytes": sum(size for _, size, _ in entries),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def _write_atomic(path: str, write: Callable[[IO[bytes]], None]) -> None:
+    """Write a file under a temporary name and rename it into place."""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,104 @@
+"""
+Adaptive render resolution: the lowest DPI at which Tesseract still reads a page accurately.
+
+Tesseract's accuracy depends on the size of the glyphs in pixels, not on the DPI as such:
+it levels off once the x-height reaches roughly 20 px. Large print therefore OCRs just as
+well at 150 DPI as at 300, from a quarter of the pixels. The glyph size is measured on a
+cheap low-resolution probe render (median height of the ink's connected components), and
+a page that is one embedded scan is never rendered above the scan's own resolution.
+"""
+
+import math
+from typing import Optional
+
+import cv2
+import fitz
+import numpy as np
+
+from .render import DEFAULT_DPI, render_gray
+
+DEFAULT_MIN_DPI = 150
+PROBE_DPI = 100
+# Rendered DPIs are rounded up to a multiple of this, so pages share a few resolutions
+DPI_STEP = 50
+
+# Median component height to aim for, in pixels; it is slightly above the x-height
+TARGET_GLYPH_PX = 22
+# Fewer components than this (in the probe) are too few to measure
+MIN_GLYPHS = 20
+# Components shorter than this in the probe are speckle or rules, not glyphs
+MIN_GLYPH_PROBE_PX = 3
+# Images covering less of the page (or clip) than this do not bound its resolution
+MIN_IMAGE_COVERAGE = 0.5
+
+
+def glyph_height(page: fitz.Page, clip: Optional[fitz.Rect] = None) -> Optional[float]:
+    """
+    Estimate the typical glyph height on a page from a low-resolution probe render.
+
+    Args:
+        page: PyMuPDF page
+        clip: Area to measure, in PDF points (default: the whole page)
+
+    Returns:
+        Median glyph height in points, or None if there is too little text to tell
+    """
+    probe = render_gray(page, PROBE_DPI, clip)
+    if probe.size == 0:
+        return None
+    ink = cv2.threshold(probe, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    # Drop speckle, ruled lines and components as tall as a tenth of the page (images, borders)
+    glyphs = heights[(heights >= MIN_GLYPH_PROBE_PX) & (heights < probe.shape[0] / 10) & (widths < probe.shape[1] / 2)]
+    if len(glyphs) < MIN_GLYPHS:
+        return None
+    return float(np.median(glyphs)) * 72 / PROBE_DPI
+
+
+def embedded_image_dpi(page: fitz.Page, clip: Optional[fitz.Rect] = None) -> Optional[float]:
+    """
+    Native resolution of the image that covers most of the page (or clip), if any.
+
+    Args:
+        page: PyMuPDF page
+        clip: Area of interest, in PDF points (default: the whole page)
+
+    Returns:
+        Image pixels per inch as placed on the page, or None if no image dominates it
+    """
+    area = fitz.Rect(clip) if clip is not None else page.rect
+    best, best_cover = None, MIN_IMAGE_COVERAGE * area.width * area.height
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        cover = abs(bbox & area)
+        if cover >= best_cover and bbox.width > 0 and bbox.height > 0:
+            best, best_cover = min(info["width"] / bbox.width, info["height"] / bbox.height) * 72, cover
+    return best
+
+
+def choose_dpi(page: fitz.Page, clip: Optional[fitz.Rect] = None, min_dpi: Optional[int] = DEFAULT_MIN_DPI,
+               max_dpi: int = DEFAULT_DPI) -> int:
+    """
+    Pick the lowest render DPI that keeps the page's glyphs in Tesseract's accurate range.
+
+    Args:
+        page: PyMuPDF page
+        clip: Area that will be rendered, in PDF points (default: the whole page)
+        min_dpi: Lowest DPI to choose; None disables adaptation and returns max_dpi
+        max_dpi: Highest DPI to choose (used when the glyph size cannot be measured)
+
+    Returns:
+        Render DPI, a multiple of DPI_STEP between min_dpi and max_dpi
+    """
+    if min_dpi is None or min_dpi >= max_dpi:
+        return max_dpi
+    height = glyph_height(page, clip)
+    dpi = max_dpi if height is None else TARGET_GLYPH_PX * 72 / height
+    native = embedded_image_dpi(page, clip)
+    if native is not None:
+        # Rendering a scan above its own resolution only interpolates pixels
+        dpi = min(dpi, native)
+    dpi = math.ceil(dpi / DPI_STEP) * DPI_STEP
+    return int(min(max(dpi, min_dpi), max_dpi))
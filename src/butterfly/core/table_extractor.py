@@ -0,0 +1,207 @@
+"""
+Layout-aware invoice line-item extraction from positioned words.
+
+Works on PyMuPDF ``page.get_text("words")`` tuples and on the Tesseract word boxes
+produced by ``PDFProcessor.perform_ocr`` alike: words are grouped into rows by their
+vertical centre, numeric columns are found once per page by clustering the right
+edges of numeric words, and every body word is assigned to a column in NumPy passes.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+HEADER_WORDS = ("Item", "Quantity", "Rate", "Amount")
+STOP_WORDS = ("Subtotal", "Total", "Notes", "Terms", "Shipping", "Discount")
+# Matched against all words of a page joined by newlines, so each rule is one C-level scan
+HEADER_RE = re.compile(r'^(?:%s)$' % '|'.join(HEADER_WORDS), re.MULTILINE)
+STOP_RE = re.compile('|'.join(STOP_WORDS))
+# One result per word: the number (without "$") for numeric words, "" for the rest
+NUMBER_RE = re.compile(r'^(?:\$?(\d[\d,]*(?:\.\d*)?|\.\d+)$|.*$)', re.MULTILINE)
+
+# Tolerances, as fractions of the median word height on the page
+ROW_TOLERANCE = 0.5
+COLUMN_TOLERANCE = 0.5
+# A numeric column must have a word in at least this fraction of the body rows, and in
+# at least two rows: a single row says nothing about alignment
+MIN_COLUMN_SUPPORT = 0.5
+MIN_COLUMN_ROWS = 2
+
+Word = Tuple[float, float, float, float, str]
+
+
+def words_from_ocr_results(results: Sequence[Dict[str, Any]], scale: float = 1.0) -> List[Word]:
+    """
+    Convert ``PDFProcessor.perform_ocr`` results to ``(x0, y0, x1, y1, text)`` words.
+
+    Args:
+        results: OCR results with ``text`` and ``bbox`` (x, y, width, height) keys
+        scale: Factor applied to the boxes, e.g. ``72 / dpi`` for PDF points
+
+    Returns:
+        List of word tuples in image pixel coordinates, times ``scale``
+    """
+    words = []
+    for result in results:
+        text = result["text"].strip()
+        if text:
+            box = result["bbox"]
+            words.append((box["x"] * scale, box["y"] * scale, (box["x"] + box["width"]) * scale,
+                          (box["y"] + box["height"]) * scale, text))
+    return words
+
+
+def _median(values: np.ndarray) -> float:
+    """Median of a non-empty array; np.median's overhead dominates on a page's worth of words."""
+    values = np.sort(values)
+    middle = len(values) // 2
+    return float(values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2)
+
+
+def _word_index(starts: np.ndarray, positions: List[int]) -> np.ndarray:
+    """Map offsets in the newline-joined text back to word indices."""
+    return np.searchsorted(starts, np.asarray(positions, dtype=np.int64), side="right") - 1
+
+
+def _group_rows(y0: np.ndarray, y1: np.ndarray, tolerance: float) -> np.ndarray:
+    """Row id of every word: a new row starts wherever the sorted centres jump by more than tolerance."""
+    centres = (y0 + y1) / 2
+    order = np.argsort(centres, kind="stable")
+    breaks = np.diff(centres[order]) > tolerance
+    rows = np.empty(len(centres), dtype=np.int64)
+    rows[order] = np.concatenate(([0], np.cumsum(breaks)))
+    return rows
+
+
+def _numeric_columns(x1: np.ndarray, rows: np.ndarray, n_rows: int, tolerance: float) -> Optional[np.ndarray]:
+    """Right-edge centres of the numeric columns, or None when the words do not line up in columns."""
+    if len(x1) == 0:
+        return None
+    order = np.argsort(x1)
+    cluster = np.empty(len(x1), dtype=np.int64)
+    cluster[order] = np.concatenate(([0], np.cumsum(np.diff(x1[order]) > tolerance)))
+    n_clusters = cluster.max() + 1
+    counts = np.bincount(cluster, minlength=n_clusters)
+    distinct_rows = np.bincount(np.unique(cluster * n_rows + rows) // n_rows, minlength=n_clusters)
+    # A real column has at most one word per row and spans most of the table
+    columns = (counts == distinct_rows) & (distinct_rows >= max(MIN_COLUMN_ROWS, MIN_COLUMN_SUPPORT * n_rows))
+    if columns.sum() < 3:
+        return None
+    centres = np.bincount(cluster, weights=x1, minlength=n_clusters) / np.maximum(counts, 1)
+    return np.sort(centres[columns])
+
+
+def extract_table_items(words: Sequence[Sequence[Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Extract invoice line items from positioned words.
+
+    The table starts below the row holding the ``Item Quantity Rate Amount`` header and
+    ends at the first row with a stop word (Subtotal, Total, ...). The three rightmost
+    numeric columns are quantity, rate and amount; all other words of a row form the
+    item name, and rows without any column value continue the previous item's name.
+    When the numbers do not line up in columns (reflowed text) the last three words
+    of each row are used instead, like the line-based parser.
+
+    Args:
+        words: ``(x0, y0, x1, y1, text, ...)`` tuples, e.g. from ``page.get_text("words")``
+
+    Returns:
+        List of items with ``item``, ``quantity``, ``unit_price`` and ``amount`` keys,
+        or None when the page has no item table header
+    """
+    if not words:
+        return None
+    x0, y0, x1, y1, texts = list(zip(*words))[:5]
+    x0, y0, x1, y1 = (np.array(c, dtype=np.float64) for c in (x0, y0, x1, y1))
+    height = _median(y1 - y0) or 1.0
+    rows = _group_rows(y0, y1, ROW_TOLERANCE * height)
+    n_rows = int(rows.max()) + 1
+
+    joined = '\n'.join(texts)
+    starts = np.zeros(len(texts), dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))[:-1] + 1, out=starts[1:])
+
+    # Header row: one that contains all header words; stop row: first later row with a stop word
+    header_matches = [(m.start(), HEADER_WORDS.index(m.group())) for m in HEADER_RE.finditer(joined)]
+    if not header_matches:
+        return None
+    header_hits = np.zeros((n_rows, len(HEADER_WORDS)), dtype=bool)
+    positions, kinds = zip(*header_matches)
+    header_hits[rows[_word_index(starts, positions)], kinds] = True
+    is_header = header_hits.all(axis=1)
+    if not is_header.any():
+        return None
+    header = int(is_header.argmax())
+    stop_rows = rows[_word_index(starts, [m.start() for m in STOP_RE.finditer(joined)])]
+    stop_rows = stop_rows[stop_rows > header]
+    stop = int(stop_rows.min()) if len(stop_rows) else n_rows
+
+    body = np.flatnonzero((rows > header) & (rows < stop) & ~is_header[rows])
+    if len(body) == 0:
+        return []
+    # Reading order: by row, then left to right
+    body = body[np.lexsort((x0[body], rows[body]))]
+    body_words = [texts[i] for i in body.tolist()]
+    # Only the body words are parsed as numbers, with thousands separators dropped up front
+    numbers = NUMBER_RE.findall('\n'.join(body_words).replace(',', ''))
+    values = np.array([float(n) if n else np.nan for n in numbers], dtype=np.float64)
+    numeric = ~np.isnan(values)
+
+    # Body rows are sorted, so numbering them densely is a running count of row changes
+    body_rows = rows[body]
+    row_index = np.concatenate(([0], np.cumsum(body_rows[1:] != body_rows[:-1])))
+    n_body_rows = int(row_index[-1]) + 1
+    columns = _numeric_columns(x1[body][numeric], row_index[numeric], n_body_rows, COLUMN_TOLERANCE * height)
+    if columns is not None:
+        return _column_items(body_words, row_index, n_body_rows, x1[body], values, numeric,
+                             columns[-3:], COLUMN_TOLERANCE * height)
+    return _positional_items(body_words, row_index, n_body_rows, values)
+
+
+def _column_items(body_words, row_index, n_rows, x1, values, numeric, columns, tolerance) -> List[Dict[str, Any]]:
+    """Assign numeric words to the quantity/rate/amount columns; everything else is item text."""
+    distance = np.abs(x1[:, None] - columns[None, :])
+    nearest = distance.argmin(axis=1)
+    in_column = numeric & (distance[np.arange(len(body_words)), nearest] <= tolerance)
+
+    table = np.full((n_rows, 3), np.nan)
+    table[row_index[in_column], nearest[in_column]] = values[in_column]
+    has_value = np.zeros(n_rows, dtype=bool)
+    has_value[row_index[in_column]] = True
+
+    # Body words are in reading order, so each row's name words are one contiguous run
+    name_rows = row_index[~in_column]
+    name_words = [body_words[i] for i in np.flatnonzero(~in_column).tolist()]
+    bounds = np.searchsorted(name_rows, np.arange(n_rows + 1)).tolist()
+    cells = table.astype(object)
+    cells[np.isnan(table)] = None
+
+    items: List[Dict[str, Any]] = []
+    for r, ((quantity, unit_price, amount), row_has_value) in enumerate(zip(cells.tolist(), has_value.tolist())):
+        name = ' '.join(name_words[bounds[r]:bounds[r + 1]])
+        if row_has_value:
+            items.append({"item": name, "quantity": quantity, "unit_price": unit_price, "amount": amount})
+        elif items and name:
+            # Wrapped description line
+            items[-1]["item"] = f"{items[-1]['item']} {name}".strip()
+    return items
+
+
+def _positional_items(body_words, row_index, n_rows, values) -> List[Dict[str, Any]]:
+    """Fallback for unaligned rows: the last three words of a row are quantity, rate and amount."""
+    row_sizes = np.bincount(row_index, minlength=n_rows)
+    row_ends = np.cumsum(row_sizes)
+    cells = values.astype(object)
+    cells[np.isnan(values)] = None
+    cells = cells.tolist()
+    items = []
+    for start, end in zip((row_ends - row_sizes)[row_sizes >= 3].tolist(), row_ends[row_sizes >= 3].tolist()):
+        quantity, unit_price, amount = cells[end - 3:end]
+        items.append({
+            "item": ' '.join(body_words[start:end - 3]),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "amount": amount
+        })
+    return items
@@ -0,0 +1,28 @@
+"""
+OCR engines: long-lived, pooled Tesseract workers that take images in memory, and a
+batched EasyOCR backend with the same interface and result schema, all optionally
+backed by a persistent result cache.
+"""
+
+from .cache import OCRCache
+from .easyocr_engine import EasyOCREngine
+from .engine import (OCREngine, OCRWord, PytesseractEngine, create_engine, get_default_engine, get_engine,
+                     mean_confidence, parse_tsv, words_from_data)
+from .tesseract_capi import TessBaseAPI, TesseractAPIEngine, load_libtesseract
+
+__all__ = [
+    "EasyOCREngine",
+    "OCRCache",
+    "OCREngine",
+    "OCRWord",
+    "PytesseractEngine",
+    "TesseractAPIEngine",
+    "TessBaseAPI",
+    "create_engine",
+    "get_default_engine",
+    "get_engine",
+    "load_libtesseract",
+    "mean_confidence",
+    "parse_tsv",
+    "words_from_data",
+]
@@ -0,0 +1,128 @@
+"""
+Persistent cache of OCR results, keyed by the image pixels and everything that shapes the result.
+
+Identical pages are OCR'd again whenever a document is re-extracted or a script is
+re-run; looking the result up costs one hash of the image buffer instead.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ..utils.disk_cache import DiskCache
+
+DEFAULT_CACHE_PATH = os.path.join("data", "cache", "ocr.sqlite")
+DEFAULT_CACHE_BYTES = 128 * 1024 * 1024
+
+
+def image_digest(image: np.ndarray) -> str:
+    """
+    Fast content hash of an image buffer, including its shape and type.
+
+    Args:
+        image: Image array
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.shape}{image.dtype}".encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    OCR results stored in a size-bounded SQLite file with least-recently-used eviction.
+
+    The file is only opened on first use, so attaching a cache to an engine that never
+    runs costs nothing.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Set up the cache.
+
+        Args:
+            path: Path of the SQLite database file
+            max_bytes: Upper bound on the total size of stored results
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._store: Optional[DiskCache] = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> DiskCache:
+        """The underlying DiskCache, opened on first use."""
+        with self._lock:
+            if self._store is None:
+                self._store = DiskCache(self.path, self.max_bytes)
+            return self._store
+
+    def make_key(self, image: np.ndarray, engine: Dict[str, Any], output: str, config: str = "",
+                 dpi: Optional[int] = None, tier: Optional[str] = None) -> str:
+        """
+        Build the cache key of one OCR call.
+
+        Args:
+            image: Image as handed to the engine, before ``tier`` preprocessing
+            engine: Settings that identify the engine's results (see OCREngine.cache_identity)
+            output: "string", "data", "scored" or "words"
+            config: Tesseract options (page segmentation mode, language, variables)
+            dpi: Render resolution passed to the engine
+            tier: Preprocessing applied to the image before recognition, if any
+
+        Returns:
+            Hex digest
+        """
+        payload = json.dumps([image_digest(image), engine, output, config, dpi, tier], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, output: str) -> Optional[Any]:
+        """
+        Look up a result.
+
+        Args:
+            key: Cache key
+            output: Output the result was stored for
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        raw = self.store.get(key)
+        if raw is None:
+            return None
+        value = json.loads(raw.decode("utf-8"))
+        # JSON turns the (text, confidence) tuple into a list
+        return tuple(value) if output == "scored" else value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a result.
+
+        Args:
+            key: Cache key
+            value: OCR result (text, image_to_data dict, scored tuple or word list)
+        """
+        self.store.put(key, json.dumps(value).encode("utf-8"))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report entry count, stored bytes and hit/miss counters.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        return self.store.stats()
+
+    def close(self) -> None:
+        """Close the cache file if it was opened."""
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
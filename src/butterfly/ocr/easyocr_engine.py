@@ -0,0 +1,197 @@
+"""
+OCR through EasyOCR on the CPU, with pages batched through the detection network.
+
+EasyOCR's models are loaded once per engine. Pages passed to :meth:`EasyOCREngine.map`
+that share a size are detected together, one forward pass per batch of pages, and the
+text crops found on a page are recognized ``batch_size`` at a time; PyTorch spreads
+each pass over the CPU's cores, so the engine needs only one worker thread.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import OCRCache
+from .engine import TSV_COLUMNS, OCREngine, OCRData, Preprocess, as_array, words_from_data
+
+# Text crops recognized per forward pass
+DEFAULT_BATCH_SIZE = 16
+# Pages of the same size detected per forward pass
+DEFAULT_PAGES_PER_BATCH = 4
+
+# One EasyOCR result: four corner points, text, confidence (0-1)
+Detection = Tuple[Sequence[Sequence[float]], str, float]
+
+
+def _box(points: Sequence[Sequence[float]]) -> Tuple[int, int, int, int]:
+    """Axis-aligned (left, top, width, height) of a detection's corner points."""
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    left, top = int(min(xs)), int(min(ys))
+    return left, top, int(max(xs)) - left, int(max(ys)) - top
+
+
+def reading_order(detections: List[Detection]) -> List[List[Detection]]:
+    """
+    Group detections into lines, top to bottom and left to right within a line.
+
+    A detection joins a line when its vertical centre lies within the line's first box.
+
+    Args:
+        detections: EasyOCR results for one image
+
+    Returns:
+        Lines of detections
+    """
+    lines: List[List[Detection]] = []
+    for detection in sorted(detections, key=lambda d: _box(d[0])[1]):
+        _, top, _, height = _box(detection[0])
+        centre = top + height / 2
+        if lines:
+            _, line_top, _, line_height = _box(lines[-1][0][0])
+            if line_top <= centre <= line_top + line_height:
+                lines[-1].append(detection)
+                continue
+        lines.append([detection])
+    return [sorted(line, key=lambda d: _box(d[0])[0]) for line in lines]
+
+
+def detections_to_data(detections: List[Detection]) -> OCRData:
+    """
+    Convert EasyOCR results to the ``pytesseract.Output.DICT`` layout.
+
+    Each detection becomes one word row (level 5) of its own line, with its
+    confidence scaled to 0-100, in reading order.
+
+    Args:
+        detections: EasyOCR results for one image
+
+    Returns:
+        Dictionary mapping each column name to its list of values
+    """
+    data: OCRData = {column: [] for column in TSV_COLUMNS}
+    for line_num, line in enumerate(reading_order(detections), start=1):
+        for word_num, (points, text, conf) in enumerate(line, start=1):
+            left, top, width, height = _box(points)
+            row = (5, 1, line_num, 1, 1, word_num, left, top, width, height, int(round(conf * 100)), text)
+            for column, value in zip(TSV_COLUMNS, row):
+                data[column].append(value)
+    return data
+
+
+class EasyOCREngine(OCREngine):
+    """
+    OCR engine backed by an EasyOCR reader running on the CPU.
+
+    Tesseract options in ``config`` and the render ``dpi`` do not apply to EasyOCR and
+    are ignored. Results use the same layouts as the Tesseract engines, with one word
+    row per detected text fragment (EasyOCR often returns several words as one).
+    """
+
+    name = "easyocr"
+
+    def __init__(self, workers: Optional[int] = 1, lang: Sequence[str] = ("en",),
+                 batch_size: int = DEFAULT_BATCH_SIZE, pages_per_batch: int = DEFAULT_PAGES_PER_BATCH,
+                 model_dir: Optional[str] = None, reader: Any = None, cache: Optional[OCRCache] = None):
+        """
+        Load the models and start the worker pool.
+
+        Args:
+            workers: Number of concurrent batches (default: 1; PyTorch already uses every core)
+            lang: EasyOCR language codes
+            batch_size: Text crops recognized per forward pass
+            pages_per_batch: Same-sized pages detected per forward pass in map()
+            model_dir: Directory holding EasyOCR's model files (default: ~/.EasyOCR)
+            reader: Existing ``easyocr.Reader`` to use instead of loading the models
+            cache: OCRCache consulted before, and filled after, every recognition
+        """
+        if reader is None:
+            try:
+                import easyocr
+            except ImportError as e:
+                raise ImportError("The easyocr backend requires the easyocr package (pip install easyocr)") from e
+            reader = easyocr.Reader(list(lang), gpu=False, model_storage_directory=model_dir, verbose=False)
+        self.reader = reader
+        self.lang = list(lang)
+        self.batch_size = batch_size
+        self.pages_per_batch = max(1, pages_per_batch)
+        super().__init__(workers or 1, cache)
+
+    def cache_identity(self) -> Dict[str, Any]:
+        """Engine name and languages."""
+        return {"engine": self.name, "lang": self.lang}
+
+    def _detect(self, images: List[np.ndarray]) -> List[List[Detection]]:
+        """Run EasyOCR on images of one size, detecting them in a single batch."""
+        if len(images) == 1:
+            return [self.reader.readtext(images[0], batch_size=self.batch_size)]
+        return self.reader.readtext_batched(images, batch_size=self.batch_size)
+
+    @staticmethod
+    def _convert(detections: List[Detection], output: str) -> Any:
+        data = detections_to_data(detections)
+        if output == "data":
+            return data
+        if output == "words":
+            return words_from_data(data)
+        text = "\n".join(" ".join(d[1] for d in line) for line in reading_order(detections))
+        if output == "string":
+            return text
+        return text, (sum(d[2] for d in detections) * 100 / len(detections) if detections else None)
+
+    def _recognize_batch(self, images: List[np.ndarray], output: str) -> List[Any]:
+        return [self._convert(detections, output) for detections in self._detect(images)]
+
+    def _run_batch(self, images: List[np.ndarray], output: str, preprocess: Optional[Preprocess]) -> List[Any]:
+        """Look each image up in the cache and recognize the misses as one batch."""
+        keys, results = zip(*(self._cache_lookup(image, output, "", None, preprocess) for image in images))
+        results = list(results)
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            batch = [images[i] if preprocess is None else as_array(preprocess(images[i])) for i in misses]
+            for i, result in zip(misses, self._recognize_batch(batch, output)):
+                results[i] = result
+                if keys[i] is not None:
+                    self.cache.put(keys[i], result)
+        return results
+
+    def _recognize(self, image: np.ndarray, output: str, config: str, dpi: Optional[int]) -> Any:
+        return self._recognize_batch([image], output)[0]
+
+    def _run(self, image: np.ndarray, output: str, config: str, dpi: Optional[int],
+             preprocess: Optional[Preprocess] = None) -> Any:
+        # config and dpi do not affect EasyOCR, so they are left out of the cache key
+        return self._run_batch([image], output, preprocess)[0]
+
+    def map(self, images: Iterable[Any], output: str = "string", config: str = "",
+            dpi: Optional[int] = None, preprocess: Optional[Preprocess] = None) -> Iterator[Any]:
+        """
+        Recognize several images, detecting same-sized ones in batches of pages_per_batch.
+
+        Args:
+            images: PIL Images or NumPy arrays
+            output: "string", "data", "scored" or "words"
+            config: Ignored
+            dpi: Ignored
+            preprocess: Applied to each image before recognition (see OCREngine.submit)
+
+        Yields:
+            One result per image, in input order
+        """
+        self._check_output(output)
+        arrays = [as_array(image) for image in images]
+        by_shape: Dict[Tuple[int, ...], List[int]] = {}
+        for i, array in enumerate(arrays):
+            # Preprocessing keeps an image's size, so grouping by the input size is enough
+            by_shape.setdefault(array.shape, []).append(i)
+        # Index of each image -> (future of its batch, position in the batch)
+        slots = {}
+        for indices in by_shape.values():
+            for start in range(0, len(indices), self.pages_per_batch):
+                batch = indices[start:start + self.pages_per_batch]
+                future = self._executor.submit(self._run_batch, [arrays[i] for i in batch], output, preprocess)
+                for position, i in enumerate(batch):
+                    slots[i] = (future, position)
+        for i in range(len(arrays)):
+            future, position = slots[i]
+            yield future.result()[position]
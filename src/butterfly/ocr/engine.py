@@ -0,0 +1,434 @@
+"""
+OCR engine interface and the pytesseract-backed implementation.
+
+Every backend returns the same results: plain text, word boxes in the
+``pytesseract.Output.DICT`` layout, or words in the shared :data:`OCRWord` schema.
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .cache import DEFAULT_CACHE_PATH, OCRCache
+
+# Result of image_to_data: pytesseract.Output.DICT layout (one list per TSV column)
+OCRData = Dict[str, List[Any]]
+
+TSV_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+               "left", "top", "width", "height", "conf", "text")
+
+# One recognized word (or, for EasyOCR, text fragment):
+# {"text": str, "bbox": {"x", "y", "width", "height"} in pixels, "confidence": 0.0-1.0}
+OCRWord = Dict[str, Any]
+
+OUTPUTS = ("string", "data", "scored", "words")
+
+# Backends create_engine knows
+BACKENDS = ("capi", "pytesseract", "easyocr")
+
+# Image transformation run in the worker right before recognition, e.g. a binarization
+Preprocess = Callable[[np.ndarray], np.ndarray]
+
+
+def parse_tsv(tsv: str) -> OCRData:
+    """
+    Convert Tesseract TSV output to the ``pytesseract.Output.DICT`` layout.
+
+    Numeric columns are converted with ``int(float(value))`` exactly like pytesseract,
+    so confidences are integers.
+
+    Args:
+        tsv: TSV text, with or without the header row
+
+    Returns:
+        Dictionary mapping each column name to its list of values
+    """
+    data: OCRData = {column: [] for column in TSV_COLUMNS}
+    text_index = len(TSV_COLUMNS) - 1
+    for row in tsv.splitlines():
+        cells = row.split("\t")
+        if len(cells) < text_index or cells[0] == "level":
+            continue
+        cells += [""] * (len(TSV_COLUMNS) - len(cells))
+        for i, column in enumerate(TSV_COLUMNS):
+            value = cells[i]
+            if i != text_index:
+                try:
+                    value = int(float(value))
+                except ValueError:
+                    pass
+            data[column].append(value)
+    return data
+
+
+def mean_confidence(data: OCRData) -> Optional[float]:
+    """
+    Mean confidence (0-100) of the recognized words.
+
+    Args:
+        data: Result of ``image_to_data``
+
+    Returns:
+        Mean word confidence, or None if no words were recognized
+    """
+    confs = [conf for conf, text in zip(data["conf"], data["text"]) if conf >= 0 and str(text).strip()]
+    return sum(confs) / len(confs) if confs else None
+
+
+def text_from_data(data: OCRData) -> str:
+    """
+    Plain text of ``image_to_data`` output, laid out like ``image_to_string``.
+
+    Words are joined by spaces, lines by newlines and paragraphs by a blank line.
+
+    Args:
+        data: Result of ``image_to_data``
+
+    Returns:
+        Recognized text
+    """
+    lines: List[str] = []
+    last = None
+    for level, block, par, line, text in zip(data["level"], data["block_num"], data["par_num"],
+                                             data["line_num"], data["text"]):
+        if level != 5 or not str(text).strip():
+            continue
+        key = (block, par, line)
+        if key == last:
+            lines[-1] += f" {text}"
+            continue
+        if last is not None and key[:2] != last[:2]:
+            lines.append("")
+        lines.append(str(text))
+        last = key
+    return "\n".join(lines)
+
+
+def words_from_data(data: OCRData, min_confidence: float = -1) -> List[OCRWord]:
+    """
+    Convert ``image_to_data`` output to the shared word schema.
+
+    Args:
+        data: Result of ``image_to_data``
+        min_confidence: Keep only words whose confidence (0-100) is above this
+
+    Returns:
+        Words with their boxes and confidences (0-1), in the order of ``data``
+    """
+    words = []
+    for i, text in enumerate(data["text"]):
+        conf = int(data["conf"][i])
+        if conf > min_confidence and str(text).strip():
+            words.append({
+                "text": text,
+                "bbox": {"x": data["left"][i], "y": data["top"][i],
+                         "width": data["width"][i], "height": data["height"][i]},
+                "confidence": conf / 100.0,
+            })
+    return words
+
+
+class OCREngine(ABC):
+    """
+    Base class for OCR backends with a pool of long-lived worker threads.
+
+    Subclasses implement :meth:`_recognize`; calls can be made synchronously
+    (``image_to_string`` / ``image_to_data`` / ``image_to_words``) or submitted to the
+    pool (``submit`` / ``map``) so several pages are recognized concurrently. With a
+    ``cache``, every call first looks its result up by the image's content hash.
+    """
+
+    name = "base"
+
+    def __init__(self, workers: Optional[int] = None, cache: Optional[OCRCache] = None):
+        """
+        Start the worker pool.
+
+        Args:
+            workers: Number of concurrent OCR workers (default: one per CPU)
+            cache: OCRCache consulted before, and filled after, every recognition
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"ocr-{self.name}")
+
+    def cache_identity(self) -> Dict[str, Any]:
+        """Settings, besides the call's config, that decide this engine's results; part of cache keys."""
+        return {"engine": self.name}
+
+    @abstractmethod
+    def _recognize(self, image: np.ndarray, output: str, config: str, dpi: Optional[int]) -> Any:
+        """Run OCR in a worker thread; output is "string", "data" or "scored"."""
+
+    def _cache_lookup(self, image: np.ndarray, output: str, config: str, dpi: Optional[int],
+                      preprocess: Optional[Preprocess]) -> Tuple[Optional[str], Any]:
+        """Cache key of a call (None without a cache) and its cached result (None on a miss)."""
+        if self.cache is None:
+            return None, None
+        tier = f"{preprocess.__module__}.{preprocess.__qualname__}" if preprocess is not None else None
+        key = self.cache.make_key(image, self.cache_identity(), output, config, dpi, tier)
+        return key, self.cache.get(key, output)
+
+    def _run(self, image: np.ndarray, output: str, config: str, dpi: Optional[int],
+             preprocess: Optional[Preprocess] = None) -> Any:
+        key, result = self._cache_lookup(image, output, config, dpi, preprocess)
+        if result is not None:
+            return result
+        if preprocess is not None:
+            image = as_array(preprocess(image))
+        if output == "words":
+            result = words_from_data(self._recognize(image, "data", config, dpi))
+        else:
+            result = self._recognize(image, output, config, dpi)
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    @staticmethod
+    def _check_output(output: str) -> None:
+        if output not in OUTPUTS:
+            raise ValueError(f"Unsupported OCR output: {output}")
+
+    def submit(self, image: Any, output: str = "string", config: str = "", dpi: Optional[int] = None,
+               preprocess: Optional[Preprocess] = None) -> Future:
+        """
+        Queue an image for recognition.
+
+        Args:
+            image: PIL Image or NumPy array (grayscale, RGB or RGBA)
+            output: "string" for plain text, "data" for word boxes, "scored" for
+                ``(text, mean confidence)``, "words" for a list of :data:`OCRWord`
+            config: Tesseract command-line style options, e.g. "--psm 6"
+            dpi: Resolution the image was rendered at, if known
+            preprocess: Module-level function applied to the image in the worker before
+                recognition; cache hits skip it, since results are keyed by the image as
+                given plus the function's name
+
+        Returns:
+            Future resolving to a string, an :data:`OCRData` dict, a tuple or a list
+        """
+        self._check_output(output)
+        return self._executor.submit(self._run, as_array(image), output, config, dpi, preprocess)
+
+    def map(self, images: Iterable[Any], output: str = "string", config: str = "",
+            dpi: Optional[int] = None, preprocess: Optional[Preprocess] = None) -> Iterator[Any]:
+        """
+        Recognize several images concurrently, yielding results in input order.
+
+        Args:
+            images: PIL Images or NumPy arrays
+            output: "string", "data", "scored" or "words"
+            config: Tesseract options
+            dpi: Render resolution, if known
+            preprocess: Applied to each image before recognition (see submit)
+
+        Yields:
+            One result per image
+        """
+        futures = [self.submit(image, output, config, dpi, preprocess) for image in images]
+        for future in futures:
+            yield future.result()
+
+    def image_to_string(self, image: Any, config: str = "", dpi: Optional[int] = None,
+                        preprocess: Optional[Preprocess] = None) -> str:
+        """
+        Recognize the text of an image.
+
+        Args:
+            image: PIL Image or NumPy array
+            config: Tesseract options
+            dpi: Render resolution, if known
+            preprocess: Applied to the image before recognition (see submit)
+
+        Returns:
+            Recognized text
+        """
+        return self.submit(image, "string", config, dpi, preprocess).result()
+
+    def image_to_data(self, image: Any, config: str = "", dpi: Optional[int] = None,
+                      preprocess: Optional[Preprocess] = None) -> OCRData:
+        """
+        Recognize the words of an image with their boxes and confidences.
+
+        Args:
+            image: PIL Image or NumPy array
+            config: Tesseract options
+            dpi: Render resolution, if known
+            preprocess: Applied to the image before recognition (see submit)
+
+        Returns:
+            Dictionary in the ``pytesseract.Output.DICT`` layout
+        """
+        return self.submit(image, "data", config, dpi, preprocess).result()
+
+    def image_to_scored_string(self, image: Any, config: str = "", dpi: Optional[int] = None,
+                               preprocess: Optional[Preprocess] = None) -> Tuple[str, Optional[float]]:
+        """
+        Recognize the text of an image together with Tesseract's confidence in it.
+
+        Args:
+            image: PIL Image or NumPy array
+            config: Tesseract options
+            dpi: Render resolution, if known
+            preprocess: Applied to the image before recognition (see submit)
+
+        Returns:
+            Recognized text and mean word confidence (None if no words were found)
+        """
+        return self.submit(image, "scored", config, dpi, preprocess).result()
+
+    def image_to_words(self, image: Any, config: str = "", dpi: Optional[int] = None,
+                       min_confidence: float = -1) -> List[OCRWord]:
+        """
+        Recognize the words of an image in the shared word schema.
+
+        Args:
+            image: PIL Image or NumPy array
+            config: Tesseract options
+            dpi: Render resolution, if known
+            min_confidence: Keep only words whose confidence (0-100) is above this
+
+        Returns:
+            Words with their boxes and confidences (0-1)
+        """
+        words = self.submit(image, "words", config, dpi).result()
+        return [word for word in words if word["confidence"] > min_confidence / 100]
+
+    def close(self) -> None:
+        """Stop the worker pool and close the cache."""
+        self._executor.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self) -> "OCREngine":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def as_array(image: Any) -> np.ndarray:
+    """
+    Return an image as a C-contiguous uint8 array without copying when possible.
+
+    Args:
+        image: PIL Image or NumPy array
+
+    Returns:
+        2D (grayscale) or 3D (RGB/RGBA) uint8 array
+    """
+    if isinstance(image, Image.Image):
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        image = np.asarray(image)
+    array = np.ascontiguousarray(image, dtype=np.uint8)
+    if array.ndim not in (2, 3):
+        raise ValueError(f"Unsupported image shape: {array.shape}")
+    return array
+
+
+class PytesseractEngine(OCREngine):
+    """
+    Engine that calls the ``tesseract`` executable through pytesseract.
+
+    Every call still starts a process and reloads the model; this is the fallback
+    when libtesseract cannot be loaded. The pool only adds concurrency.
+    """
+
+    name = "pytesseract"
+
+    def _recognize(self, image: np.ndarray, output: str, config: str, dpi: Optional[int]) -> Any:
+        import pytesseract
+
+        if dpi:
+            config = f"{config} --dpi {dpi}".strip()
+        if output == "string":
+            return pytesseract.image_to_string(image, config=config)
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+        if output == "data":
+            return data
+        # Text and confidence both come from the one run; a second process per page would double the cost
+        return text_from_data(data), mean_confidence(data)
+
+
+_engines: Dict[Optional[str], OCREngine] = {}
+_engines_pid: Optional[int] = None
+_engines_lock = threading.Lock()
+
+
+def get_engine(backend: Optional[str] = None) -> OCREngine:
+    """
+    Return the process-wide engine for a backend, creating it on first use.
+
+    ``BUTTERFLY_OCR_WORKERS`` sets the pool size. Results are cached in
+    ``data/cache/ocr.sqlite``, or the file ``BUTTERFLY_OCR_CACHE`` names ("off" disables
+    the cache). Forked worker processes get their own engines, since the parent's
+    threads and cache connection do not survive a fork.
+
+    Args:
+        backend: "capi", "pytesseract", "easyocr", or None to prefer the C API
+
+    Returns:
+        Shared OCREngine instance
+    """
+    global _engines_pid
+    with _engines_lock:
+        if _engines_pid != os.getpid():
+            _engines.clear()
+            _engines_pid = os.getpid()
+        engine = _engines.get(backend)
+        if engine is None:
+            cache_path = os.getenv("BUTTERFLY_OCR_CACHE", DEFAULT_CACHE_PATH)
+            cache = OCRCache(cache_path) if cache_path.lower() not in ("", "off") else None
+            engine = _engines[backend] = create_engine(backend, int(os.getenv("BUTTERFLY_OCR_WORKERS", "0")) or None,
+                                                       cache)
+        return engine
+
+
+def get_default_engine() -> OCREngine:
+    """
+    Return the process-wide OCR engine, creating it on first use.
+
+    The Tesseract C API pool is used when libtesseract can be loaded, the pytesseract
+    engine otherwise. ``BUTTERFLY_OCR_ENGINE`` ("capi", "pytesseract" or "easyocr")
+    forces a backend and ``BUTTERFLY_OCR_WORKERS`` sets the pool size.
+
+    Returns:
+        Shared OCREngine instance
+    """
+    return get_engine(os.getenv("BUTTERFLY_OCR_ENGINE") or None)
+
+
+def create_engine(backend: Optional[str] = None, workers: Optional[int] = None,
+                  cache: Optional[OCRCache] = None, **kwargs) -> OCREngine:
+    """
+    Create an OCR engine.
+
+    Args:
+        backend: "capi", "pytesseract", "easyocr", or None to prefer the C API when available
+        workers: Pool size (default: one per CPU; one for EasyOCR, which batches instead)
+        cache: OCRCache for the engine's results (default: none)
+        **kwargs: Backend options, e.g. ``lang`` or ``tessdata_dir`` for the C API,
+            ``lang`` or ``batch_size`` for EasyOCR
+
+    Returns:
+        New OCREngine
+    """
+    from .tesseract_capi import TesseractAPIEngine, load_libtesseract
+
+    if backend == "easyocr":
+        from .easyocr_engine import EasyOCREngine
+
+        return EasyOCREngine(workers, cache=cache, **kwargs)
+    if backend == "pytesseract":
+        return PytesseractEngine(workers, cache)
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {backend}")
+    if backend == "capi" or load_libtesseract() is not None:
+        return TesseractAPIEngine(workers, cache=cache, **kwargs)
+    return PytesseractEngine(workers, cache)
@@ -0,0 +1,271 @@
+"""
+OCR through the libtesseract C API, with one long-lived TessBaseAPI per worker thread.
+
+The model is loaded once per worker instead of once per call, images are handed over
+as pointers to NumPy buffers instead of temporary files, and ctypes releases the GIL
+while Tesseract runs, so workers recognize pages in parallel.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import shlex
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .cache import OCRCache
+from .engine import OCREngine, parse_tsv
+
+# Page segmentation mode Tesseract uses when --psm is not given
+PSM_AUTO = 3
+
+_LIBRARY_CANDIDATES = (
+    "libtesseract.so.5", "libtesseract.so.4", "libtesseract.so",
+    "/opt/homebrew/lib/libtesseract.dylib", "/usr/local/lib/libtesseract.dylib",
+)
+
+_lib: Optional[ctypes.CDLL] = None
+_lib_loaded = False
+_lib_lock = threading.Lock()
+
+
+def _declare(lib: ctypes.CDLL) -> None:
+    """Set argument and return types of the C API functions that are used."""
+    handle, text = ctypes.c_void_p, ctypes.c_char_p
+    signatures = {
+        "TessVersion": ([], text),
+        "TessBaseAPICreate": ([], handle),
+        "TessBaseAPIDelete": ([handle], None),
+        "TessBaseAPIEnd": ([handle], None),
+        "TessBaseAPIInit2": ([handle, text, text, ctypes.c_int], ctypes.c_int),
+        "TessBaseAPISetVariable": ([handle, text, text], ctypes.c_int),
+        "TessBaseAPISetPageSegMode": ([handle, ctypes.c_int], None),
+        "TessBaseAPISetImage": ([handle, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int], None),
+        "TessBaseAPISetSourceResolution": ([handle, ctypes.c_int], None),
+        "TessBaseAPIRecognize": ([handle, ctypes.c_void_p], ctypes.c_int),
+        "TessBaseAPIGetUTF8Text": ([handle], ctypes.c_void_p),
+        "TessBaseAPIGetTsvText": ([handle, ctypes.c_int], ctypes.c_void_p),
+        "TessBaseAPIMeanTextConf": ([handle], ctypes.c_int),
+        "TessBaseAPIClear": ([handle], None),
+        "TessDeleteText": ([ctypes.c_void_p], None),
+    }
+    for name, (argtypes, restype) in signatures.items():
+        function = getattr(lib, name)
+        function.argtypes = argtypes
+        function.restype = restype
+
+
+def load_libtesseract() -> Optional[ctypes.CDLL]:
+    """
+    Load libtesseract once per process.
+
+    ``TESSERACT_LIBRARY`` may point at the shared library explicitly.
+
+    Returns:
+        The loaded library, or None if it is not installed
+    """
+    global _lib, _lib_loaded
+    with _lib_lock:
+        if _lib_loaded:
+            return _lib
+        _lib_loaded = True
+        candidates = [os.getenv("TESSERACT_LIBRARY"), ctypes.util.find_library("tesseract"), *_LIBRARY_CANDIDATES]
+        for candidate in filter(None, candidates):
+            try:
+                lib = ctypes.CDLL(candidate)
+                _declare(lib)
+            except (OSError, AttributeError):
+                continue
+            _lib = lib
+            break
+        return _lib
+
+
+def parse_config(config: str) -> Tuple[Optional[str], Optional[int], int, Dict[str, str]]:
+    """
+    Split a pytesseract-style config string into its parts.
+
+    Args:
+        config: Options such as ``"-l eng --oem 1 --psm 6 -c preserve_interword_spaces=1"``
+
+    Returns:
+        (lang, oem, psm, variables); lang and oem are None when not given
+    """
+    lang, oem, psm, variables = None, None, PSM_AUTO, {}
+    tokens = shlex.split(config)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if token == "-l":
+            lang, i = value, i + 2
+        elif token == "--oem":
+            oem, i = int(value), i + 2
+        elif token == "--psm":
+            psm, i = int(value), i + 2
+        elif token == "-c" and "=" in value:
+            name, _, setting = value.partition("=")
+            variables[name] = setting
+            i += 2
+        else:
+            # Options that only make sense for the executable (e.g. --tessdata-dir) are ignored
+            i += 1
+    return lang, oem, psm, variables
+
+
+class TessBaseAPI:
+    """
+    One initialized Tesseract instance with its model loaded; not thread-safe.
+    """
+
+    def __init__(self, lang: str = "eng", oem: Optional[int] = None, tessdata_dir: Optional[str] = None,
+                 psm: int = PSM_AUTO, variables: Optional[Dict[str, str]] = None):
+        """
+        Create the instance and load the language model.
+
+        Args:
+            lang: Tesseract language(s), e.g. "eng" or "eng+deu"
+            oem: OCR engine mode (default: Tesseract's default)
+            tessdata_dir: Directory containing traineddata files (default: TESSDATA_PREFIX)
+            psm: Page segmentation mode
+            variables: Tesseract variables to set, as with ``-c name=value``
+        """
+        self._lib = load_libtesseract()
+        if self._lib is None:
+            raise OSError("libtesseract could not be loaded; set TESSERACT_LIBRARY or use the pytesseract engine")
+        self._handle = self._lib.TessBaseAPICreate()
+        datapath = os.fsencode(tessdata_dir) if tessdata_dir else None
+        if self._lib.TessBaseAPIInit2(self._handle, datapath, lang.encode(), 3 if oem is None else oem) != 0:
+            self._lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+            raise RuntimeError(f"Tesseract could not load language '{lang}' (check TESSDATA_PREFIX)")
+        # Keep diagnostics such as "Estimating resolution" off stderr, as the executable's are
+        for name, value in dict({"debug_file": os.devnull}, **(variables or {})).items():
+            self._lib.TessBaseAPISetVariable(self._handle, name.encode(), value.encode())
+        self._lib.TessBaseAPISetPageSegMode(self._handle, psm)
+
+    def recognize(self, image: np.ndarray, dpi: Optional[int] = None) -> None:
+        """
+        Run recognition on a uint8 grayscale, RGB or RGBA array.
+
+        Args:
+            image: C-contiguous image array; it is read in place, not copied
+            dpi: Resolution the image was rendered at, if known
+        """
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        self._lib.TessBaseAPISetImage(self._handle, image.ctypes.data, width, height, channels, image.strides[0])
+        if dpi:
+            self._lib.TessBaseAPISetSourceResolution(self._handle, int(dpi))
+        if self._lib.TessBaseAPIRecognize(self._handle, None) != 0:
+            raise RuntimeError("Tesseract recognition failed")
+
+    def _take_text(self, pointer: Optional[int]) -> str:
+        if not pointer:
+            return ""
+        try:
+            return ctypes.string_at(pointer).decode("utf-8", errors="replace")
+        finally:
+            self._lib.TessDeleteText(pointer)
+
+    def get_text(self) -> str:
+        """Text of the last recognized image."""
+        return self._take_text(self._lib.TessBaseAPIGetUTF8Text(self._handle))
+
+    def get_tsv(self) -> str:
+        """Word boxes of the last recognized image as Tesseract TSV (without header)."""
+        return self._take_text(self._lib.TessBaseAPIGetTsvText(self._handle, 0))
+
+    def mean_confidence(self) -> int:
+        """Mean word confidence (0-100) of the last recognized image."""
+        return self._lib.TessBaseAPIMeanTextConf(self._handle)
+
+    def clear(self) -> None:
+        """Free the last image and its results, keeping the model loaded."""
+        self._lib.TessBaseAPIClear(self._handle)
+
+    def close(self) -> None:
+        """Release the instance and its model."""
+        if self._handle:
+            self._lib.TessBaseAPIEnd(self._handle)
+            self._lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class TesseractAPIEngine(OCREngine):
+    """
+    OCR engine backed by a pool of threads that each keep TessBaseAPI instances loaded.
+
+    Language and OCR engine mode come from the engine (or ``-l``/``--oem`` in a call's
+    config); every distinct config gets its own long-lived instance per worker, so
+    per-call options never leak into other calls.
+    """
+
+    name = "capi"
+
+    def __init__(self, workers: Optional[int] = None, lang: str = "eng", tessdata_dir: Optional[str] = None,
+                 cache: Optional[OCRCache] = None):
+        """
+        Start the worker pool.
+
+        Args:
+            workers: Number of concurrent workers (default: one per CPU)
+            lang: Default Tesseract language
+            tessdata_dir: Directory containing traineddata files (default: TESSDATA_PREFIX)
+            cache: OCRCache consulted before, and filled after, every recognition
+        """
+        if load_libtesseract() is None:
+            raise OSError("libtesseract could not be loaded; set TESSERACT_LIBRARY or use the pytesseract engine")
+        self.lang = lang
+        self.tessdata_dir = tessdata_dir
+        self._local = threading.local()
+        self._instances = []
+        self._instances_lock = threading.Lock()
+        super().__init__(workers, cache)
+
+    def cache_identity(self) -> Dict[str, Any]:
+        """Engine name, default language and Tesseract version."""
+        return {"engine": self.name, "lang": self.lang, "version": load_libtesseract().TessVersion().decode()}
+
+    def _api(self, config: str) -> TessBaseAPI:
+        """The calling worker's instance for a config, created on first use."""
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        api = apis.get(config)
+        if api is None:
+            lang, oem, psm, variables = parse_config(config)
+            api = TessBaseAPI(lang or self.lang, oem, self.tessdata_dir, psm, variables)
+            apis[config] = api
+            with self._instances_lock:
+                self._instances.append(api)
+        return api
+
+    def _recognize(self, image: np.ndarray, output: str, config: str, dpi: Optional[int]) -> Any:
+        api = self._api(config)
+        try:
+            api.recognize(image, dpi)
+            if output == "data":
+                return parse_tsv(api.get_tsv())
+            text = api.get_text()
+            if output == "string":
+                return text
+            return text, (api.mean_confidence() if text.strip() else None)
+        finally:
+            api.clear()
+
+    def close(self) -> None:
+        """Stop the pool and unload every worker's model."""
+        super().close()
+        with self._instances_lock:
+            for api in self._instances:
+                api.close()
+            self._instances.clear()
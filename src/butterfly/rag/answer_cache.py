@@ -0,0 +1,128 @@
+"""In-memory cache of PDFRAGSystem answers, looked up by question text and question embedding.
+
+A question is first looked up by its normalized text (case, whitespace and punctuation
+folded), then by the cosine similarity of its embedding to the cached questions. Entries
+expire after a TTL, the least recently used are evicted beyond max_entries, and the whole
+cache is dropped when the vector index changes, so answers are never older than the corpus.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 1000
+
+# Numbers and names decide what an invoice question is about, but barely move its embedding
+# ("total for Aaron Hawkins" vs "total for Aaron Bergman"), so similar questions must share them
+KEY_TERM_RE = re.compile(r"\d[\d,.]*|(?<=\s)[A-Z][\w'-]*")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s$#.-]|(?<!\d)\.|\.(?!\d)", " ", question.lower()).split())
+
+
+def key_terms(question: str) -> frozenset:
+    """Numbers and capitalized words (after the first word) of a question."""
+    return frozenset(term.rstrip(".,").lower() for term in KEY_TERM_RE.findall(question.strip()))
+
+
+class AnswerCache:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Cache up to max_entries answers for ttl_seconds; threshold is the cosine similarity of a near match."""
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.index_version = None
+        # normalized question -> (result, unit vector or None, key terms, time stored), least recently used first
+        self._entries: "OrderedDict[str, Tuple[Dict, Optional[np.ndarray], frozenset, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, question: str, index_version: int,
+            embed_query: Optional[Callable[[str], List[float]]] = None) -> Tuple[Optional[Dict], Optional[List[float]]]:
+        """Cached result for question and, on a miss, its embedding, for retrieval and put to reuse."""
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version(index_version)
+            entry = self._live_entry(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["exact_hits"] += 1
+                return dict(entry[0], cached="exact"), None
+        if embed_query is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None, None
+        # Embed outside the lock; the query embedding is the slow part of a lookup
+        vector = embed_query(question)
+        unit = _unit(vector)
+        terms = key_terms(question)
+        with self._lock:
+            self._check_version(index_version)
+            keys = [k for k, (_, v, t, _) in self._entries.items() if v is not None and t == terms]
+            keys = [k for k in keys if self._live_entry(k) is not None]
+            if keys:
+                similarities = np.stack([self._entries[k][1] for k in keys]) @ unit
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self._stats["similar_hits"] += 1
+                    return dict(self._entries[keys[best]][0], cached="similar"), vector
+            self._stats["misses"] += 1
+        return None, vector
+
+    def put(self, question: str, result: Dict, index_version: int, vector: Optional[List[float]] = None) -> None:
+        """Store the result of question, answered against the index at index_version, with its embedding."""
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version(index_version)
+            if index_version != self.index_version:
+                return
+            self._entries[key] = (dict(result, sources=list(result.get("sources", []))),
+                                  None if vector is None else _unit(vector),
+                                  key_terms(question), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Entries, exact and similar hits, misses, the hit rate and index-change invalidations."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["similar_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _check_version(self, index_version: int) -> None:
+        """Drop all entries once the index moves on; the caller holds the lock."""
+        if self.index_version is None or index_version > self.index_version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self.index_version = index_version
+
+    def _live_entry(self, key: str):
+        """The entry for key unless it expired (then it is dropped); the caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[3] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        return entry
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
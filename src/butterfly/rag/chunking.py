@@ -0,0 +1,115 @@
+"""Pluggable chunking of page texts for the vector store.
+
+A chunker turns one page's text into (chunk text, extra metadata) pairs:
+
+- "recursive": LangChain's RecursiveCharacterTextSplitter with overlapping windows,
+  for arbitrary documents.
+- "invoice": one header chunk per invoice page (a summary line with the fields
+  FieldExtractor finds, as PDFDataExtractor stores them, the non-table lines and
+  as many line items as fit) and blocks of whole line-item rows under the table
+  header for the rest. Chunks follow the invoice's structure, so they need no
+  overlap. Pages without an item table fall back to recursive splitting.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from butterfly.rag.field_extractor import ITEM_HEADER_WORDS, FieldExtractor
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Lines that end an invoice's item table, as in FieldExtractor._line_items
+TABLE_STOP_WORDS = ("Total", "Subtotal", "Notes", "Terms", "Shipping", "Discount")
+
+Chunk = Tuple[str, Dict]
+
+
+class RecursiveChunker:
+    name = "recursive"
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        """Split text into windows of up to chunk_size characters that overlap by chunk_overlap."""
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                                       length_function=len)
+
+    def settings(self) -> Dict:
+        """Everything that shapes the chunks; part of the persisted index's manifest."""
+        return {"name": self.name, "chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap}
+
+    def chunk_page(self, text: str, filename: Optional[str] = None) -> List[Chunk]:
+        """Chunks of one page's text, without extra metadata."""
+        return [(chunk, {}) for chunk in self.splitter.split_text(text)]
+
+
+class InvoiceChunker:
+    name = "invoice"
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, fallback_overlap: int = CHUNK_OVERLAP):
+        """Chunk invoice pages along their structure into chunks of up to chunk_size characters.
+
+        fallback_overlap is the overlap used for pages that are split recursively
+        because no item table was found on them.
+        """
+        self.chunk_size = chunk_size
+        self.fields = FieldExtractor()
+        self.fallback = RecursiveChunker(chunk_size, fallback_overlap)
+        # Oversized header sections are still cut at chunk_size, but structure-aligned pieces need no overlap
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0, length_function=len)
+
+    def settings(self) -> Dict:
+        """Everything that shapes the chunks; part of the persisted index's manifest."""
+        return {"name": self.name, "chunk_size": self.chunk_size, "fallback": self.fallback.settings()}
+
+    def chunk_page(self, text: str, filename: Optional[str] = None) -> List[Chunk]:
+        """A header chunk and line-item blocks of one invoice page, with its fields as metadata."""
+        lines = [line for line in text.split("\n") if line.strip()]
+        header = next((i for i, line in enumerate(lines) if all(word in line for word in ITEM_HEADER_WORDS)), None)
+        if header is None:
+            return self.fallback.chunk_page(text, filename)
+        end = next((i for i in range(header + 1, len(lines))
+                    if any(word in lines[i] for word in TABLE_STOP_WORDS)), len(lines))
+
+        fields = self.fields.extract(lines, filename)
+        metadata = {"invoice_number": fields["invoice_number"], "customer_name": fields["customer_name"],
+                    "date": fields["date"], "amount": fields["amount"]}
+        summary = (f"Invoice #{fields['invoice_number']} for {fields['customer_name']}, dated {fields['date']}, "
+                   f"total ${fields['amount']:.2f}, {len(fields['items'])} line items.")
+        # The header chunk takes the first rows that fit after the invoice's other lines, so
+        # an invoice that fits in one chunk stays one chunk
+        header_lines = [summary] + lines[:header] + lines[end:] + [lines[header]]
+        rows = lines[header + 1:end]
+        size = sum(len(line) + 1 for line in header_lines)
+        taken = 0
+        while taken < len(rows) and size + len(rows[taken]) + 1 <= self.chunk_size:
+            size += len(rows[taken]) + 1
+            taken += 1
+        chunks = [(piece, dict(metadata, kind="header"))
+                  for piece in self.splitter.split_text("\n".join(header_lines + rows[:taken]))]
+
+        # Every block repeats who the rows belong to and the column names, so it stands on its own
+        context = f"Invoice #{fields['invoice_number']} ({fields['customer_name']}, {fields['date']}) line items:\n" \
+                  f"{lines[header]}"
+        block: List[str] = []
+        size = len(context)
+        for row in rows[taken:]:
+            if block and size + 1 + len(row) > self.chunk_size:
+                chunks.append(("\n".join([context] + block), dict(metadata, kind="items")))
+                block, size = [], len(context)
+            block.append(row)
+            size += 1 + len(row)
+        if block:
+            chunks.append(("\n".join([context] + block), dict(metadata, kind="items")))
+        return chunks
+
+
+CHUNKERS = {RecursiveChunker.name: RecursiveChunker, InvoiceChunker.name: InvoiceChunker}
+
+
+def get_chunker(name: str):
+    """Create a chunker by name ("recursive" or "invoice") with its default settings."""
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {name} (expected one of {', '.join(CHUNKERS)})")
+    return CHUNKERS[name]()
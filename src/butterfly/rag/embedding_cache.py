@@ -0,0 +1,101 @@
+"""Persistent cache of chunk embeddings keyed by embedding model and chunk text hash.
+
+Invoice chunks repeat verbatim across documents (terms, footers, ship-mode text), so
+a chunk is only sent to the embedding model the first time any document contains it.
+Vectors are stored as raw float16 (or float32) bytes in a size-bounded SQLite file.
+"""
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from butterfly.utils.disk_cache import DiskCache
+
+DEFAULT_CACHE_PATH = os.path.join("data", "cache", "embeddings.sqlite")
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+VECTOR_DTYPES = ("float16", "float32")
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_BYTES,
+                 dtype: str = "float16"):
+        """Open a persistent embedding cache; float16 halves the size at ~1e-3 relative precision."""
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.store = DiskCache(path, max_bytes)
+        self.dtype = dtype
+
+    def make_key(self, model: str, text: str) -> str:
+        """Cache key of one chunk's embedding under one model (and storage type)."""
+        return f"{model}:{self.dtype}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors of texts, None for the ones that were never embedded (or got evicted)."""
+        keys = [self.make_key(model, text) for text in texts]
+        found = self.store.get_many(keys)
+        return [np.frombuffer(found[key], dtype=self.dtype).astype(np.float32).tolist() if key in found else None
+                for key in keys]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """Store the vectors of texts."""
+        self.store.put_many({self.make_key(model, text): np.asarray(vector, dtype=self.dtype).tobytes()
+                             for text, vector in zip(texts, vectors)})
+
+    def stats(self) -> Dict[str, int]:
+        """Return entry count, stored bytes and hit/miss counters."""
+        return self.store.stats()
+
+    def close(self):
+        """Close the underlying cache file."""
+        self.store.close()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str):
+        """Serve embed_documents from the cache, sending only unseen chunks to `embeddings`.
+
+        Queries are not cached: they are one-offs and are embedded directly.
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+        self._lock = threading.Lock()
+        self._stats = {"chunks": 0, "hits": 0, "embedded": 0, "bytes_saved": 0}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors; repeats within one call are embedded once."""
+        vectors = self.cache.get_many(self.model, texts)
+        misses = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if misses:
+            embedded = dict(zip(misses, self.embeddings.embed_documents(misses)))
+            self.cache.put_many(self.model, misses, [embedded[text] for text in misses])
+            vectors = [vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)]
+        with self._lock:
+            self._stats["chunks"] += len(texts)
+            self._stats["embedded"] += len(misses)
+            self._stats["hits"] += len(texts) - len(misses)
+            # Request payload (chunk text) that never had to go to the embedding model
+            self._stats["bytes_saved"] += sum(len(text.encode("utf-8")) for text in texts) - \
+                sum(len(text.encode("utf-8")) for text in misses)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query directly."""
+        return self.embeddings.embed_query(text)
+
+    def stats(self) -> Dict:
+        """Chunks requested, served from the cache and embedded, the hit rate and the text bytes not sent."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = round(stats["hits"] / stats["chunks"], 3) if stats["chunks"] else 0.0
+        if hasattr(self.embeddings, "stats"):
+            stats["client"] = self.embeddings.stats()
+        return stats
+
+    def reset_stats(self) -> None:
+        """Start counting a new indexing run."""
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
@@ -0,0 +1,168 @@
+"""Batched, concurrent embedding client for Ollama's /api/embed endpoint.
+
+Texts are sent in batches of batch_size, at most max_in_flight requests at a time,
+over keep-alive connections that are reused between requests. Connection errors,
+429 and 5xx responses are retried with exponential backoff. The client implements
+LangChain's Embeddings interface, so FAISS and the retrievers use it directly.
+"""
+import http.client
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF_SECONDS = 0.5
+DEFAULT_TIMEOUT_SECONDS = 120.0
+
+# Responses worth retrying: the server is overloaded or restarting, not rejecting the request
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EmbeddingError(RuntimeError):
+    """An embedding request failed for good (rejected, or still failing after every retry)."""
+
+
+class _RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OllamaEmbeddingClient(Embeddings):
+    def __init__(self, model: str = "nomic-embed-text", base_url: str = "http://localhost:11434",
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 retries: int = DEFAULT_RETRIES, backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS, keep_alive: Optional[str] = None):
+        """Set up the client; no connection is opened until the first request.
+
+        retries is the number of extra attempts per batch; the wait before attempt n is
+        backoff_seconds * 2**(n - 1), or the server's Retry-After if it sends one.
+        keep_alive is passed to Ollama to control how long it keeps the model loaded.
+        """
+        url = urlsplit(base_url)
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self._connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self._host, self._port = url.hostname or "localhost", url.port
+        self._path = url.path.rstrip("/") + "/api/embed"
+        # Idle keep-alive connections; at most max_in_flight exist since each request holds one
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"chunks": 0, "batches": 0, "requests": 0, "retries": 0, "connections": 0, "seconds": 0.0}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches, several batches at a time; vectors come back in input order."""
+        if not texts:
+            return []
+        start = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            vectors = self._embed_batch(batches[0])
+        else:
+            vectors = [vector for batch in self._pool().map(self._embed_batch, batches) for vector in batch]
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats["seconds"] += elapsed
+        logging.info(f"[OllamaEmbeddingClient] Embedded {len(texts)} chunks in {len(batches)} batches, "
+                     f"{len(texts) / elapsed if elapsed else 0:.1f} chunks/s")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query text."""
+        return self._embed_batch([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        """Chunks, batches, requests, retries and connections so far, with overall throughput (chunks/s)."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["chunks_per_s"] = round(stats["chunks"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        stats["seconds"] = round(stats["seconds"], 3)
+        return stats
+
+    def close(self) -> None:
+        """Stop the request threads and close the idle connections."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                    thread_name_prefix="ollama-embed")
+            return self._executor
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        payload = {"model": self.model, "input": texts}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in range(self.retries + 1):
+            try:
+                vectors = self._post(body)["embeddings"]
+                break
+            except _RetryableError as e:
+                if attempt == self.retries:
+                    raise EmbeddingError(f"Embedding request failed after {attempt + 1} attempts: {e}") from e
+                delay = e.retry_after if e.retry_after is not None else self.backoff_seconds * 2 ** attempt
+                logging.warning(f"[OllamaEmbeddingClient] {e}; retrying in {delay:.2f}s")
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(delay)
+        if len(vectors) != len(texts):
+            raise EmbeddingError(f"Ollama returned {len(vectors)} embeddings for {len(texts)} texts")
+        with self._lock:
+            self._stats["chunks"] += len(texts)
+            self._stats["batches"] += 1
+        return vectors
+
+    def _post(self, body: bytes) -> Dict:
+        """Send one request over an idle connection (or a new one) and decode the response."""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connection_class(self._host, self._port, timeout=self.timeout)
+            with self._lock:
+                self._stats["connections"] += 1
+        with self._lock:
+            self._stats["requests"] += 1
+        try:
+            connection.request("POST", self._path, body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # The connection may have been closed by the server while idle; it is not reused
+            connection.close()
+            raise _RetryableError(f"{type(e).__name__}: {e}") from e
+        if response.will_close:
+            connection.close()
+        else:
+            self._idle.put(connection)
+        if response.status in RETRY_STATUSES:
+            retry_after = response.getheader("Retry-After")
+            raise _RetryableError(f"HTTP {response.status}",
+                                  float(retry_after) if retry_after and retry_after.isdigit() else None)
+        if response.status != 200:
+            raise EmbeddingError(f"HTTP {response.status}: {data[:200].decode('utf-8', 'replace')}")
+        return json.loads(data)
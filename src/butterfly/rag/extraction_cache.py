@@ -0,0 +1,60 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set
+from butterfly.utils.disk_cache import DiskCache
+from butterfly.utils.file_utils import file_content_hash
+
+DEFAULT_CACHE_PATH = os.path.join("data", "cache", "extraction.sqlite")
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+def _encode(o):
+    """JSON hook that keeps datetimes round-trippable."""
+    if isinstance(o, datetime):
+        return {"__datetime__": o.isoformat()}
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def _decode(d: Dict) -> Any:
+    """Inverse of _encode."""
+    if len(d) == 1 and "__datetime__" in d:
+        return datetime.fromisoformat(d["__datetime__"])
+    return d
+
+class ExtractionCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_BYTES):
+        """Open a persistent extraction cache keyed by file content hash, extractor version and config."""
+        self.store = DiskCache(path, max_bytes)
+
+    def make_key(self, pdf_path: str, kind: str, version: str, config: Optional[Dict] = None,
+                 content_hash: Optional[str] = None) -> str:
+        """Build the cache key for one kind of extraction result of a file.
+
+        Pass content_hash when the caller already hashed the file, to avoid reading it twice.
+        """
+        content_hash = content_hash or file_content_hash(pdf_path)
+        payload = json.dumps([content_hash, kind, version, config or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached result for a key, or None if it was never stored or got evicted."""
+        raw = self.store.get(key)
+        if raw is None:
+            return None
+        return json.loads(raw.decode("utf-8"), object_hook=_decode)
+
+    def contains_many(self, keys: Iterable[str]) -> Set[str]:
+        """Return the keys that have a cached result, without loading any of them."""
+        return self.store.contains_many(list(keys))
+
+    def put(self, key: str, value: Any) -> None:
+        """Store an extraction result."""
+        self.store.put(key, json.dumps(value, default=_encode).encode("utf-8"))
+
+    def stats(self) -> Dict[str, int]:
+        """Return entry count, stored bytes and hit/miss counters."""
+        return self.store.stats()
+
+    def close(self):
+        """Close the underlying cache file."""
+        self.store.close()
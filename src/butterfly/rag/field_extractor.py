@@ -0,0 +1,187 @@
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from butterfly.core.table_extractor import extract_table_items
+
+# Precompiled rule table. Every rule is anchored on a literal that is located with a
+# C-level search of the joined page text, so only the lines around a hit are touched
+# in Python instead of every _extract_* helper walking the whole line list.
+AMOUNT_RE = re.compile(r'\$([0-9]+\.[0-9]{2})')
+INVOICE_NUMBER_RE = re.compile(r'#[^\S\n]*(\d+)')  # never spans lines, like the per-line '#\s*(\d+)'
+BILL_TO_ANCHOR = "Bill To:"
+BILL_TO_LOOKAHEAD = 2
+BILL_TO_SKIP_PREFIXES = ('ship to', 'date', 'same day', 'standard class')
+DATE_ANCHORS = ("Date:", "Issued:", "Created:")  # "Invoice Date:" contains "Date:"
+DATE_MARKERS = ("Date:", "Invoice Date:", "Issued:", "Created:")  # priority within a line
+# Same grammar strptime uses for "%Y-%m-%d", without its pure-Python parsing overhead
+ISO_DATE_RE = re.compile(r'(\d\d\d\d)-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])', re.IGNORECASE)
+TOTAL_ANCHOR = "Total:"
+NOTES_ANCHORS = ("Notes", "Thanks")
+ITEM_HEADER_WORDS = ("Item", "Quantity", "Rate", "Amount")
+
+class FieldExtractor:
+    """Fill all invoice metadata fields of a page at once, from a single joined copy of its text."""
+
+    def extract(self, lines: List[str], filename: Optional[str] = None,
+                words: Optional[Sequence[Sequence]] = None) -> Dict:
+        """Return customer_name, invoice_number, date, amount and items for one page.
+
+        filename is used as a fallback for the customer name and invoice number,
+        mirroring PDFDataExtractor.current_filename. When the page's positioned words
+        are given, items come from the layout-aware extract_table_items and the
+        line-based parser is only used if no item table header is found among them.
+        """
+        page = _PageText(lines)
+
+        customer_name = None
+        for idx, _ in page.anchor_lines(BILL_TO_ANCHOR):
+            customer_name = self._bill_to_candidate(lines, idx)
+            if customer_name is not None:
+                break
+
+        match = INVOICE_NUMBER_RE.search(page.text)
+        invoice_number = match.group(1) if match else None
+
+        date = None
+        starts = [pos for pos in (page.text.find(anchor) for anchor in DATE_ANCHORS) if pos != -1]
+        if starts:
+            date = self._date_from_line(lines[page.line_of(min(starts))])
+
+        items = extract_table_items(words) if words else None
+        if items is None:
+            header = None
+            for idx, _ in page.anchor_lines(ITEM_HEADER_WORDS[0]):
+                line = lines[idx]
+                if 'Quantity' in line and 'Rate' in line and 'Amount' in line:
+                    header = idx
+                    break
+            items = self._line_items(lines, header)
+
+        return {
+            "customer_name": customer_name if customer_name is not None else self._customer_from_filename(filename),
+            "invoice_number": invoice_number if invoice_number is not None else self._invoice_number_from_filename(filename),
+            "date": date if date is not None else "Unknown",
+            "amount": self._amount(page),
+            "items": items
+        }
+
+    @staticmethod
+    def _amount(page: "_PageText") -> float:
+        """Apply the total, last-amount-before-notes and largest-amount rules in priority order."""
+        text = page.text
+        for idx, _ in page.anchor_lines(TOTAL_ANCHOR):
+            found = AMOUNT_RE.search(page.lines[idx])
+            if found:
+                return float(found.group(1))
+        # Last amount on any line before the first notes line that has one
+        for anchor_start in sorted(start for anchor in NOTES_ANCHORS for _, start in page.anchor_lines(anchor)):
+            dollar = text.rfind('$', 0, anchor_start)
+            while dollar != -1 and not AMOUNT_RE.match(text, dollar, anchor_start):
+                dollar = text.rfind('$', 0, dollar)
+            if dollar != -1:
+                line_start = text.rfind('\n', 0, dollar) + 1
+                return float(AMOUNT_RE.search(text, line_start).group(1))
+        found = AMOUNT_RE.findall(text)
+        if found:
+            return max(map(float, found))
+        return 0.0
+
+    @staticmethod
+    def _line_items(lines: List[str], header: Optional[int]) -> List[Dict]:
+        """Parse the item table that follows the header line, up to the first stop word."""
+        items = []
+        if header is None:
+            return items
+        for line in lines[header + 1:]:
+            if 'Item' in line and 'Quantity' in line and 'Rate' in line and 'Amount' in line:
+                continue
+            # Stop words, spelled out as plain substring tests which beat any()/regex here
+            if ('Total' in line or 'Subtotal' in line or 'Notes' in line or 'Terms' in line
+                    or 'Shipping' in line or 'Discount' in line):
+                break
+            parts = line.split()
+            # Heuristic: item name followed by quantity, unit price and amount columns
+            if len(parts) < 3:
+                continue
+            quantity, unit_price, amount = parts[-3], parts[-2], parts[-1]
+            unit_digits = unit_price.replace('.', '', 1).replace('$', '')
+            amount_digits = amount.replace('.', '', 1).replace('$', '')
+            try:
+                items.append({
+                    "item": ' '.join(parts[:-3]),
+                    "quantity": float(quantity) if quantity.replace('.', '', 1).isdigit() else None,
+                    "unit_price": float(unit_price.replace('$', '')) if unit_digits.isdigit() else None,
+                    "amount": float(amount.replace('$', '')) if amount_digits.isdigit() else None
+                })
+            except ValueError:
+                continue
+        return items
+
+    @staticmethod
+    def _date_from_line(line: str) -> Optional[str]:
+        """Take the text after the first date marker (in marker priority order) on a line."""
+        for marker in DATE_MARKERS:
+            if marker in line:
+                date_str = line.split(marker)[1].strip()
+                match = ISO_DATE_RE.fullmatch(date_str)
+                if match is None:
+                    return date_str
+                try:
+                    return datetime(*map(int, match.groups())).strftime("%Y-%m-%d")
+                except ValueError:
+                    return date_str
+        return None
+
+    @staticmethod
+    def _bill_to_candidate(lines: List[str], idx: int) -> Optional[str]:
+        """Return the first usable name in the lines following a 'Bill To:' line."""
+        for next_line in lines[idx + 1:idx + 1 + BILL_TO_LOOKAHEAD]:
+            candidate = next_line.strip()
+            if candidate and not candidate.lower().startswith(BILL_TO_SKIP_PREFIXES):
+                return candidate
+        return None
+
+    @staticmethod
+    def _customer_from_filename(filename: Optional[str]) -> str:
+        """Fallback customer name from names like invoice_<customer>_<number>.pdf."""
+        if filename:
+            parts = filename.split('_')
+            if len(parts) >= 2:
+                return parts[1].replace('.pdf', '')
+        return "Unknown"
+
+    @staticmethod
+    def _invoice_number_from_filename(filename: Optional[str]) -> str:
+        """Fallback invoice number from names like invoice_<customer>_<number>.pdf."""
+        if filename:
+            parts = filename.split('_')
+            if len(parts) >= 3:
+                num = parts[2].replace('.pdf', '')
+                if num.isdigit():
+                    return num
+        return "Unknown"
+
+class _PageText:
+    """A page's lines joined once, with helpers to map text offsets back to line numbers."""
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self.text = '\n'.join(lines)
+
+    def line_of(self, pos: int) -> int:
+        """Index of the line containing text offset pos."""
+        return self.text.count('\n', 0, pos)
+
+    def anchor_lines(self, anchor: str) -> Iterator[Tuple[int, int]]:
+        """Yield (line index, line start offset) of every line containing anchor, in order."""
+        text = self.text
+        hit = text.find(anchor)
+        idx = line_start = 0
+        while hit != -1:
+            idx += text.count('\n', line_start, hit)
+            line_start = text.rfind('\n', 0, hit) + 1
+            yield idx, line_start
+            end = text.find('\n', hit)
+            if end == -1:
+                return
+            hit = text.find(anchor, end + 1)
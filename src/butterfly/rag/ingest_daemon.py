@@ -0,0 +1,364 @@
+"""
+Watch a directory of invoice PDFs and ingest new or changed files as they arrive.
+
+Usage:
+    python -m butterfly.rag.ingest_daemon [--directory data/raw] [--poll] [--index]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import logging
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from butterfly.rag.extraction_cache import ExtractionCache
+from butterfly.rag.pdf_extractor import PDFDataExtractor
+from butterfly.utils.file_utils import file_content_hash
+
+DEFAULT_DIRECTORY = os.path.join("data", "raw")
+# Files are ingested once they have not changed for this long
+DEFAULT_SETTLE_SECONDS = 1.0
+DEFAULT_POLL_INTERVAL = 1.0
+# At most this many files wait for ingestion; the watcher blocks (backpressure) when full
+DEFAULT_QUEUE_SIZE = 64
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+# Watchers report (filename, deleted) events; RESCAN means events were lost
+Event = Tuple[str, bool]
+RESCAN = ("", False)
+
+
+class InotifyWatcher:
+    def __init__(self, directory: str):
+        """Watch a directory with Linux inotify through libc; raises OSError where unavailable."""
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def poll(self, timeout: float) -> List[Event]:
+        """Wait up to timeout seconds and return the events that arrived."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                events.append(RESCAN)
+            elif name:
+                events.append((os.fsdecode(name), bool(mask & (IN_DELETE | IN_MOVED_FROM))))
+        return events
+
+    def close(self):
+        """Release the inotify descriptor."""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    def __init__(self, directory: str, interval: float = DEFAULT_POLL_INTERVAL):
+        """Detect changes by comparing directory snapshots (size and mtime) every interval seconds."""
+        self.directory = directory
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout: float) -> List[Event]:
+        """Wait up to timeout seconds and return the changes since the previous scan."""
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, delay))
+        self._next_scan = time.monotonic() + self.interval
+        previous, self._snapshot = self._snapshot, self._scan()
+        events = [(name, False) for name, sig in self._snapshot.items() if previous.get(name) != sig]
+        events.extend((name, True) for name in previous if name not in self._snapshot)
+        return events
+
+    def close(self):
+        """Nothing to release."""
+
+
+def make_watcher(directory: str, poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: Optional[bool] = None):
+    """Return an inotify watcher where possible, else a polling one (use_inotify=False forces polling)."""
+    if use_inotify is not False:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            if use_inotify:
+                raise
+            logging.info(f"[IngestionDaemon] inotify unavailable ({e}), polling every {poll_interval}s")
+    return PollingWatcher(directory, poll_interval)
+
+
+class IngestionDaemon:
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, extractor: Optional[PDFDataExtractor] = None,
+                 rag_system=None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 use_inotify: Optional[bool] = None):
+        """Ingest PDFs from directory into MongoDB (via extractor) and, if given, the rag_system's vector store.
+
+        Files already stored with the same content hash are skipped, so only new or changed
+        invoices are extracted, upserted and re-indexed. Deleted files are dropped from the index.
+        """
+        self.directory = directory
+        self.extractor = extractor or PDFDataExtractor(cache=ExtractionCache())
+        self.rag_system = rag_system
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.queue: "queue.Queue[Tuple[str, bool, bool, float]]" = queue.Queue(maxsize=queue_size)
+        self.stats = {"ingested": 0, "unchanged": 0, "removed": 0, "errors": 0}
+        # filename -> content hash of the version that is stored and indexed
+        self.known: Dict[str, str] = {}
+        # (filename, deleted) items waiting in the queue, to coalesce repeated events
+        self._queued: Set[Event] = set()
+        self._queued_lock = threading.Lock()
+        # filename -> (time of last event, last seen (size, mtime)) of files not yet settled
+        self._pending: Dict[str, Tuple[float, Optional[Tuple[int, int]]]] = {}
+        # Files found by the startup scan, which was preceded by a full vector store build
+        self._initial: Set[str] = set()
+        # Whether the vector store changed since it was last persisted
+        self._index_dirty = False
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "IngestionDaemon":
+        """Start the watcher and worker threads; every existing PDF is synced first."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._seed_known()
+        watcher = make_watcher(self.directory, self.poll_interval, self.use_inotify)
+        # Existing files are debounced like new ones, in case they are still being written
+        self._initial = {f for f in os.listdir(self.directory) if f.endswith('.pdf')}
+        self._pending.update((f, (0.0, None)) for f in self._initial)
+        self._threads = [
+            threading.Thread(target=self._watch_loop, args=(watcher,), name="ingest-watcher", daemon=True),
+            threading.Thread(target=self._work_loop, name="ingest-worker", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logging.info(f"[IngestionDaemon] Watching {self.directory} with {type(watcher).__name__}")
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop both threads; files still queued are picked up by the next start's first sync."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Block until no file is settling, queued or being ingested; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self._pending and self.queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _seed_known(self):
+        """Load the versions already stored in MongoDB so unchanged files are not re-ingested."""
+        if self.extractor.invoices is None:
+            return
+        for doc in self.extractor.invoices.find({}, {"_id": 0, "filename": 1, "content_hash": 1}):
+            if doc.get("content_hash"):
+                self.known[doc["filename"]] = doc["content_hash"]
+
+    def _watch_loop(self, watcher):
+        """Turn raw watcher events into settled files on the work queue."""
+        pending = self._pending
+        try:
+            while not self._stop.is_set():
+                for filename, deleted in watcher.poll(min(self.poll_interval, self.settle_seconds / 2) or 0.1):
+                    if (filename, deleted) == RESCAN:
+                        pending.update((f, (time.monotonic(), None)) for f in os.listdir(self.directory)
+                                       if f.endswith('.pdf'))
+                    elif filename.endswith('.pdf'):
+                        if deleted:
+                            pending.pop(filename, None)
+                            self._initial.discard(filename)
+                            self._enqueue(filename, deleted=True, initial=False, event_time=time.monotonic())
+                        else:
+                            pending[filename] = (time.monotonic(), pending.get(filename, (0, None))[1])
+                            self._initial.discard(filename)
+                for filename in sorted(self._settled(pending)):
+                    initial = filename in self._initial
+                    self._initial.discard(filename)
+                    self._enqueue(filename, deleted=False, initial=initial, event_time=pending[filename][0])
+                    # Only now, so wait_idle never sees the file neither pending nor queued
+                    del pending[filename]
+        finally:
+            watcher.close()
+
+    def _settled(self, pending: Dict[str, Tuple[float, Optional[Tuple[int, int]]]]) -> List[str]:
+        """Files with no events for settle_seconds whose size and mtime stopped changing."""
+        now = time.monotonic()
+        settled = []
+        for filename, (last_event, signature) in list(pending.items()):
+            if now - last_event < self.settle_seconds:
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pending.pop(filename)
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current == signature:
+                settled.append(filename)
+            else:
+                # Still being written (or first check): wait another settle period
+                pending[filename] = (now, current)
+        return settled
+
+    def _enqueue(self, filename: str, deleted: bool, initial: bool, event_time: float):
+        """Queue a file unless it is already waiting; blocks while the queue is full."""
+        with self._queued_lock:
+            if (filename, deleted) in self._queued:
+                return
+            self._queued.add((filename, deleted))
+        while not self._stop.is_set():
+            try:
+                self.queue.put((filename, deleted, initial, event_time), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _work_loop(self):
+        """Ingest queued files one at a time (the extractor keeps per-file state)."""
+        while not self._stop.is_set():
+            try:
+                filename, deleted, initial, event_time = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            # Changes that arrive from now on must queue the file again
+            with self._queued_lock:
+                self._queued.discard((filename, deleted))
+            try:
+                self._ingest(filename, deleted, initial, event_time)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"[IngestionDaemon] Failed to ingest {filename}: {e}", exc_info=True)
+            finally:
+                # Persist once per burst of changes rather than after every file
+                if self._index_dirty and self.queue.empty():
+                    self._save_index()
+                self.queue.task_done()
+
+    def _save_index(self):
+        """Persist the vector store; a failure is logged and retried after the next change."""
+        try:
+            self.rag_system.save_vector_store()
+            self._index_dirty = False
+        except Exception as e:
+            logging.error(f"[IngestionDaemon] Failed to save the vector store: {e}", exc_info=True)
+
+    def _ingest(self, filename: str, deleted: bool, initial: bool, event_time: float):
+        """Extract, store and index one file if its content is new."""
+        pdf_path = os.path.join(self.directory, filename)
+        if deleted or not os.path.exists(pdf_path):
+            self.known.pop(filename, None)
+            if self.rag_system is not None:
+                self.rag_system.remove_pdf(filename)
+                self._index_dirty = True
+            self.stats["removed"] += 1
+            logging.info(f"[IngestionDaemon] Removed {filename}")
+            return
+
+        content_hash = file_content_hash(pdf_path)
+        changed = self.known.get(filename) != content_hash
+        # At startup the vector store was just built from the directory, so only missing files need indexing
+        needs_index = self.rag_system is not None and (
+            filename not in self.rag_system.indexed_chunks or (changed and not initial))
+        if not changed and not needs_index:
+            self.stats["unchanged"] += 1
+            return
+        if changed:
+            invoice_data = self.extractor.extract_file(pdf_path, use_filename_hint=True)
+            if self.extractor.invoices is not None:
+                self.extractor.store_invoices([invoice_data])
+            content_hash = invoice_data["content_hash"]
+        if needs_index:
+            self.rag_system.index_pdf(pdf_path)
+            self._index_dirty = True
+        self.known[filename] = content_hash
+        self.stats["ingested"] += 1
+        logging.info(f"[IngestionDaemon] Ingested {filename} {time.monotonic() - event_time:.2f}s after its last change")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest invoice PDFs as they appear in a directory.")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI", "mongodb://mongodb:27017/"))
+    parser.add_argument("--poll", action="store_true", help="poll instead of using inotify (e.g. network mounts)")
+    parser.add_argument("--index", action="store_true", help="also embed files into a PDFRAGSystem vector store")
+    parser.add_argument("--index-dir", default=os.getenv("BUTTERFLY_INDEX_DIR", "data/index"),
+                        help="where the vector store is persisted with --index")
+    parser.add_argument("--settle-seconds", type=float, default=DEFAULT_SETTLE_SECONDS)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    cache = ExtractionCache()
+    rag_system = None
+    if args.index:
+        from butterfly.rag.embedding_cache import EmbeddingCache
+        from butterfly.rag.pdf_rag import PDFRAGSystem
+        rag_system = PDFRAGSystem(extraction_cache=cache, index_dir=args.index_dir, embedding_cache=EmbeddingCache())
+        if any(f.endswith('.pdf') for f in os.listdir(args.directory)):
+            # Loads the persisted store and embeds only what changed since it was saved
+            rag_system.create_vector_store(args.directory)
+    daemon = IngestionDaemon(args.directory, PDFDataExtractor(args.mongo_uri, cache=cache), rag_system,
+                             queue_size=args.queue_size, settle_seconds=args.settle_seconds,
+                             use_inotify=False if args.poll else None).start()
+    try:
+        while True:
+            time.sleep(60)
+            logging.info(f"[IngestionDaemon] {daemon.stats}")
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,226 +1,418 @@
+import logging
 import os
 import fitz
-from pymongo import MongoClient
-from typing import Dict, List
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import json
+import time
 from datetime import datetime
+from butterfly.utils.parallel import imap_ordered, resolve_workers
+from butterfly.utils.jsonl import JSONLWriter, json_default, open_text_writer
+from butterfly.utils.file_utils import file_content_hash
+from butterfly.rag.extraction_cache import ExtractionCache
+from butterfly.rag.field_extractor import FieldExtractor
+from butterfly.core.pipeline import OCRPipeline
+from butterfly.core.page_classifier import ROUTE_HYBRID, ROUTE_OCR, ROUTE_TEXT, classify_page, merge_in_reading_order
+from butterfly.core.preprocess import DEFAULT_MIN_CONFIDENCE, TIERS, ocr_data, ocr_text
+from butterfly.core.render import render_gray
+from butterfly.core.resolution import DEFAULT_MIN_DPI, choose_dpi
+from butterfly.core.table_extractor import words_from_ocr_results
+from butterfly.ocr.engine import OCREngine, get_default_engine, get_engine, text_from_data, words_from_data
+
+# Bump whenever a change to the extraction logic alters its output, so cached results are not reused
+EXTRACTOR_VERSION = "8"
+
+# Settings that decide when and how a page is OCR'd; part of the extraction cache key
+DEFAULT_OCR_CONFIG = {
+    "min_text_chars": 50,  # Pages with less native text than this are OCR'd
+    "dpi": 300,  # Highest render resolution for OCR
+    "min_dpi": DEFAULT_MIN_DPI,  # Pages with large print are OCR'd at down to this DPI (None: always "dpi")
+    "min_confidence": DEFAULT_MIN_CONFIDENCE,  # OCR below this mean confidence is redone after denoising
+    "tesseract_config": "",
+    "engine": None,  # OCR backend: "capi", "pytesseract", "easyocr", or None for the process default
+}
+
+# Number of upserts sent to MongoDB per bulk_write round-trip
+DEFAULT_BATCH_SIZE = 500
+
+# Page route -> the extraction_method recorded for the page
+EXTRACTION_METHODS = {ROUTE_TEXT: "regular", ROUTE_OCR: "ocr", ROUTE_HYBRID: "hybrid"}
+
+# Large PDFs are split into page ranges of this size when extracting in parallel
+DEFAULT_PAGES_PER_TASK = 16
 
 class PDFDataExtractor:
-    def __init__(self, mongo_uri: str = "mongodb://mongodb:27017/", db_name: str = "pdf_rag"): 
-        """Initialize the PDF data extractor with MongoDB connection."""
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client[db_name]
-        self.invoices = self.db.invoices
-        self.qa_pairs = self.db.qa_pairs
+    def __init__(self, mongo_uri: Optional[str] = "mongodb://mongodb:27017/", db_name: str = "pdf_rag",
+                 cache: Optional[ExtractionCache] = None, ocr_config: Optional[Dict] = None,
+                 ocr_engine: Optional[OCREngine] = None, pipeline: Optional[OCRPipeline] = None): 
+        """Initialize the PDF data extractor with MongoDB connection (pass mongo_uri=None to run without MongoDB).
+
+        An optional ExtractionCache lets directory runs skip files that were already extracted.
+        OCR goes through ocr_engine, or the process-wide engine of the ocr_config "engine"
+        backend when none is given. With a pipeline, the pages of a file that need OCR are
+        rendered, preprocessed and OCR'd concurrently by its stage pools (and its engine).
+        """
+        self.client = MongoClient(mongo_uri) if mongo_uri else None
+        self.db = self.client[db_name] if self.client else None
+        self.invoices = self.db.invoices if self.db is not None else None
+        self.qa_pairs = self.db.qa_pairs if self.db is not None else None
         self.current_filename = None
+        self._indexed = set()
+        self.cache = cache
+        self.field_extractor = FieldExtractor()
+        self.ocr_config = dict(DEFAULT_OCR_CONFIG, **(ocr_config or {}))
+        self._ocr_engine = ocr_engine
+        self.pipeline = pipeline
     
-    def extract_invoice_data(self, pdf_path: str) -> Dict:
-        """Extract structured data from an invoice PDF using both regular extraction and OCR if needed."""
-        import cv2
-        import numpy as np
-        import pytesseract
-        from PIL import Image
-        
+    @property
+    def ocr_engine(self) -> OCREngine:
+        """The OCR engine, resolved on first use so text-only runs never load Tesseract."""
+        if self._ocr_engine is None:
+            backend = self.ocr_config["engine"]
+            self._ocr_engine = get_engine(backend) if backend else get_default_engine()
+        return self._ocr_engine
+    
+    def extract_invoice_data(self, pdf_path: str, page_numbers: Optional[Sequence[int]] = None) -> Dict:
+        """Extract structured data from an invoice PDF using both regular extraction and OCR if needed.
+
+        Each page is classified once (see classify_page) and routed to its text layer,
+        full-page OCR or OCR of the image regions that carry no text; the decision and its
+        cost are recorded under the page's "classification" key.
+        page_numbers optionally restricts extraction to the given zero-based pages.
+        """
         doc = fitz.open(pdf_path)
         invoice_data = {
             "filename": os.path.basename(pdf_path),
             "extraction_date": datetime.now(),
             "pages": []
         }
+        if page_numbers is None:
+            page_numbers = range(len(doc))
         
-        for page_num, page in enumerate(doc):
-            # Try regular text extraction first
-            text = page.get_text()
+        # The classifier extracts the text layer once; it is reused below
+        classifications = [(page_num, classify_page(doc[page_num], self.ocr_config["min_text_chars"]))
+                           for page_num in page_numbers]
+        pipelined = self._ocr_pipelined(pdf_path, classifications) if self.pipeline is not None else {}
+        
+        for page_num, classification in classifications:
+            page = doc[page_num]
+            text = classification.pop("text")
+            words = classification.pop("words")
+            blocks = classification.pop("blocks")
+            regions = classification.pop("ocr_regions")
             
-            # If regular extraction yields little or no text, try OCR
-            if len(text.strip()) < 50:  # Threshold for minimum text length
-                # Get page as image
-                pix = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))  # 300 DPI
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                
-                # Convert to cv2 format for preprocessing
-                img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                
-                # Preprocess image
-                gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-                thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-                
-                # Apply OCR
-                text = pytesseract.image_to_string(thresh)
+            ocr_start = time.perf_counter()
+            ocr_results = []
+            if classification["route"] == ROUTE_OCR:
+                ocr_results = pipelined.get(page_num) or [self._ocr_page(page, output="data")]
+                data, dpi = ocr_results[0]["data"], ocr_results[0]["dpi"]
+                text = text_from_data(data)
+                # The text layer does not describe the scanned table; Tesseract's boxes do, scaled to points
+                words = words_from_ocr_results(words_from_data(data), 72 / dpi)
                 print(f"Used OCR for page {page_num + 1} of {os.path.basename(pdf_path)}")
+            elif classification["route"] == ROUTE_HYBRID:
+                # Only the text-free regions are rendered and OCR'd; their text goes where they sit on the page
+                ocr_results = pipelined.get(page_num) or [self._ocr_page(page, fitz.Rect(rect)) for rect in regions]
+                text = merge_in_reading_order(blocks + [(*rect, r["text"]) for rect, r in zip(regions, ocr_results)])
+            classification["ocr_regions"] = len(regions)
+            if page_num in pipelined:
+                # Time the page's areas spent in the pipeline's stages, which overlap other pages
+                stage_ms = sum(r["render_ms"] + r["preprocess_ms"] + r["ms"] for r in ocr_results)
+                classification["ocr_ms"] = round(stage_ms, 3)
+            else:
+                classification["ocr_ms"] = round((time.perf_counter() - ocr_start) * 1000, 3)
+            # Deepest preprocessing tier any OCR'd area of the page needed, and the confidence reached
+            scored = [r["confidence"] for r in ocr_results if r.get("confidence") is not None]
+            classification["ocr_tier"] = max((r["tier"] for r in ocr_results), key=TIERS.index, default=None)
+            classification["ocr_confidence"] = round(sum(scored) / len(scored), 1) if scored else None
+            classification["ocr_dpi"] = max((r["dpi"] for r in ocr_results if r.get("dpi")), default=None)
+            classification["ocr_pixels"] = sum(r.get("pixels", 0) for r in ocr_results)
             
-            # Process extracted text
+            # Process extracted text; all metadata fields are filled in one pass over the lines
             lines = text.split('\n')
-            items = self.extract_line_items(lines)
             page_data = {
                 "page_number": page_num + 1,
                 "content": text,
-                "extraction_method": "ocr" if len(page.get_text().strip()) < 50 else "regular",
-                "metadata": {
-                    "customer_name": self._extract_customer_name(lines),
-                    "invoice_number": self._extract_invoice_number(lines),
-                    "date": self._extract_date(lines),
-                    "amount": self._extract_amount(lines),
-                    "items": items
-                }
+                "extraction_method": EXTRACTION_METHODS[classification["route"]],
+                "classification": classification,
+                "metadata": self.field_extractor.extract(lines, self.current_filename, words)
             }
             invoice_data["pages"].append(page_data)
         
+        doc.close()
         return invoice_data
 
-    def extract_line_items(self, lines: list) -> list:
-        """Extract structured line items from invoice lines."""
-        items = []
-        in_items_section = False
-        for i, line in enumerate(lines):
-            # Heuristic: look for start of line items section
-            if ("Item" in line and "Quantity" in line and "Rate" in line and "Amount" in line):
-                in_items_section = True
+    def _ocr_page(self, page: fitz.Page, clip: Optional[fitz.Rect] = None, output: str = "text") -> Dict:
+        """Render a page, or just the clip rectangle of it, and OCR it with Tesseract.
+
+        The page is rendered at the lowest DPI its glyph size allows (see choose_dpi) and
+        again at full resolution only if Tesseract is not confident in the result.
+        Returns the text (output "text", see ocr_text) or the word boxes (output "data",
+        see ocr_data) with the preprocessing tier and DPI it needed.
+        """
+        max_dpi = self.ocr_config["dpi"]
+        dpi = choose_dpi(page, clip, self.ocr_config["min_dpi"], max_dpi)
+        rerender = (lambda: (render_gray(page, max_dpi, clip), max_dpi)) if dpi < max_dpi else None
+        # Rendered straight to grayscale; Otsu first, denoising only if Tesseract is not confident
+        ocr = ocr_text if output == "text" else ocr_data
+        return ocr(self.ocr_engine, render_gray(page, dpi, clip), self.ocr_config["min_confidence"],
+                   self.ocr_config["tesseract_config"], dpi, rerender)
+
+    def _ocr_pipelined(self, pdf_path: str, classifications: List[Tuple[int, Dict]]) -> Dict[int, List[Dict]]:
+        """OCR every page (or text-free region) the classifier routed to OCR through the pipeline at once.
+
+        Returns the ocr_data results of each scanned page and the ocr_text results of the
+        regions of each hybrid page, keyed by zero-based page number; the first area that
+        fails raises its error.
+        """
+        tasks = {"data": [], "text": []}
+        for page_num, classification in classifications:
+            if classification["route"] == ROUTE_OCR:
+                tasks["data"].append((pdf_path, page_num, None))
+            elif classification["route"] == ROUTE_HYBRID:
+                tasks["text"].extend((pdf_path, page_num, tuple(rect)) for rect in classification["ocr_regions"])
+        results: Dict[int, List[Dict]] = {}
+        for output, output_tasks in tasks.items():
+            if not output_tasks:
                 continue
-            if in_items_section:
-                # Stop at subtotal, total, or empty line
-                if any(stop_word in line for stop_word in ["Subtotal", "Total", "Notes", "Terms", "Shipping", "Discount"]):
-                    break
-                parts = line.split()
-                # Heuristic: look for lines with at least 3 columns (item, quantity, price)
-                if len(parts) >= 3:
-                    try:
-                        # Try to parse quantity and price from the end
-                        quantity = float(parts[-3]) if parts[-3].replace('.', '', 1).isdigit() else None
-                        unit_price = float(parts[-2].replace('$', '')) if parts[-2].replace('.', '', 1).replace('$', '').isdigit() else None
-                        amount = float(parts[-1].replace('$', '')) if parts[-1].replace('.', '', 1).replace('$', '').isdigit() else None
-                        item_name = ' '.join(parts[:-3])
-                        items.append({
-                            "item": item_name,
-                            "quantity": quantity,
-                            "unit_price": unit_price,
-                            "amount": amount
-                        })
-                    except Exception:
-                        continue
-        return items
+            for (_, page_num, _), result, error in self.pipeline.run(
+                    output_tasks, output, self.ocr_config["tesseract_config"], self.ocr_config["min_confidence"],
+                    self.ocr_config["dpi"], self.ocr_config["min_dpi"]):
+                if error is not None:
+                    raise error
+                results.setdefault(page_num, []).append(result)
+        return results
 
-    def export_invoices_to_json(self, directory_path: str, output_file: str):
-        """Extract and export all invoices in a directory to a JSON file (no MongoDB required)."""
-        all_invoices = []
-        for filename in os.listdir(directory_path):
-            if filename.endswith('.pdf'):
-                pdf_path = os.path.join(directory_path, filename)
-                try:
-                    invoice_data = self.extract_invoice_data(pdf_path)
-                    all_invoices.append(invoice_data)
-                except Exception as e:
-                    print(f"Error extracting {filename}: {str(e)}")
-        # Convert datetimes to string
-        def convert(o):
-            if isinstance(o, datetime):
-                return o.isoformat()
-            if isinstance(o, dict):
-                return {k: convert(v) for k, v in o.items()}
-            if isinstance(o, list):
-                return [convert(i) for i in o]
-            return o
-        with open(output_file, 'w') as f:
-            json.dump([convert(inv) for inv in all_invoices], f, indent=2)
+    def iter_directory(self, directory_path: str, workers: int = 1,
+                       pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                       use_filename_hint: bool = False) -> Iterator[Tuple[str, Optional[Dict], Optional[BaseException]]]:
+        """Extract every PDF in a directory, yielding (filename, invoice_data, error) in filename order.
 
-    
-    def _extract_customer_name(self, lines: List[str]) -> str:
-        """Extract customer name from invoice lines using heuristics and filename."""
-        # Heuristic: Look for 'Bill To:' and take the next non-empty line
-        for idx, line in enumerate(lines):
-            if 'Bill To:' in line:
-                # Look ahead for the next non-empty line
-                for next_line in lines[idx+1:idx+3]:
-                    candidate = next_line.strip()
-                    if candidate and not candidate.lower().startswith(('ship to', 'date', 'same day', 'standard class')):
-                        return candidate
-        # Fallback to filename
-        filename = getattr(self, 'current_filename', None)
-        if filename:
-            parts = filename.split('_')
-            if len(parts) >= 2:
-                return parts[1].replace('.pdf', '')
-        return "Unknown"
-    
-    def _extract_invoice_number(self, lines: List[str]) -> str:
-        """Extract invoice number from invoice lines using heuristics and filename."""
-        import re
-        # Look for lines like '# 36397' or 'Invoice # 36397'
-        for line in lines:
-            match = re.search(r'#\s*(\d+)', line)
-            if match:
-                return match.group(1)
-        # Fallback to filename
-        filename = getattr(self, 'current_filename', None)
-        if filename:
-            parts = filename.split('_')
-            if len(parts) >= 3:
-                num = parts[2].replace('.pdf', '')
-                if num.isdigit():
-                    return num
-        return "Unknown"
-    
-    def _extract_date(self, lines: List[str]) -> str:
-        """Extract date from invoice lines."""
-        patterns = ["Date:", "Invoice Date:", "Issued:", "Created:"]
-        for line in lines:
-            for pattern in patterns:
-                if pattern in line:
-                    date_str = line.split(pattern)[1].strip()
-                    try:
-                        # Try to parse and standardize the date format
-                        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                        return date_obj.strftime("%Y-%m-%d")
-                    except ValueError:
-                        return date_str
-        return "Unknown"
-    
-    def _extract_amount(self, lines: List[str]) -> float:
-        """Extract the correct total amount from invoice lines using invoice-specific heuristics."""
-        import re
-        # 1. Look for a line with 'Total:' and a $ amount
-        for line in lines:
-            if 'Total:' in line:
-                found = re.findall(r'\$([0-9]+\.[0-9]{2})', line)
-                if found:
-                    return float(found[0])
-        # 2. Look for the last $ amount before 'Notes' or 'Thanks'
-        for idx, line in enumerate(lines):
-            if 'Notes' in line or 'Thanks' in line:
-                for prev_line in reversed(lines[:idx]):
-                    found = re.findall(r'\$([0-9]+\.[0-9]{2})', prev_line)
-                    if found:
-                        return float(found[0])
-        # 3. Fallback: largest amount
-        amounts = []
-        for line in lines:
-            found = re.findall(r'\$([0-9]+\.[0-9]{2})', line)
-            for amt in found:
-                try:
-                    amounts.append(float(amt))
-                except Exception:
-                    continue
-        if amounts:
-            return max(amounts)
-        return 0.0
-    
-    def process_directory(self, directory_path: str):
-        """Process all PDFs in a directory and store in MongoDB."""
-        print("DEBUG: Files in directory:", os.listdir(directory_path))
-        for filename in os.listdir(directory_path):
-            if filename.endswith('.pdf'):
+        With workers > 1 (or workers=None for one per CPU) files, and page ranges of large
+        files, are spread across a process pool. A file that fails, or crashes its worker,
+        is reported through `error` and does not stop the batch. When the extractor has a
+        cache, files whose content was extracted before are served from it. Every invoice
+        carries the SHA-256 of its file as content_hash.
+        """
+        filenames = sorted(f for f in os.listdir(directory_path) if f.endswith('.pdf'))
+        hashes, keys = {}, {}
+        for filename in filenames:
+            pdf_path = os.path.join(directory_path, filename)
+            try:
+                hashes[filename] = file_content_hash(pdf_path)
+            except OSError:
+                hashes[filename] = None
+            if self.cache is not None and hashes[filename] is not None:
+                keys[filename] = self._cache_key(pdf_path, hashes[filename], use_filename_hint)
+        # Only which files are cached is decided up front; each hit is loaded just before it is
+        # yielded, so a warm re-run holds one invoice at a time rather than the whole batch
+        cached = self.cache.contains_many(keys.values()) if self.cache is not None else set()
+        misses = self._extract_many(
+            [os.path.join(directory_path, f) for f in filenames if keys.get(f) not in cached],
+            workers, pages_per_task, use_filename_hint)
+        for filename in filenames:
+            key = keys.get(filename)
+            invoice_data, error = (self.cache.get(key) if key in cached else None), None
+            if invoice_data is None:
+                if key in cached:
+                    # Evicted since the lookup above; extract it here instead
+                    _, invoice_data, error = next(self._extract_many(
+                        [os.path.join(directory_path, filename)], 1, pages_per_task, use_filename_hint))
+                else:
+                    _, invoice_data, error = next(misses)
+                if error is None and key is not None:
+                    self.cache.put(key, invoice_data)
+            if invoice_data is not None:
+                invoice_data["filename"] = filename
+                invoice_data["content_hash"] = hashes[filename]
+            yield filename, invoice_data, error
+
+    def extract_file(self, pdf_path: str, use_filename_hint: bool = False) -> Dict:
+        """Extract a single PDF through the cache, like one iteration of iter_directory.
+
+        Raises whatever extract_invoice_data raises; the result carries filename and content_hash.
+        """
+        content_hash = file_content_hash(pdf_path)
+        filename = os.path.basename(pdf_path)
+        key = self._cache_key(pdf_path, content_hash, use_filename_hint) if self.cache is not None else None
+        invoice_data = self.cache.get(key) if key is not None else None
+        if invoice_data is None:
+            if use_filename_hint:
                 self.current_filename = filename
-                pdf_path = os.path.join(directory_path, filename)
+            try:
+                invoice_data = self.extract_invoice_data(pdf_path)
+            finally:
+                self.current_filename = None
+            if key is not None:
+                self.cache.put(key, invoice_data)
+        invoice_data["filename"] = filename
+        invoice_data["content_hash"] = content_hash
+        return invoice_data
+
+    def _cache_key(self, pdf_path: str, content_hash: str, use_filename_hint: bool) -> str:
+        """Cache key of an invoice extraction; the filename hint changes the metadata fallbacks."""
+        hint = os.path.basename(pdf_path) if use_filename_hint else None
+        return self.cache.make_key(pdf_path, "invoice", EXTRACTOR_VERSION,
+                                   dict(self.ocr_config, filename_hint=hint), content_hash=content_hash)
+
+    def _extract_many(self, pdf_paths: List[str], workers: int, pages_per_task: int,
+                      use_filename_hint: bool) -> Iterator[Tuple[str, Optional[Dict], Optional[BaseException]]]:
+        """Extract the given PDFs serially or in a process pool, yielding results in input order."""
+        if resolve_workers(workers) == 1:
+            for pdf_path in pdf_paths:
+                if use_filename_hint:
+                    self.current_filename = os.path.basename(pdf_path)
                 try:
-                    invoice_data = self.extract_invoice_data(pdf_path)
-                    print(f"\n===== {filename} =====")
-                    for page in invoice_data["pages"]:
-                        print(f"Page {page['page_number']} ({page['extraction_method']}):\n{page['content']}\n{'-'*40}")
-                    print(f"Processed {filename}")
+                    invoice_data, error = self.extract_invoice_data(pdf_path), None
                 except Exception as e:
-                    print(f"Error processing {filename}: {str(e)}")
+                    invoice_data, error = None, e
                 finally:
                     self.current_filename = None
+                yield pdf_path, invoice_data, error
+            return
+
+        # A file's first task extracts its first pages_per_task pages and reports its page
+        # count, so the parent never opens the PDFs; the remaining ranges are queued after it
+        tasks = [(pdf_path, None, os.path.basename(pdf_path) if use_filename_hint else None, pages_per_task)
+                 for pdf_path in pdf_paths]
+
+        # Page-range tasks of one file are consecutive, so merge them as they arrive
+        parts, part_error, current = [], None, None
+        for (pdf_path, _, _, _), result, error in imap_ordered(
+                _extract_task, tasks, workers=workers, initializer=_init_worker, initargs=(self.ocr_config,),
+                expand=_remaining_ranges):
+            if pdf_path != current:
+                if current is not None:
+                    yield current, (None if part_error else _merge_invoice_parts(parts)), part_error
+                parts, part_error, current = [], None, pdf_path
+            if error is not None:
+                part_error = part_error or error
+            else:
+                parts.append(result[0])
+        if current is not None:
+            yield current, (None if part_error else _merge_invoice_parts(parts)), part_error
+
+    def export_invoices_to_json(self, directory_path: str, output_file: str, workers: int = 1,
+                                pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                                streaming: Optional[bool] = None, compression: Optional[str] = None):
+        """Extract and export all invoices in a directory to a JSON file (no MongoDB required).
+
+        In streaming mode (the default for .jsonl/.jsonl.gz/.jsonl.zst outputs) each invoice is
+        written as one JSON Lines record as soon as it is extracted or read from the cache, so
+        only the invoices in the worker pool's in-flight window are held at once, however large
+        the batch is. compression ("gzip"/"zstd") is inferred from the suffix when omitted.
+        Read streamed exports back with butterfly.utils.jsonl.iter_jsonl.
+        """
+        if streaming is None:
+            streaming = ".jsonl" in os.path.basename(output_file)
+        invoices = self.iter_directory(directory_path, workers, pages_per_task)
+        if streaming:
+            with JSONLWriter(output_file, compression) as writer:
+                for filename, invoice_data, error in invoices:
+                    if error is not None:
+                        print(f"Error extracting {filename}: {str(error)}")
+                        continue
+                    writer.write(invoice_data)
+            return
+
+        all_invoices = []
+        for filename, invoice_data, error in invoices:
+            if error is not None:
+                print(f"Error extracting {filename}: {str(error)}")
+                continue
+            all_invoices.append(invoice_data)
+        # Datetimes are written as ISO strings by the json_default hook
+        with open_text_writer(output_file, compression) as f:
+            json.dump(all_invoices, f, indent=2, default=json_default)
+
+    def process_directory(self, directory_path: str, workers: int = 1,
+                          pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                          persist: bool = True, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Process all PDFs in a directory and store in MongoDB.
+
+        Invoices are upserted in bulk batches keyed by filename and content hash, so
+        re-processing the same directory does not create duplicates.
+        """
+        logging.debug(f"[PDFDataExtractor] Files in {directory_path}: {sorted(os.listdir(directory_path))}")
+        def extracted():
+            for filename, invoice_data, error in self.iter_directory(
+                    directory_path, workers, pages_per_task, use_filename_hint=True):
+                if error is not None:
+                    print(f"Error processing {filename}: {str(error)}")
+                    continue
+                print(f"\n===== {filename} =====")
+                for page in invoice_data["pages"]:
+                    print(f"Page {page['page_number']} ({page['extraction_method']}):\n{page['content']}\n{'-'*40}")
+                print(f"Processed {filename}")
+                yield invoice_data
+        if persist and self.invoices is not None:
+            counts = self.store_invoices(extracted(), batch_size)
+            print(f"Stored invoices: {counts}")
+        else:
+            for _ in extracted():
+                pass
+
+    def store_invoices(self, invoices: Iterable[Dict], batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+        """Upsert extracted invoices keyed by (filename, content_hash) using unordered bulk writes.
+
+        invoices may be a generator; it is consumed in batches of batch_size, so writes
+        overlap with extraction instead of waiting for the whole directory.
+        """
+        self._ensure_index(self.invoices, ("filename", "content_hash"), unique=True)
+        ops = (UpdateOne({"filename": inv["filename"], "content_hash": inv.get("content_hash")},
+                         {"$set": inv}, upsert=True) for inv in invoices)
+        return self._bulk_write(self.invoices, ops, batch_size)
+
+    def store_qa_pairs(self, qa_pairs: Iterable[Dict], batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+        """Bulk counterpart of store_qa_pair; pairs are upserted by (question, answer) so re-runs are idempotent.
+
+        Each pair is a dict with question, answer, sources and an optional timestamp.
+        """
+        self._ensure_index(self.qa_pairs, ("question", "answer"))
+        # The timestamp records when a pair was first stored, so re-runs leave it alone
+        ops = (UpdateOne({"question": qa["question"], "answer": qa["answer"]},
+                         {"$set": {"sources": qa.get("sources", [])},
+                          "$setOnInsert": {"timestamp": qa.get("timestamp") or datetime.now()}},
+                         upsert=True) for qa in qa_pairs)
+        return self._bulk_write(self.qa_pairs, ops, batch_size)
+
+    def _ensure_index(self, collection, fields: Tuple[str, ...], unique: bool = False):
+        """Create the index the bulk upserts are keyed on, once per collection."""
+        if collection.name in self._indexed:
+            return
+        try:
+            collection.create_index([(field, 1) for field in fields], unique=unique)
+        except OperationFailure as e:
+            # e.g. legacy duplicates prevent a unique index; upserts stay idempotent without it
+            print(f"Could not create index on {collection.name}{fields}: {e}")
+        self._indexed.add(collection.name)
+
+    @staticmethod
+    def _bulk_write(collection, ops: Iterable[UpdateOne], batch_size: int) -> Dict[str, int]:
+        """Send operations in unordered bulk_write batches and return aggregated counts."""
+        counts = {"upserted": 0, "modified": 0, "matched": 0, "errors": 0}
+        def flush(batch):
+            try:
+                result = collection.bulk_write(batch, ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                # Unordered batches keep going past failed operations; report and carry on
+                details = e.details
+                counts["errors"] += len(details.get("writeErrors", []))
+                print(f"Bulk write errors: {details.get('writeErrors', [])[:3]}")
+            counts["upserted"] += details.get("nUpserted", 0)
+            counts["modified"] += details.get("nModified", 0)
+            counts["matched"] += details.get("nMatched", 0)
+        batch = []
+        for op in ops:
+            batch.append(op)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        return counts
     
     def store_qa_pair(self, question: str, answer: str, sources: List[str]):
         """Store a question-answer pair with its sources."""
@@ -255,11 +447,62 @@ class PDFDataExtractor:
     
     def close(self):
         """Close MongoDB connection."""
-        self.client.close()
+        if self.client is not None:
+            self.client.close()
+
+# Per-process extractor used by the parallel directory runs
+_worker_extractor = None
+
+def _init_worker(ocr_config: Dict):
+    """Create the MongoDB-free extractor used inside a pool worker."""
+    global _worker_extractor
+    _worker_extractor = PDFDataExtractor(mongo_uri=None, ocr_config=ocr_config)
+
+ExtractTask = Tuple[str, Optional[List[int]], Optional[str], int]
+
+def _extract_task(task: ExtractTask) -> Tuple[Dict, Optional[int]]:
+    """Extract one page range of a file inside a pool worker, returning it with the file's page count.
+
+    A task without page numbers stands for the first pages_per_task pages of the file.
+    """
+    pdf_path, page_numbers, filename_hint, pages_per_task = task
+    page_count = None
+    if page_numbers is None:
+        page_count = _page_count(pdf_path)
+        if page_count is not None and page_count > pages_per_task:
+            page_numbers = list(range(pages_per_task))
+    _worker_extractor.current_filename = filename_hint
+    try:
+        return _worker_extractor.extract_invoice_data(pdf_path, page_numbers), page_count
+    finally:
+        _worker_extractor.current_filename = None
+
+def _remaining_ranges(task: ExtractTask, result: Tuple[Dict, Optional[int]]) -> List[ExtractTask]:
+    """Page-range tasks for the pages of a file its first task left out."""
+    pdf_path, page_numbers, filename_hint, pages_per_task = task
+    page_count = result[1]
+    if page_numbers is not None or page_count is None:
+        return []
+    return [(pdf_path, list(range(start, min(start + pages_per_task, page_count))), filename_hint, pages_per_task)
+            for start in range(pages_per_task, page_count, pages_per_task)]
+
+def _page_count(pdf_path: str) -> Optional[int]:
+    """Return the number of pages in a PDF, or None if it cannot be opened."""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+    except Exception:
+        return None
+
+def _merge_invoice_parts(parts: List[Dict]) -> Dict:
+    """Join the page-range results of one PDF back into a single invoice dict."""
+    merged = dict(parts[0])
+    merged["pages"] = [page for part in parts for page in part["pages"]]
+    return merged
 
 def main():
     # Initialize the extractor
-    extractor = PDFDataExtractor()
+    extractor = PDFDataExtractor(cache=ExtractionCache())
     
     try:
         # Process PDFs in the data/raw directory
@@ -273,11 +516,11 @@ def main():
         ]
         
         # Store test QA pairs
-        for question in test_questions:
-            # In a real scenario, you would get the answer from your PDFRAGSystem(embedding_model="nomic-embed-text")
-            answer = "Sample answer"
-            sources = ["invoice_Aaron_Hawkins_4820.pdf"]
-            extractor.store_qa_pair(question, answer, sources)
+        # In a real scenario, you would get the answers from your PDFRAGSystem(embedding_model="nomic-embed-text")
+        extractor.store_qa_pairs(
+            {"question": question, "answer": "Sample answer", "sources": ["invoice_Aaron_Hawkins_4820.pdf"]}
+            for question in test_questions
+        )
         
         # Export QA pairs to JSON
         extractor.export_qa_pairs("data/qa_pairs.json")
@@ -287,6 +530,6 @@ def main():
 
 if __name__ == "__main__":
     # For local testing: extract and export all invoices to JSON (no MongoDB required)
-    extractor = PDFDataExtractor()
+    extractor = PDFDataExtractor(cache=ExtractionCache())
     extractor.export_invoices_to_json("data/raw", "data/invoice_data.json")
     print("Exported structured invoice data to data/invoice_data.json")
\ No newline at end of file
@@ -1,28 +1,74 @@
 import os
-from typing import List, Optional, Dict
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
+import json
+import pickle
+import threading
+from typing import List, Optional, Dict, Tuple, Union
+from langchain_ollama import OllamaLLM
 from langchain_community.vectorstores import FAISS
 from langchain.chains import RetrievalQA
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.prompts import PromptTemplate
 import fitz
 import logging
+from butterfly.rag.answer_cache import AnswerCache
+from butterfly.rag.chunking import InvoiceChunker, RecursiveChunker, get_chunker
+from butterfly.rag.embedding_cache import CachedEmbeddings, EmbeddingCache
+from butterfly.rag.embedding_client import DEFAULT_BATCH_SIZE, DEFAULT_MAX_IN_FLIGHT, OllamaEmbeddingClient
+from butterfly.rag.extraction_cache import ExtractionCache
+from butterfly.utils.file_utils import file_content_hash
+
+# Bump when extract_text_from_pdf changes its output, so cached page texts are not reused
+TEXT_EXTRACTOR_VERSION = "1"
+
+# Chunks retrieved as context per question
+RETRIEVER_K = 3
+# Answer returned when the model produced no text
+NO_ANSWER = "Sorry, I couldn't find an answer to your question."
+
+# Chunking strategy used when none is given (see butterfly.rag.chunking)
+DEFAULT_CHUNKER = "invoice"
+
+# Where create_vector_store persists the FAISS index, its docstore and the manifest of indexed files
+DEFAULT_INDEX_DIR = os.path.join("data", "index")
+INDEX_NAME = "index"
+MANIFEST_FILENAME = "manifest.json"
+# Bump when the persisted layout changes, so old indexes are rebuilt instead of loaded
+INDEX_FORMAT_VERSION = "1"
 
 class PDFRAGSystem:
-    def __init__(self, embedding_model: str = "nomic-embed-text"): 
-        """Initialize the RAG system with Mistral LLM and nomic-embed-text embeddings by default."""
+    def __init__(self, embedding_model: str = "nomic-embed-text", extraction_cache: Optional[ExtractionCache] = None,
+                 index_dir: Optional[str] = None, embedding_cache: Optional[EmbeddingCache] = None,
+                 chunker: Union[str, InvoiceChunker, RecursiveChunker, None] = None,
+                 answer_cache: Optional[AnswerCache] = None): 
+        """Initialize the RAG system with Mistral LLM and nomic-embed-text embeddings by default.
+
+        With index_dir, the vector store is persisted there and create_vector_store only
+        embeds the files that were added or changed since it was saved. With an
+        embedding_cache, chunks whose text was embedded before are not sent to Ollama again.
+        chunker is a chunking strategy or its name ("invoice" by default, or BUTTERFLY_CHUNKER).
+        With an answer_cache, ask_question reuses the answers to the same and to similar
+        questions until the vector store changes.
+        """
+        self.extraction_cache = extraction_cache
+        self.answer_cache = answer_cache
+        self.index_dir = index_dir
         ollama_base_url = f"http://{os.getenv('OLLAMA_HOST', 'localhost')}:11434"
         logging.debug(f"[PDFRAGSystem] Using Ollama base URL: {ollama_base_url}")
         # Use a lightweight embedding model and allow override
         embedding_model = embedding_model or "nomic-embed-text"
+        self.embedding_model = embedding_model
         try:
-            self.embeddings = OllamaEmbeddings(
+            # Chunks are embedded in batches over pooled connections, several batches at a time
+            self.embeddings = OllamaEmbeddingClient(
                 model=embedding_model,
-                base_url=ollama_base_url
+                base_url=ollama_base_url,
+                batch_size=int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+                max_in_flight=int(os.getenv("OLLAMA_EMBED_CONCURRENCY", DEFAULT_MAX_IN_FLIGHT))
             )
-            logging.info(f"[PDFRAGSystem] OllamaEmbeddings initialized with model: {embedding_model}")
+            if embedding_cache is not None:
+                self.embeddings = CachedEmbeddings(self.embeddings, embedding_cache, embedding_model)
+            logging.info(f"[PDFRAGSystem] OllamaEmbeddingClient initialized with model: {embedding_model}")
         except Exception as e:
-            logging.error(f"[PDFRAGSystem] Failed to initialize OllamaEmbeddings: {e}", exc_info=True)
+            logging.error(f"[PDFRAGSystem] Failed to initialize OllamaEmbeddingClient: {e}", exc_info=True)
             raise
         # Custom prompt template for Mistral
         self.prompt_template = """You are a helpful AI assistant specialized in analyzing PDF documents, particularly invoices. 
@@ -59,14 +105,27 @@ class PDFRAGSystem:
             raise
         self.vector_store = None
         self.qa_chain = None
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
+        # Chunk ids per source file, so a changed file's old chunks can be replaced
+        self.indexed_chunks: Dict[str, List[str]] = {}
+        # Content hash per indexed source file, so unchanged files are not re-embedded after a restart
+        self.indexed_hashes: Dict[str, str] = {}
+        # Bumped on every change to the vector store, so derived views (e.g. QueryRouter's table) know to rebuild
+        self.index_version = 0
+        self._index_lock = threading.Lock()
+        if chunker is None or isinstance(chunker, str):
+            chunker = get_chunker(chunker or os.getenv("BUTTERFLY_CHUNKER", DEFAULT_CHUNKER))
+        self.chunker = chunker
     
-    def extract_text_from_pdf(self, pdf_path: str) -> List[str]:
-        """Extract text from a PDF file."""
+    def extract_text_from_pdf(self, pdf_path: str, content_hash: Optional[str] = None) -> List[str]:
+        """Extract text from a PDF file, reusing cached page texts for unchanged files."""
+        key = None
+        if self.extraction_cache is not None:
+            key = self.extraction_cache.make_key(pdf_path, "page_text", TEXT_EXTRACTOR_VERSION,
+                                                 content_hash=content_hash)
+            texts = self.extraction_cache.get(key)
+            if texts is not None:
+                return texts
+        
         doc = fitz.open(pdf_path)
         texts = []
         
@@ -74,40 +133,192 @@ class PDFRAGSystem:
             text = page.get_text()
             if text.strip():
                 texts.append(text)
+        doc.close()
         
+        if key is not None:
+            self.extraction_cache.put(key, texts)
         return texts
     
+    def _chunk_pdf(self, pdf_path: str, content_hash: Optional[str] = None) -> Tuple[List[str], List[Dict], List[str]]:
+        """Split a PDF's page texts into chunks with their metadata and stable ids."""
+        filename = os.path.basename(pdf_path)
+        chunks, metadatas, ids = [], [], []
+        for i, text in enumerate(self.extract_text_from_pdf(pdf_path, content_hash)):
+            for j, (chunk, extra) in enumerate(self.chunker.chunk_page(text, filename)):
+                chunks.append(chunk)
+                metadatas.append({"source": filename, "page": i + 1, "chunk": j + 1, **extra})
+                ids.append(f"{filename}:{i + 1}:{j + 1}")
+        return chunks, metadatas, ids
+
     def create_vector_store(self, pdf_directory: str) -> None:
-        """Create a vector store from PDFs in the specified directory."""
+        """Create a vector store from PDFs in the specified directory.
+
+        With an index_dir, the persisted store is loaded instead and brought up to date:
+        only added or changed files are embedded and deleted files are dropped.
+        """
+        if isinstance(self.embeddings, CachedEmbeddings):
+            self.embeddings.reset_stats()
+        hashes = {filename: file_content_hash(os.path.join(pdf_directory, filename))
+                  for filename in os.listdir(pdf_directory) if filename.endswith('.pdf')}
+        if self.index_dir is not None and self.load_vector_store():
+            self._sync_vector_store(pdf_directory, hashes)
+            logging.info(f"[PDFRAGSystem] Embeddings: {self.embeddings.stats()}")
+            return
+        
         all_texts = []
         all_metadatas = []
+        all_ids = []
+        indexed_chunks = {}
         
-        for filename in os.listdir(pdf_directory):
-            if filename.endswith('.pdf'):
-                pdf_path = os.path.join(pdf_directory, filename)
-                texts = self.extract_text_from_pdf(pdf_path)
-                
-                # Split texts into chunks
-                for i, text in enumerate(texts):
-                    chunks = self.text_splitter.split_text(text)
-                    all_texts.extend(chunks)
-                    all_metadatas.extend([
-                        {
-                            "source": filename,
-                            "page": i + 1,
-                            "chunk": j + 1
-                        } for j in range(len(chunks))
-                    ])
+        for filename, content_hash in hashes.items():
+            texts, metadatas, ids = self._chunk_pdf(os.path.join(pdf_directory, filename), content_hash)
+            all_texts.extend(texts)
+            all_metadatas.extend(metadatas)
+            all_ids.extend(ids)
+            indexed_chunks[filename] = ids
         
         if not all_texts:
             raise ValueError("No text found in PDFs")
+        if self.extraction_cache is not None:
+            logging.info(f"[PDFRAGSystem] Extraction cache: {self.extraction_cache.stats()}")
         
-        self.vector_store = FAISS.from_texts(
-            all_texts,
-            self.embeddings,
-            metadatas=all_metadatas
-        )
+        with self._index_lock:
+            self.vector_store = FAISS.from_texts(
+                all_texts,
+                self.embeddings,
+                metadatas=all_metadatas,
+                ids=all_ids
+            )
+            self.indexed_chunks = indexed_chunks
+            self.indexed_hashes = hashes
+            self.index_version += 1
+        logging.info(f"[PDFRAGSystem] Embeddings: {self.embeddings.stats()}")
+        self.save_vector_store()
+
+    def _sync_vector_store(self, pdf_directory: str, hashes: Dict[str, str]) -> None:
+        """Re-embed the added and changed files of a loaded store and drop the deleted ones."""
+        removed = sorted(set(self.indexed_hashes) - set(hashes))
+        changed = sorted(f for f, content_hash in hashes.items() if self.indexed_hashes.get(f) != content_hash)
+        for filename in removed:
+            self.remove_pdf(filename)
+        for filename in changed:
+            self.index_pdf(os.path.join(pdf_directory, filename), hashes[filename])
+        if removed or changed:
+            self.save_vector_store()
+        logging.info(f"[PDFRAGSystem] Loaded vector store from {self.index_dir}: {len(changed)} files embedded, "
+                     f"{len(removed)} removed, {len(hashes) - len(changed)} unchanged")
+
+    def _manifest_settings(self) -> Dict:
+        """Settings a persisted store was built with; a store built with others is rebuilt."""
+        return {
+            "format": INDEX_FORMAT_VERSION,
+            "embedding_model": self.embedding_model,
+            "text_extractor": TEXT_EXTRACTOR_VERSION,
+            "chunker": self.chunker.settings(),
+        }
+
+    def save_vector_store(self) -> None:
+        """Persist the vector store and the manifest of indexed files to index_dir (if set).
+
+        The FAISS files are renamed into place before the manifest, and load_vector_store
+        checks the two against each other, so a crash mid-save causes a rebuild, not a bad index.
+        """
+        if self.index_dir is None or self.vector_store is None:
+            return
+        os.makedirs(self.index_dir, exist_ok=True)
+        temp_name = f"{INDEX_NAME}.{os.getpid()}.tmp"
+        with self._index_lock:
+            self.vector_store.save_local(self.index_dir, temp_name)
+            manifest = dict(self._manifest_settings(), files={
+                filename: {"content_hash": content_hash, "ids": self.indexed_chunks.get(filename, [])}
+                for filename, content_hash in self.indexed_hashes.items()
+            })
+        for suffix in (".faiss", ".pkl"):
+            os.replace(os.path.join(self.index_dir, temp_name + suffix),
+                       os.path.join(self.index_dir, INDEX_NAME + suffix))
+        manifest_path = os.path.join(self.index_dir, MANIFEST_FILENAME)
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    def load_vector_store(self) -> bool:
+        """Load the store persisted in index_dir; returns False if there is none usable."""
+        manifest_path = os.path.join(self.index_dir, MANIFEST_FILENAME)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            files = manifest.pop("files")
+            if manifest != self._manifest_settings():
+                logging.info(f"[PDFRAGSystem] Vector store in {self.index_dir} was built with other settings")
+                return False
+            # The pickled docstore was written by save_vector_store, not taken from elsewhere
+            vector_store = FAISS.load_local(self.index_dir, self.embeddings, INDEX_NAME,
+                                            allow_dangerous_deserialization=True)
+        except (OSError, ValueError, KeyError, RuntimeError, EOFError, pickle.UnpicklingError) as e:
+            logging.info(f"[PDFRAGSystem] No usable vector store in {self.index_dir} ({e}), rebuilding")
+            return False
+        ids = [chunk_id for entry in files.values() for chunk_id in entry["ids"]]
+        if sorted(ids) != sorted(vector_store.index_to_docstore_id.values()):
+            logging.info(f"[PDFRAGSystem] Vector store in {self.index_dir} does not match its manifest, rebuilding")
+            return False
+        with self._index_lock:
+            self.vector_store = vector_store
+            self.indexed_chunks = {filename: entry["ids"] for filename, entry in files.items()}
+            self.indexed_hashes = {filename: entry["content_hash"] for filename, entry in files.items()}
+            self.index_version += 1
+        return True
+
+    def index_pdf(self, pdf_path: str, content_hash: Optional[str] = None) -> int:
+        """Add or replace one PDF's chunks in the vector store without rebuilding it.
+
+        Returns the number of chunks indexed. The store is created on first use, and
+        the QA chain is rebuilt in that case so it retrieves from the new store.
+        Call save_vector_store afterwards to persist the change.
+        """
+        filename = os.path.basename(pdf_path)
+        content_hash = content_hash or file_content_hash(pdf_path)
+        texts, metadatas, ids = self._chunk_pdf(pdf_path, content_hash)
+        # Embed outside the lock; queries keep using the current index meanwhile
+        embeddings = self.embeddings.embed_documents(texts) if texts else []
+        with self._index_lock:
+            self._remove_chunks(filename)
+            self.indexed_hashes[filename] = content_hash
+            self.index_version += 1
+            if not texts:
+                return 0
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_embeddings(
+                    list(zip(texts, embeddings)), self.embeddings, metadatas=metadatas, ids=ids)
+                if self.qa_chain is not None:
+                    self.setup_qa_chain()
+            else:
+                self.vector_store.add_embeddings(list(zip(texts, embeddings)), metadatas=metadatas, ids=ids)
+            self.indexed_chunks[filename] = ids
+        logging.info(f"[PDFRAGSystem] Indexed {len(ids)} chunks of {filename}")
+        return len(ids)
+
+    def remove_pdf(self, filename: str) -> None:
+        """Drop a deleted PDF's chunks from the vector store."""
+        with self._index_lock:
+            self._remove_chunks(filename)
+
+    def _remove_chunks(self, filename: str) -> None:
+        """Delete the chunks indexed for a file; the caller holds the index lock."""
+        self.indexed_hashes.pop(filename, None)
+        self.index_version += 1
+        ids = self.indexed_chunks.pop(filename, None)
+        if ids and self.vector_store is not None:
+            self.vector_store.delete(ids)
     
+    def chunk_metadata(self) -> Tuple[int, List[Dict]]:
+        """The index_version and the metadata of every chunk in the vector store, as one snapshot."""
+        with self._index_lock:
+            if self.vector_store is None:
+                return self.index_version, []
+            docstore = self.vector_store.docstore
+            return self.index_version, [docstore.search(chunk_id).metadata
+                                        for chunk_id in self.vector_store.index_to_docstore_id.values()]
+
     def setup_qa_chain(self) -> None:
         """Set up the question-answering chain with custom prompt."""
         if not self.vector_store:
@@ -122,7 +333,7 @@ class PDFRAGSystem:
             llm=self.llm,
             chain_type="stuff",
             retriever=self.vector_store.as_retriever(
-                search_kwargs={"k": 3}
+                search_kwargs={"k": RETRIEVER_K}
             ),
             return_source_documents=True,
             chain_type_kwargs={"prompt": prompt},
@@ -135,17 +346,38 @@ class PDFRAGSystem:
             raise ValueError("QA chain not set up. Call setup_qa_chain first.")
         
         try:
+            vector = None
+            if self.answer_cache is not None:
+                # Read the version first: an answer computed while the index changes is cached under the old one
+                index_version = self.index_version
+                cached, vector = self.answer_cache.get(question, index_version, self.embeddings.embed_query)
+                if cached is not None:
+                    logging.debug(f"[ask_question] Answer cache hit ({cached['cached']}) for: {question}")
+                    return cached
             logging.debug(f"[ask_question] Invoking QA chain with question: {question}")
-            result = self.qa_chain.invoke({"query": question})
+            # Embed outside the index lock (reusing the cache lookup's vector), but search under it:
+            # the ingestion daemon adds and deletes chunks concurrently, and FAISS and the docstore
+            # cannot be searched mid-update. The LLM then runs on the retrieved chunks without the lock.
+            if vector is None:
+                vector = self.embeddings.embed_query(question)
+            with self._index_lock:
+                docs = self.vector_store.similarity_search_by_vector(vector, k=RETRIEVER_K)
+            output = self.qa_chain.combine_documents_chain.invoke({"input_documents": docs, "question": question})
+            text = (output.get("output_text") or "").strip()
+            result = {"result": text or NO_ANSWER, "source_documents": docs}
             sources = []
             for doc in result.get("source_documents", []):
                 source_info = doc.metadata
                 sources.append(f"{source_info['source']} (Page {source_info['page']}, Chunk {source_info['chunk']})")
             logging.debug(f"[ask_question] QA chain result: {result}")
-            return {
-                "answer": result.get("result", "Sorry, I couldn't find an answer to your question."),
+            answer = {
+                "answer": result["result"],
                 "sources": sources
             }
+            # An empty model output is not an answer worth repeating for the next hour
+            if self.answer_cache is not None and text:
+                self.answer_cache.put(question, answer, index_version, vector)
+            return answer
         except Exception as e:
             logging.error(f"Error during question answering: {e}", exc_info=True)
             return None
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""Structured fast path in front of PDFRAGSystem.ask_question.
+
+Questions that aggregate, filter or compare invoices by their structured fields
+(customer_name, amount, date, invoice_number) are answered from an in-memory
+columnar table of those fields in milliseconds, instead of by the LLM over the
+three retrieved chunks. Everything else falls back to RAG.
+
+The table is built from the metadata the invoice chunker attaches to header chunks,
+so it follows the vector store as files are indexed and removed, or from the
+invoices collection in MongoDB with an aggregation that projects only those fields.
+"""
+import logging
+import re
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from butterfly.rag.pdf_rag import PDFRAGSystem
+
+# Questions about things the table does not hold go to RAG even if they name a customer
+RAG_ONLY_RE = re.compile(r"\b(items?|products?|quantit|ship|discount|address|notes?\b|terms?\b|why\b|explain"
+                         r"|describ|summar)")
+AGGREGATES = (
+    ("count", re.compile(r"\b(how many|count|number of)\b")),
+    ("average", re.compile(r"\b(average|avg|mean)\b")),
+    ("max", re.compile(r"\b(largest|highest|biggest|maximum|max|most expensive)\b")),
+    ("min", re.compile(r"\b(smallest|lowest|minimum|min|cheapest)\b")),
+    ("sum", re.compile(r"\b(total|sum)\b")),
+)
+LIST_RE = re.compile(r"\b(find|list|show|which|all invoices|invoices (for|from|of|by))\b")
+COMPARE_RE = re.compile(r"\b(compare|comparison|versus|vs\.?)\b")
+TOPIC_RE = re.compile(r"\b(invoices?|amounts?|customers?|billed|spent|spend)\b")
+INVOICE_NUMBER_RE = re.compile(r"(?:#|\binvoice (?:number |no\.? )?)(\d+)\b")
+AMOUNT_RE = re.compile(r"\b(over|above|more than|greater than|at least|under|below|less than|at most)"
+                       r" \$?(\d[\d,]*(?:\.\d+)?)")
+DATE_RE = re.compile(r"\b(before|after|since|until|on) (\d{4}-\d{2}-\d{2})\b")
+YEAR_RE = re.compile(r"\b(?:in|during|for) (\d{4})\b")
+# Capitalized names after "for", "between", ... that must all be customers of the table
+NAME_RE = re.compile(r"\b(?:for|from|by|of|between|and|vs\.?|versus) ([A-Z][\w.'-]*(?: [A-Z][\w.'-]*)*)")
+LOWER_BOUNDS = ("over", "above", "more than", "greater than", "at least")
+
+
+class InvoiceTable:
+    def __init__(self, rows: Iterable[Dict]):
+        """Columnar arrays of one row per invoice: source, page, invoice_number, customer, date, amount.
+
+        Rows of the same source and invoice number (e.g. further pages of a multi-page
+        invoice) are folded into the first one that has an amount.
+        """
+        invoices: Dict[Tuple, Dict] = {}
+        for row in rows:
+            key = (row.get("source"), row.get("invoice_number"))
+            if key not in invoices or invoices[key].get("amount") is None:
+                invoices[key] = row
+        rows = list(invoices.values())
+        self.sources = np.array([row.get("source") or "" for row in rows], dtype=object)
+        self.pages = np.array([row.get("page") or 1 for row in rows], dtype=np.int32)
+        self.invoice_numbers = np.array([str(row.get("invoice_number") or "") for row in rows], dtype=object)
+        self.customers = np.array([row.get("customer_name") or "Unknown" for row in rows], dtype=object)
+        self.customer_keys = np.array([name.lower() for name in self.customers], dtype=object)
+        self.dates = np.array([_parse_date(row.get("date")) for row in rows], dtype="datetime64[D]")
+        self.amounts = np.array([np.nan if row.get("amount") is None else float(row["amount"]) for row in rows],
+                                dtype=np.float64)
+        # Longest first, so "Aaron Hawkins Jr" is matched before "Aaron Hawkins"
+        self.customer_names = sorted({key for key in self.customer_keys if key != "unknown"}, key=len, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @classmethod
+    def from_rag(cls, rag_system: PDFRAGSystem) -> "InvoiceTable":
+        """Table of the invoice fields on the header chunks in rag_system's vector store."""
+        _, metadatas = rag_system.chunk_metadata()
+        return cls(metadata for metadata in metadatas if metadata.get("kind") == "header")
+
+    @classmethod
+    def from_mongo(cls, invoices) -> "InvoiceTable":
+        """Table of the page metadata of the invoices collection, as PDFDataExtractor stores it."""
+        pipeline = [
+            {"$unwind": "$pages"},
+            {"$project": {"_id": 0, "source": "$filename", "page": "$pages.page_number",
+                          "invoice_number": "$pages.metadata.invoice_number",
+                          "customer_name": "$pages.metadata.customer_name",
+                          "date": "$pages.metadata.date", "amount": "$pages.metadata.amount"}},
+        ]
+        return cls(invoices.aggregate(pipeline))
+
+    def source(self, i: int) -> str:
+        return f"{self.sources[i]} (Page {self.pages[i]})"
+
+
+def _parse_date(value) -> np.datetime64:
+    """The ISO date FieldExtractor normalizes to, or NaT for anything else."""
+    try:
+        return np.datetime64(date.fromisoformat(str(value)), "D")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
+
+
+class QueryRouter:
+    def __init__(self, rag_system: PDFRAGSystem, invoices=None):
+        """Answer structured invoice questions from an InvoiceTable and the rest with rag_system.
+
+        The table is built from rag_system's header chunks, or from the invoices Mongo
+        collection if one is given, and rebuilt whenever rag_system's index changes.
+        """
+        self.rag_system = rag_system
+        self.invoices = invoices
+        self.table: Optional[InvoiceTable] = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> InvoiceTable:
+        """Return the table, rebuilding it if the vector store changed since it was built."""
+        with self._lock:
+            version = self.rag_system.index_version
+            if self.table is None or version != self._version:
+                started = time.perf_counter()
+                self.table = InvoiceTable.from_mongo(self.invoices) if self.invoices is not None \
+                    else InvoiceTable.from_rag(self.rag_system)
+                self._version = version
+                logging.info(f"[QueryRouter] Built invoice table of {len(self.table)} invoices in "
+                             f"{(time.perf_counter() - started) * 1000:.1f} ms")
+            return self.table
+
+    def ask_question(self, question: str) -> Optional[Dict]:
+        """Same result as PDFRAGSystem.ask_question, plus the route that answered it."""
+        started = time.perf_counter()
+        result = self.answer_structured(question)
+        if result is not None:
+            logging.info(f"[QueryRouter] Answered from the invoice table in "
+                         f"{(time.perf_counter() - started) * 1000:.1f} ms: {question}")
+            return dict(result, route="structured")
+        result = self.rag_system.ask_question(question)
+        return dict(result, route="rag") if result is not None else None
+
+    def answer_structured(self, question: str) -> Optional[Dict]:
+        """Answer an aggregate, filter or compare question, or None if it needs RAG."""
+        text = " ".join(question.lower().split())
+        if RAG_ONLY_RE.search(text):
+            return None
+        table = self.refresh()
+        if not len(table):
+            return None
+        customers = self._customers(table, text)
+        if any(name.lower() not in customers for name in NAME_RE.findall(question)):
+            # A customer (or anything else) the table does not know; filtering would silently drop it
+            return None
+        numbers = INVOICE_NUMBER_RE.findall(text)
+        mask, conditions = self._filters(table, text, customers, numbers)
+        if not (customers or numbers or TOPIC_RE.search(text)):
+            return None
+
+        aggregate = next((name for name, pattern in AGGREGATES if pattern.search(text)), None)
+        if COMPARE_RE.search(text) and len(customers) >= 2:
+            return self._compare(table, mask, customers)
+        if aggregate is not None:
+            return self._aggregate(table, mask, aggregate, conditions)
+        if LIST_RE.search(text) or customers or numbers:
+            return self._list(table, mask, conditions)
+        return None
+
+    @staticmethod
+    def _customers(table: InvoiceTable, text: str) -> List[str]:
+        """Customer names of the table mentioned in the question, in the order they appear."""
+        found, taken = [], []
+        for name in table.customer_names:
+            for match in re.finditer(rf"\b{re.escape(name)}\b", text):
+                if not any(start < match.end() and match.start() < end for start, end in taken):
+                    found.append((match.start(), name))
+                    taken.append(match.span())
+        return [name for _, name in sorted(found)]
+
+    @staticmethod
+    def _filters(table: InvoiceTable, text: str, customers: List[str],
+                 numbers: List[str]) -> Tuple[np.ndarray, List[str]]:
+        """Boolean row mask of the question's filters and a description of each."""
+        mask = np.ones(len(table), dtype=bool)
+        conditions = []
+        if customers:
+            mask &= np.isin(table.customer_keys, customers)
+            conditions.append("for " + " or ".join(
+                table.customers[table.customer_keys == name][0] for name in customers))
+        if numbers:
+            mask &= np.isin(table.invoice_numbers, numbers)
+            conditions.append("numbered " + ", ".join(f"#{number}" for number in numbers))
+        for word, value in AMOUNT_RE.findall(text):
+            amount = float(value.replace(",", ""))
+            with np.errstate(invalid="ignore"):
+                if word in LOWER_BOUNDS:
+                    mask &= table.amounts >= amount if word == "at least" else table.amounts > amount
+                else:
+                    mask &= table.amounts <= amount if word == "at most" else table.amounts < amount
+            conditions.append(f"{word} {_money(amount)}")
+        for word, value in DATE_RE.findall(text):
+            day = _parse_date(value)
+            if np.isnat(day):
+                continue
+            if word == "before":
+                mask &= table.dates < day
+            elif word in ("after", "since"):
+                mask &= table.dates > day if word == "after" else table.dates >= day
+            elif word == "until":
+                mask &= table.dates <= day
+            else:
+                mask &= table.dates == day
+            conditions.append(f"dated {word} {value}")
+        for year in YEAR_RE.findall(text):
+            start = np.datetime64(f"{year}-01-01", "D")
+            mask &= (table.dates >= start) & (table.dates < np.datetime64(f"{int(year) + 1}-01-01", "D"))
+            conditions.append(f"dated in {year}")
+        return mask, conditions
+
+    @staticmethod
+    def _aggregate(table: InvoiceTable, mask: np.ndarray, aggregate: str, conditions: List[str]) -> Dict:
+        scope = "invoices " + " ".join(conditions) if conditions else "all invoices"
+        rows = np.flatnonzero(mask)
+        amounts = table.amounts[rows]
+        priced = rows[~np.isnan(amounts)]
+        if aggregate == "count":
+            answer = f"There are {len(rows)} {scope}."
+        elif not len(priced):
+            answer = f"No amounts were found for {scope}."
+        elif aggregate == "sum":
+            answer = f"The total amount across {scope} is {_money(table.amounts[priced].sum())} " \
+                     f"({len(priced)} invoices)."
+        elif aggregate == "average":
+            answer = f"The average amount across {scope} is {_money(table.amounts[priced].mean())} " \
+                     f"({len(priced)} invoices)."
+        else:
+            pick = priced[np.argmax(table.amounts[priced]) if aggregate == "max" else np.argmin(table.amounts[priced])]
+            label = "largest" if aggregate == "max" else "smallest"
+            answer = f"The {label} of {scope} is invoice #{table.invoice_numbers[pick]} for " \
+                     f"{table.customers[pick]} ({table.dates[pick]}) at {_money(table.amounts[pick])}."
+            rows = [pick]
+        return {"answer": answer, "sources": [table.source(i) for i in rows]}
+
+    @staticmethod
+    def _list(table: InvoiceTable, mask: np.ndarray, conditions: List[str]) -> Dict:
+        scope = "invoices " + " ".join(conditions) if conditions else "invoices"
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return {"answer": f"No {scope} were found.", "sources": []}
+        rows = rows[np.argsort(table.dates[rows], kind="stable")]
+        lines = [f"- Invoice #{table.invoice_numbers[i]} for {table.customers[i]}, dated {table.dates[i]}: "
+                 f"{_money(table.amounts[i]) if not np.isnan(table.amounts[i]) else 'amount unknown'}"
+                 for i in rows]
+        total = np.nansum(table.amounts[rows])
+        answer = f"Found {len(rows)} {scope} (total {_money(total)}):\n" + "\n".join(lines)
+        return {"answer": answer, "sources": [table.source(i) for i in rows]}
+
+    @staticmethod
+    def _compare(table: InvoiceTable, mask: np.ndarray, customers: List[str]) -> Dict:
+        lines, sources, totals = [], [], []
+        for name in customers:
+            rows = np.flatnonzero(mask & (table.customer_keys == name))
+            amounts = table.amounts[rows]
+            total = np.nansum(amounts)
+            totals.append((total, table.customers[rows[0]] if len(rows) else name))
+            average = _money(np.nanmean(amounts)) if len(rows) and not np.isnan(amounts).all() else "n/a"
+            lines.append(f"- {totals[-1][1]}: {len(rows)} invoices, total {_money(total)}, average {average}")
+            sources.extend(table.source(i) for i in rows)
+        (high, high_name), (low, low_name) = max(totals), min(totals)
+        summary = f"{high_name} has the higher total, by {_money(high - low)}." if len(customers) == 2 \
+            else f"{high_name} has the highest total and {low_name} the lowest."
+        return {"answer": "\n".join(["Invoice amounts by customer:"] + lines + [summary]), "sources": sources}
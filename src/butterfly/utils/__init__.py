@@ -2,11 +2,21 @@
 Utility functions for file operations.
 """
 
-from .file_utils import ensure_directory, get_file_extension, list_files, get_output_path
+from .file_utils import ensure_directory, get_file_extension, list_files, get_output_path, file_content_hash
+from .disk_cache import DiskCache
+from .parallel import imap_ordered, resolve_workers
+from .jsonl import JSONLWriter, iter_jsonl, json_default
 
 __all__ = [
     "ensure_directory",
     "get_file_extension",
     "list_files",
     "get_output_path",
+    "file_content_hash",
+    "DiskCache",
+    "imap_ordered",
+    "resolve_workers",
+    "JSONLWriter",
+    "iter_jsonl",
+    "json_default",
 ] 
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Size-bounded, persistent key-value cache backed by SQLite.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+# Keys looked up per SELECT by get_many
+_BATCH_KEYS = 500
+
+
+class DiskCache:
+    """
+    Persistent bytes-to-bytes cache with least-recently-used eviction.
+
+    Entries live in a single SQLite file so the cache survives restarts and can be
+    shared by several processes. Once the stored values exceed ``max_bytes`` the
+    least recently read or written entries are dropped.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Open (or create) a cache file.
+
+        Args:
+            path: Path of the SQLite database file
+            max_bytes: Upper bound on the total size of stored values
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a value and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The stored bytes, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return bytes(row[0])
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Store a value, evicting least recently used entries if over budget.
+
+        Args:
+            key: Cache key
+            value: Bytes to store
+        """
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Look up several values in one transaction and mark them as recently used.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            The stored bytes of every key that was found
+        """
+        found: Dict[str, bytes] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters per statement
+            for start in range(0, len(unique), _BATCH_KEYS):
+                batch = unique[start:start + _BATCH_KEYS]
+                placeholders = ",".join("?" * len(batch))
+                found.update((key, bytes(value)) for key, value in self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch))
+            now = time.time()
+            self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                   [(now, key) for key in found])
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def contains_many(self, keys: List[str]) -> Set[str]:
+        """
+        Check which keys are stored, without reading their values or counting hits.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            The keys that are present
+        """
+        present: Set[str] = set()
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), _BATCH_KEYS):
+                batch = unique[start:start + _BATCH_KEYS]
+                placeholders = ",".join("?" * len(batch))
+                present.update(key for (key,) in self._conn.execute(
+                    f"SELECT key FROM entries WHERE key IN ({placeholders})", batch))
+        return present
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        """
+        Store several values in one transaction, then evict if over budget.
+
+        Args:
+            items: Bytes to store by cache key
+        """
+        now = time.time()
+        rows = [(key, sqlite3.Binary(value), len(value), now) for key, value in items.items()
+                if len(value) <= self.max_bytes]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        """
+        Remove a single entry if present.
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop the oldest entries until the total size fits in max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report entry count, stored bytes and hit/miss counters.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from pathlib import Path
 from typing import List, Optional
@@ -56,4 +57,21 @@ def get_output_path(input_path: str, suffix: str) -> str:
         The new output path
     """
     path = Path(input_path)
-    return str(path.with_name(f"{path.stem}{suffix}{path.suffix}")) 
\ No newline at end of file
+    return str(path.with_name(f"{path.stem}{suffix}{path.suffix}"))
+
+def file_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file's contents.
+    
+    Args:
+        file_path: Path to the file
+        chunk_size: Number of bytes read at a time
+        
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
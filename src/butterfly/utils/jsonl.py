@@ -0,0 +1,155 @@
+"""
+Streaming JSON Lines reading and writing with optional gzip/zstd compression.
+"""
+
+import gzip
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, IO, Iterator, Optional
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def json_default(o: Any) -> Any:
+    """
+    ``json.dump`` hook that writes datetimes as ISO 8601 strings.
+
+    Args:
+        o: Object the json module could not serialize
+
+    Returns:
+        A JSON-serializable replacement
+    """
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def compression_from_path(path: str) -> Optional[str]:
+    """
+    Infer the compression of a file from its suffix.
+
+    Args:
+        path: File path
+
+    Returns:
+        "gzip", "zstd" or None
+    """
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def _require_zstd() -> None:
+    if not HAS_ZSTD:
+        raise ImportError("zstd compression requires the 'zstandard' package: pip install zstandard")
+
+
+def open_text_writer(path: str, compression: Optional[str] = None) -> IO[str]:
+    """
+    Open a text file for writing, optionally compressed.
+
+    Args:
+        path: Output path
+        compression: "gzip", "zstd" or None; inferred from the suffix when None
+
+    Returns:
+        Writable text stream
+    """
+    compression = compression or compression_from_path(path)
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8")
+    if compression == "zstd":
+        _require_zstd()
+        raw = open(path, "wb")
+        writer = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding="utf-8")
+    if compression is not None:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return open(path, "w", encoding="utf-8")
+
+
+def open_text_reader(path: str) -> IO[str]:
+    """
+    Open a possibly compressed text file for reading, detecting gzip/zstd by magic bytes.
+
+    Args:
+        path: Input path
+
+    Returns:
+        Readable text stream
+    """
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if magic.startswith(ZSTD_MAGIC):
+        _require_zstd()
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class JSONLWriter:
+    """
+    Write records as JSON Lines, one record per line, as soon as they are produced.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        """
+        Open the output file.
+
+        Args:
+            path: Output path (".gz"/".zst" suffixes select compression)
+            compression: Explicit "gzip", "zstd" or None
+        """
+        self.path = path
+        self.count = 0
+        self._f = open_text_writer(path, compression)
+
+    def write(self, record: Dict) -> None:
+        """
+        Append one record.
+
+        Args:
+            record: JSON-serializable dict (datetimes are written as ISO strings)
+        """
+        self._f.write(json.dumps(record, default=json_default))
+        self._f.write("\n")
+        self.count += 1
+
+    def close(self) -> None:
+        """Flush and close the output file."""
+        self._f.close()
+
+    def __enter__(self) -> "JSONLWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """
+    Stream records from a JSON Lines file without loading it into memory.
+
+    Args:
+        path: Plain, gzip or zstd compressed JSONL file
+
+    Yields:
+        One decoded record per non-empty line
+    """
+    with open_text_reader(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
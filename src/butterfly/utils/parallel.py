@@ -0,0 +1,125 @@
+"""
+Process-pool helpers for spreading per-file work across CPU cores.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """
+    Turn a user supplied worker count into a concrete number of processes.
+
+    Args:
+        workers: Requested worker count; ``None`` or values below 1 mean "one per CPU"
+
+    Returns:
+        Number of worker processes to start
+    """
+    if workers is None or workers < 1:
+        return os.cpu_count() or 1
+    return workers
+
+
+def imap_ordered(
+    func: Callable[[Any], Any],
+    tasks: Iterable[Any],
+    workers: Optional[int] = None,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Sequence[Any] = (),
+    max_in_flight: Optional[int] = None,
+    expand: Optional[Callable[[Any, Any], Sequence[Any]]] = None,
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Run ``func(task)`` for every task in a process pool and yield results in task order.
+
+    Exceptions raised by ``func`` are returned instead of raised, so one bad task
+    never stops the batch. If a worker process dies (e.g. a segfault inside a native
+    library) the pool is restarted and the tasks that were in flight are re-run one
+    at a time, so only the task that actually crashes the worker is reported.
+
+    Args:
+        func: Picklable, module-level callable executed in the workers
+        tasks: Picklable task arguments, one call per task
+        workers: Number of worker processes (``None`` means one per CPU)
+        initializer: Optional per-worker initializer
+        initargs: Arguments passed to ``initializer``
+        max_in_flight: Number of tasks that may be running or finished but not yet yielded;
+            bounds both the running tasks and the finished results held back behind a slow
+            task (the next task to yield is always submitted, so this can be exceeded by one)
+        expand: ``expand(task, result)`` returns further tasks to run after a task that
+            succeeded, e.g. the rest of a job whose size only the worker can tell; they are
+            yielded right after it, before any later task
+
+    Yields:
+        ``(task, result, error)`` tuples in the same order as ``tasks``, with the tasks
+        added by ``expand`` after the task that added them
+    """
+    tasks = list(tasks)
+    workers = resolve_workers(workers)
+    max_in_flight = max_in_flight or workers * 4
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=tuple(initargs))
+
+    # Indices of the tasks not yet yielded and of those not yet submitted, both in yield order
+    order = deque(range(len(tasks)))
+    pending = deque(order)
+    suspects = deque()
+    in_flight = {}
+    results = {}
+    executor = new_pool()
+    try:
+        while order:
+            if suspects:
+                # Isolation mode: re-run tasks from a crashed pool one by one.
+                index = suspects.popleft()
+                future = executor.submit(func, tasks[index])
+                try:
+                    results[index] = (future.result(), None)
+                except BrokenProcessPool:
+                    results[index] = (None, RuntimeError("worker process crashed"))
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = new_pool()
+                except Exception as e:
+                    results[index] = (None, e)
+            else:
+                # Only tasks within the window are submitted, so results finished ahead of a slow
+                # task pile up to at most max_in_flight - 1 instead of the rest of the batch
+                while pending and (len(in_flight) + len(results) < max_in_flight or pending[0] == order[0]):
+                    index = pending.popleft()
+                    in_flight[executor.submit(func, tasks[index])] = index
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    index = in_flight.pop(future)
+                    try:
+                        results[index] = (future.result(), None)
+                    except BrokenProcessPool:
+                        suspects.append(index)
+                        broken = True
+                    except Exception as e:
+                        results[index] = (None, e)
+                if broken:
+                    suspects.extend(in_flight.values())
+                    suspects = deque(sorted(suspects))
+                    in_flight.clear()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = new_pool()
+
+            while order and order[0] in results:
+                index = order.popleft()
+                result, error = results.pop(index)
+                if expand is not None and error is None:
+                    # Everything still pending comes after this task, so the new tasks go first
+                    first = len(tasks)
+                    tasks.extend(expand(tasks[index], result))
+                    added = range(first, len(tasks))
+                    order.extendleft(reversed(added))
+                    pending.extendleft(reversed(added))
+                yield tasks[index], result, error
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -14,7 +14,7 @@ class OCRVisualizer:
         """
         Visualize OCR text detection results
         Args:
-            image: Input image (BGR or RGB)
+            image: Input image (BGR, RGB or grayscale)
             text_regions: List of ((x1,y1,x2,y2), text) tuples
             output_path: Optional path to save visualization
         """
@@ -24,7 +24,7 @@ class OCRVisualizer:
         if image.shape[-1] == 3 and len(image.shape) == 3:
             image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
-        plt.imshow(image)
+        plt.imshow(image, cmap='gray' if image.ndim == 2 else None)
         ax = plt.gca()
         
         for (x1, y1, x2, y2), text in text_regions:
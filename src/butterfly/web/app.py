@@ -1,6 +1,11 @@
 from flask import Flask, render_template, request, jsonify
-from butterfly.rag.pdf_rag import PDFRAGSystem
+from butterfly.rag.pdf_rag import DEFAULT_INDEX_DIR, PDFRAGSystem
 from butterfly.rag.pdf_extractor import PDFDataExtractor
+from butterfly.rag.extraction_cache import ExtractionCache
+from butterfly.rag.embedding_cache import EmbeddingCache
+from butterfly.rag.answer_cache import DEFAULT_MAX_ENTRIES, DEFAULT_THRESHOLD, DEFAULT_TTL_SECONDS, AnswerCache
+from butterfly.rag.ingest_daemon import IngestionDaemon
+from butterfly.rag.query_router import QueryRouter
 import os
 import logging
 import traceback
@@ -29,9 +34,27 @@ mongo_client = MongoClient("mongodb://mongodb:27017/")
 db = mongo_client["pdf_rag"]
 
 # Initialize RAG system
-rag_system = PDFRAGSystem(embedding_model="nomic-embed-text")  # Uses 'mistral' for LLM and 'nomic-embed-text' for embeddings
+extraction_cache = ExtractionCache()
+rag_system = PDFRAGSystem(embedding_model="nomic-embed-text", extraction_cache=extraction_cache,
+                          index_dir=os.getenv("BUTTERFLY_INDEX_DIR", DEFAULT_INDEX_DIR),
+                          embedding_cache=EmbeddingCache(),
+                          answer_cache=AnswerCache(
+                              threshold=float(os.getenv("BUTTERFLY_ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+                              ttl_seconds=float(os.getenv("BUTTERFLY_ANSWER_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                              max_entries=int(os.getenv("BUTTERFLY_ANSWER_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+                          ))  # Uses 'mistral' for LLM and 'nomic-embed-text' for embeddings
+# Loads the persisted index and embeds only the PDFs added or changed since it was saved
 rag_system.create_vector_store("data/raw")
 rag_system.setup_qa_chain()
+# Totals, filters and comparisons over invoice fields are answered without the LLM
+query_router = QueryRouter(rag_system)
+
+# Ingest invoices dropped into data/raw while the app runs (set BUTTERFLY_WATCH=0 to disable)
+if os.getenv("BUTTERFLY_WATCH", "1") == "1":
+    ingestion_daemon = IngestionDaemon(
+        "data/raw", PDFDataExtractor(cache=extraction_cache), rag_system=rag_system,
+        use_inotify=None if os.getenv("BUTTERFLY_WATCH_POLL", "0") == "0" else False
+    ).start()
 
 @app.route('/')
 def home():
@@ -50,8 +73,8 @@ def chat():
                 'error': 'No question provided'
             }), 400
         
-        # Get answer from RAG system
-        result = rag_system.ask_question(question)
+        # Get answer from the invoice table or, for open-ended questions, the RAG system
+        result = query_router.ask_question(question)
         
         if not result:
             return jsonify({
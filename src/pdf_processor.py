@@ -4,53 +4,44 @@ PDF processing functions for converting PDFs to JPEG images.
 
 import os
 import fitz  # PyMuPDF
+from src.butterfly.core.render_cache import RenderCache
 
-def pdf_to_jpeg(pdf_path):
+# Rendered pages are cached here, under a byte budget (see RenderCache)
+OCR_IMAGES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'ocr_images'))
+
+def pdf_to_jpeg(pdf_path, resolution_dpi=300, min_dpi=None, cache=None):
     """
     Convert a PDF file to JPEG images.
     
+    Pages are rendered into a RenderCache; an unchanged PDF rendered with the same
+    settings again gets the existing images back without being re-rendered.
+    
     Args:
         pdf_path (str): Path to the PDF file
+        resolution_dpi (int): Render resolution (the highest one when min_dpi is set)
+        min_dpi (int): If set, each page is rendered at the lowest DPI between min_dpi and
+            resolution_dpi that keeps its text large enough for OCR
+        cache (RenderCache): Cache to render into (default: JPEGs in data/ocr_images)
         
     Returns:
         list: List of paths to generated JPEG images, or None if there's an error
     """
+    cache = cache or RenderCache(OCR_IMAGES_DIR)
+    hits = cache.hits
     try:
-        doc = fitz.open(pdf_path)  # Open document
-    except Exception as e:
+        pages = cache.render_pdf(pdf_path, resolution_dpi, min_dpi)
+    except (OSError, fitz.FileDataError) as e:
         print(f"Error opening PDF: {e}")
         return None  # Skip processing if there's an error opening the PDF
-
-    resolution_dpi = 300  # Higher DPI gives better quality
-    zoom = resolution_dpi / 72  # Default PDF resolution is 72 DPI
-    matrix = fitz.Matrix(zoom, zoom)  # Scaling matrix
-
-    # Extract base name
-    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    # Set output directory for OCR images
-    output_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'ocr_images')
-    output_dir = os.path.abspath(output_dir)
-    os.makedirs(output_dir, exist_ok=True)
-
-    output_images = []  # List to store paths of generated images
-
-    try:
-        for page_num in range(len(doc)):
-            page = doc[page_num]  # Get page
-            pix = page.get_pixmap(matrix=matrix)  # Render page to image
-            
-            # Output file path (page_1, page_2, etc. if multi-page)
-            output_file_path = os.path.join(output_dir, f"{base_name}_page_{page_num + 1}.jpeg")
-            
-            pix.save(output_file_path)  # Save image
-            output_images.append(output_file_path)  # Store file path
-            print(f"Converted PDF Page {page_num + 1} to JPEG: {output_file_path}")
-
-    except fitz.fitz.MuPDFError as e:
+    except RuntimeError as e:
         print(f"MuPDF error while processing {pdf_path}: {e}")
         return None
     except Exception as e:
         print(f"Unexpected error while converting PDF to JPEG: {e}")
         return None
-        
-    return output_images 
\ No newline at end of file
+    
+    output_images = [path for path, _ in pages]  # List to store paths of generated images
+    action = "Reused cached" if cache.hits > hits else "Converted"
+    for page_num, path in enumerate(output_images):
+        print(f"{action} PDF Page {page_num + 1} to JPEG: {path}")
+    return output_images
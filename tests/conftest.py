@@ -0,0 +1,13 @@
+import fitz
+import pytest
+
+@pytest.fixture
+def make_invoice():
+    """Factory that writes a one-page text invoice PDF: make_invoice(path, total, number="4820")."""
+    def make(path, total, number="4820", customer="Aaron Hawkins"):
+        doc = fitz.open()
+        page = doc.new_page()
+        for i, line in enumerate(["INVOICE", f"# {number}", "Bill To:", customer, f"Total: ${total}"]):
+            page.insert_text((72, 72 + 14 * i), line)
+        doc.save(str(path))
+    return make
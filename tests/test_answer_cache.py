@@ -0,0 +1,59 @@
+from butterfly.rag import answer_cache
+from butterfly.rag.answer_cache import AnswerCache, normalize_question
+
+VECTORS = {
+    "What's the total amount across all invoices?": [1.0, 0.0, 0.0],
+    "what is the total amount of all the invoices": [0.99, 0.1, 0.0],
+    "Which invoices are overdue?": [0.0, 1.0, 0.0],
+    "What's the total for Aaron Hawkins?": [0.0, 0.0, 1.0],
+    "What's the total for Aaron Bergman?": [0.0, 0.05, 1.0],
+}
+ANSWER = {"answer": "$710.00", "sources": ["invoice_Aaron_Hawkins_36001.pdf (Page 1, Chunk 1)"]}
+
+def embed(question):
+    embed.calls.append(question)
+    return VECTORS[question]
+
+def ask(cache, question, version=1):
+    embed.calls = []
+    result, vector = cache.get(question, version, embed)
+    if result is None:
+        cache.put(question, ANSWER, version, vector)
+    return result
+
+def test_exact_and_similar_questions_hit():
+    cache = AnswerCache(threshold=0.95)
+    assert ask(cache, "What's the total amount across all invoices?") is None
+    assert ask(cache, "  what's THE total amount across all invoices ")["cached"] == "exact"
+    assert embed.calls == []
+    assert ask(cache, "what is the total amount of all the invoices")["cached"] == "similar"
+    assert ask(cache, "Which invoices are overdue?") is None
+    assert cache.stats()["exact_hits"] == 1 and cache.stats()["similar_hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_similar_questions_about_other_customers_miss():
+    cache = AnswerCache(threshold=0.9)
+    ask(cache, "What's the total for Aaron Hawkins?")
+    assert ask(cache, "What's the total for Aaron Bergman?") is None
+
+def test_index_change_invalidates():
+    cache = AnswerCache()
+    ask(cache, "Which invoices are overdue?", version=1)
+    assert ask(cache, "Which invoices are overdue?", version=2) is None
+    assert cache.stats()["invalidations"] == 1
+    # An answer computed against the old index is not cached under the new one
+    cache.put("What's the total amount across all invoices?", ANSWER, 1)
+    assert ask(cache, "What's the total amount across all invoices?", version=2) is None
+
+def test_ttl_and_lru_bounds(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(ttl_seconds=60, max_entries=2)
+    for question in list(VECTORS)[2:]:
+        ask(cache, question)
+    assert cache.stats()["entries"] == 2
+    assert ask(cache, "Which invoices are overdue?") is None
+    now[0] += 61
+    assert ask(cache, "What's the total for Aaron Bergman?") is None
+
+def test_normalize_question():
+    assert normalize_question("  What's the TOTAL over $1,000.50?! ") == "what s the total over $1 000.50"
@@ -0,0 +1,39 @@
+import pytest
+from butterfly.rag.chunking import InvoiceChunker, RecursiveChunker, get_chunker
+
+def invoice_page(items):
+    rows = "".join(f"Staples Binder {i} {i % 5 + 1} $10.50 $10.50\n" for i in range(items))
+    return ("INVOICE\n# 36002\nBill To:\nAaron Bergman\nShip To:\nDallas, Texas\nDate: 2012-03-12\n"
+            "Ship Mode: Same Day\nItem Quantity Rate Amount\n" + rows +
+            "Subtotal: $100.00\nShipping: $5.00\nTotal: $87.25\nNotes:\nThanks for your business!\n")
+
+def test_small_invoice_is_one_header_chunk_with_its_fields():
+    chunks = InvoiceChunker().chunk_page(invoice_page(3), "invoice_Aaron Bergman_36002.pdf")
+    assert len(chunks) == 1
+    text, metadata = chunks[0]
+    assert text.startswith("Invoice #36002 for Aaron Bergman, dated 2012-03-12, total $87.25, 3 line items.")
+    assert "Staples Binder 2 3 $10.50 $10.50" in text and "Thanks for your business!" in text
+    assert metadata == {"invoice_number": "36002", "customer_name": "Aaron Bergman", "date": "2012-03-12",
+                        "amount": 87.25, "kind": "header"}
+
+def test_long_tables_are_split_between_rows_without_overlap():
+    page = invoice_page(120)
+    chunks = InvoiceChunker(chunk_size=500).chunk_page(page)
+    assert [metadata["kind"] for _, metadata in chunks][:2] == ["header", "items"]
+    assert all(len(text) <= 500 for text, _ in chunks)
+    rows = [line for text, _ in chunks for line in text.split("\n") if line.startswith("Staples Binder")]
+    # Every row appears exactly once, whole and in order
+    assert rows == [line for line in page.split("\n") if line.startswith("Staples Binder")]
+    for text, metadata in chunks[1:]:
+        assert text.startswith("Invoice #36002 (Aaron Bergman, 2012-03-12) line items:\nItem Quantity Rate Amount\n")
+        assert metadata["invoice_number"] == "36002"
+
+def test_pages_without_item_table_fall_back_to_recursive_splitting():
+    text = "Terms and conditions. " * 100
+    assert InvoiceChunker().chunk_page(text) == RecursiveChunker().chunk_page(text)
+
+def test_chunkers_are_chosen_by_name():
+    assert isinstance(get_chunker("recursive"), RecursiveChunker)
+    assert get_chunker("invoice").settings()["name"] == "invoice"
+    with pytest.raises(ValueError):
+        get_chunker("semantic")
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from butterfly.rag.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[len(text) / 10, 0.5, -0.25] for text in texts]
+
+    def embed_query(self, text):
+        return [0.0, 0.0, 0.0]
+
+FOOTER = "Thanks for your business!"
+
+def test_repeated_chunks_are_embedded_once(tmp_path):
+    inner = RecordingEmbeddings()
+    embeddings = CachedEmbeddings(inner, EmbeddingCache(str(tmp_path / "embeddings.sqlite")), "nomic-embed-text")
+    first = embeddings.embed_documents(["Invoice 1", FOOTER, FOOTER])
+    assert inner.calls == [["Invoice 1", FOOTER]]
+    second = embeddings.embed_documents([FOOTER, "Invoice 2"])
+    assert inner.calls[1] == ["Invoice 2"]
+    assert second[0] == first[1] == [2.5, 0.5, -0.25]
+    stats = embeddings.stats()
+    assert stats["chunks"] == 5 and stats["embedded"] == 3 and stats["hits"] == 2 and stats["hit_rate"] == 0.4
+    assert stats["bytes_saved"] == 2 * len(FOOTER)
+    embeddings.reset_stats()
+    assert embeddings.stats()["chunks"] == 0
+
+def test_cache_persists_and_is_keyed_by_model(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    inner = RecordingEmbeddings()
+    CachedEmbeddings(inner, EmbeddingCache(path), "nomic-embed-text").embed_documents([FOOTER])
+    CachedEmbeddings(inner, EmbeddingCache(path), "nomic-embed-text").embed_documents([FOOTER])
+    CachedEmbeddings(inner, EmbeddingCache(path), "mxbai-embed-large").embed_documents([FOOTER])
+    assert len(inner.calls) == 2
+
+def test_vectors_are_stored_compactly(tmp_path):
+    vector = np.random.default_rng(0).standard_normal(768).tolist()
+    for dtype, size in (("float16", 2), ("float32", 4)):
+        cache = EmbeddingCache(str(tmp_path / f"{dtype}.sqlite"), dtype=dtype)
+        cache.put_many("m", ["chunk"], [vector])
+        assert cache.stats()["bytes"] == 768 * size
+        restored = cache.get_many("m", ["chunk", "other"])
+        assert restored[1] is None
+        np.testing.assert_allclose(restored[0], vector, rtol=1e-3, atol=1e-3)
+    with pytest.raises(ValueError):
+        EmbeddingCache(str(tmp_path / "x.sqlite"), dtype="int8")
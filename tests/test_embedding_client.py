@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from butterfly.rag.embedding_client import EmbeddingError, OllamaEmbeddingClient
+
+class StubOllama(ThreadingHTTPServer):
+    """Mimics Ollama's /api/embed: each text is embedded as [length, first character code]."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), EmbedHandler)
+        self.connections = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failures = []  # statuses to answer the next requests with
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class EmbedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append(payload)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            status = server.failures.pop(0) if server.failures else 200
+        time.sleep(0.02)
+        if self.path != "/api/embed":
+            status = 404
+        body = json.dumps({"model": payload["model"], "embeddings": [[len(t), ord(t[0])] for t in payload["input"]]}
+                          if status == 200 else {"error": "busy"}).encode()
+        self.send_response(status)
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with server.lock:
+            server.in_flight -= 1
+
+@pytest.fixture
+def server():
+    server = StubOllama()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_batches_keep_order_and_reuse_connections(server):
+    texts = [f"{chr(65 + i % 26)}{'x' * i}" for i in range(50)]
+    client = OllamaEmbeddingClient("nomic-embed-text", server.url, batch_size=8, max_in_flight=3)
+    try:
+        assert client.embed_documents(texts) == [[len(t), ord(t[0])] for t in texts]
+        assert client.embed_documents(texts[:5]) == [[len(t), ord(t[0])] for t in texts[:5]]
+        assert client.embed_query("query") == [5, ord("q")]
+    finally:
+        client.close()
+    assert [len(request["input"]) for request in server.requests[:7]] == [8, 8, 8, 8, 8, 8, 2]
+    assert all(request["model"] == "nomic-embed-text" for request in server.requests)
+    assert server.max_in_flight <= 3
+    # Nine requests over at most one keep-alive connection per concurrent request
+    assert server.connections <= 3
+    stats = client.stats()
+    assert stats["chunks"] == 56 and stats["batches"] == 9 and stats["connections"] == server.connections
+    assert stats["chunks_per_s"] > 0
+
+def test_overloaded_server_is_retried_with_backoff(server):
+    server.failures = [503, 500]
+    client = OllamaEmbeddingClient(base_url=server.url, backoff_seconds=0.01)
+    assert client.embed_documents(["a", "bb"]) == [[1, 97], [2, 98]]
+    assert client.stats()["retries"] == 2
+
+def test_rejected_or_persistently_failing_requests_raise(server):
+    client = OllamaEmbeddingClient(base_url=server.url + "/prefix")
+    with pytest.raises(EmbeddingError, match="HTTP 404"):
+        client.embed_query("a")
+    server.failures = [502] * 3
+    client = OllamaEmbeddingClient(base_url=server.url, retries=2, backoff_seconds=0)
+    with pytest.raises(EmbeddingError, match="after 3 attempts"):
+        client.embed_query("a")
+
+def test_unreachable_server_raises_after_retries():
+    client = OllamaEmbeddingClient(base_url="http://127.0.0.1:9", retries=1, backoff_seconds=0)
+    with pytest.raises(EmbeddingError, match="after 2 attempts"):
+        client.embed_query("a")
@@ -0,0 +1,38 @@
+from datetime import datetime
+from butterfly.utils.disk_cache import DiskCache
+from butterfly.rag.extraction_cache import ExtractionCache
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), max_bytes=20)
+    cache.put("a", b"x" * 8)
+    cache.put("b", b"y" * 8)
+    assert cache.get("a") == b"x" * 8  # "a" is now more recent than "b"
+    cache.put("c", b"z" * 8)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 20
+
+def test_extraction_cache_key_tracks_content_and_config(tmp_path):
+    pdf = tmp_path / "invoice.pdf"
+    pdf.write_bytes(b"%PDF-1.4 first version")
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"))
+    key = cache.make_key(str(pdf), "invoice", "1", {"dpi": 300})
+    assert key == cache.make_key(str(pdf), "invoice", "1", {"dpi": 300})
+    assert key != cache.make_key(str(pdf), "invoice", "2", {"dpi": 300})
+    assert key != cache.make_key(str(pdf), "invoice", "1", {"dpi": 150})
+    pdf.write_bytes(b"%PDF-1.4 second version")
+    assert key != cache.make_key(str(pdf), "invoice", "1", {"dpi": 300})
+
+def test_extraction_cache_round_trips_datetimes(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"))
+    value = {"filename": "a.pdf", "extraction_date": datetime(2024, 4, 5, 12, 0), "pages": []}
+    cache.put("k", value)
+    assert cache.get("k") == value
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+
+def test_extraction_cache_checks_keys_without_loading(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"))
+    cache.put("k", {"pages": []})
+    assert cache.contains_many(["k", "missing", "k"]) == {"k"}
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
@@ -0,0 +1,119 @@
+import random
+import re
+from datetime import datetime
+from butterfly.rag.field_extractor import FieldExtractor
+
+SAMPLE_LINES = [
+    "INVOICE", "# 36397", "Bill To:", "Annie Zypern", "Ship To:", "Dallas, Texas",
+    "Date: 2012-3-16", "Item Quantity Rate Amount", "Staples Round Ring Binders 2 $4.45 $8.90",
+    "Subtotal: $8.90", "Discount (20%): $1.78", "Shipping: $1.13", "Total: $8.25", "Notes:",
+    "Thanks for your business!",
+]
+
+TOKENS = [
+    "Bill To:", "Ship To:", "same day", "Date:", "Invoice Date:", "Issued:", "2012-03-16", "2012-02-30",
+    "Total:", "Subtotal:", "Notes", "Thanks", "Terms", "$8.25", "$12.00", "$1.5", "#", "# 123", "#45",
+    "Item", "Quantity", "Rate", "Amount", "2", "4.45", "$4.45", "1.2.3", "Aaron Hawkins", "\t",
+]
+
+# The per-field heuristics PDFDataExtractor used before FieldExtractor, kept verbatim as the
+# reference FieldExtractor must match (benchmarks/bench_field_extractor.py times against it too)
+MONEY_RE = re.compile(r'\$([0-9]+\.[0-9]{2})')
+
+def legacy_customer_name(lines, filename=None):
+    for idx, line in enumerate(lines):
+        if 'Bill To:' in line:
+            for next_line in lines[idx+1:idx+3]:
+                candidate = next_line.strip()
+                if candidate and not candidate.lower().startswith(('ship to', 'date', 'same day', 'standard class')):
+                    return candidate
+    if filename:
+        parts = filename.split('_')
+        if len(parts) >= 2:
+            return parts[1].replace('.pdf', '')
+    return "Unknown"
+
+def legacy_invoice_number(lines, filename=None):
+    for line in lines:
+        match = re.search(r'#\s*(\d+)', line)
+        if match:
+            return match.group(1)
+    if filename:
+        parts = filename.split('_')
+        if len(parts) >= 3:
+            num = parts[2].replace('.pdf', '')
+            if num.isdigit():
+                return num
+    return "Unknown"
+
+def legacy_date(lines):
+    for line in lines:
+        for pattern in ["Date:", "Invoice Date:", "Issued:", "Created:"]:
+            if pattern in line:
+                date_str = line.split(pattern)[1].strip()
+                try:
+                    return datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
+                except ValueError:
+                    return date_str
+    return "Unknown"
+
+def legacy_amount(lines):
+    for line in lines:
+        if 'Total:' in line:
+            found = MONEY_RE.findall(line)
+            if found:
+                return float(found[0])
+    for idx, line in enumerate(lines):
+        if 'Notes' in line or 'Thanks' in line:
+            for prev_line in reversed(lines[:idx]):
+                found = MONEY_RE.findall(prev_line)
+                if found:
+                    return float(found[0])
+    amounts = [float(amt) for line in lines for amt in MONEY_RE.findall(line)]
+    return max(amounts) if amounts else 0.0
+
+def legacy_line_items(lines):
+    items = []
+    in_items_section = False
+    for line in lines:
+        if "Item" in line and "Quantity" in line and "Rate" in line and "Amount" in line:
+            in_items_section = True
+            continue
+        if in_items_section:
+            if any(stop_word in line for stop_word in ["Subtotal", "Total", "Notes", "Terms", "Shipping", "Discount"]):
+                break
+            parts = line.split()
+            if len(parts) >= 3:
+                try:
+                    quantity = float(parts[-3]) if parts[-3].replace('.', '', 1).isdigit() else None
+                    unit_price = float(parts[-2].replace('$', '')) if parts[-2].replace('.', '', 1).replace('$', '').isdigit() else None
+                    amount = float(parts[-1].replace('$', '')) if parts[-1].replace('.', '', 1).replace('$', '').isdigit() else None
+                except Exception:
+                    continue
+                items.append({"item": ' '.join(parts[:-3]), "quantity": quantity, "unit_price": unit_price, "amount": amount})
+    return items
+
+def legacy_fields(lines, filename=None):
+    return {
+        "customer_name": legacy_customer_name(lines, filename),
+        "invoice_number": legacy_invoice_number(lines, filename),
+        "date": legacy_date(lines),
+        "amount": legacy_amount(lines),
+        "items": legacy_line_items(lines),
+    }
+
+def test_field_extractor_sample_invoice():
+    fields = FieldExtractor().extract(SAMPLE_LINES)
+    assert fields["customer_name"] == "Annie Zypern"
+    assert fields["invoice_number"] == "36397"
+    assert fields["date"] == "2012-03-16"
+    assert fields["amount"] == 8.25
+    assert fields["items"] == [{"item": "Staples Round Ring Binders", "quantity": 2.0, "unit_price": 4.45, "amount": 8.9}]
+
+def test_field_extractor_matches_legacy_helpers():
+    fields = FieldExtractor()
+    rng = random.Random(0)
+    for _ in range(2000):
+        lines = [' '.join(rng.choice(TOKENS) for _ in range(rng.randint(0, 5))) for _ in range(rng.randint(0, 20))]
+        filename = rng.choice([None, "invoice_Aaron Hawkins_4820.pdf", "scan.pdf"])
+        assert fields.extract(lines, filename) == legacy_fields(lines, filename), lines
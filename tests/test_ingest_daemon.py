@@ -0,0 +1,62 @@
+import os
+import time
+import shutil
+import pytest
+from butterfly.rag.ingest_daemon import IngestionDaemon, PollingWatcher
+from butterfly.rag.pdf_extractor import PDFDataExtractor
+
+mongomock = pytest.importorskip("mongomock")
+
+class FakeIndex:
+    def __init__(self):
+        self.indexed_chunks = {}
+        self.saves = 0
+    def save_vector_store(self):
+        self.saves += 1
+    def index_pdf(self, pdf_path):
+        self.indexed_chunks[os.path.basename(pdf_path)] = ["chunk"]
+    def remove_pdf(self, filename):
+        self.indexed_chunks.pop(filename, None)
+
+@pytest.mark.parametrize("use_inotify", [None, False])
+def test_daemon_ingests_only_new_or_changed_files(tmp_path, use_inotify, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    make_invoice(raw / "invoice_Aaron Hawkins_4820.pdf", "10.00")
+    extractor = PDFDataExtractor(mongo_uri=None)
+    extractor.invoices = mongomock.MongoClient().pdf_rag.invoices
+    index = FakeIndex()
+    daemon = IngestionDaemon(str(raw), extractor, index, settle_seconds=0.2, poll_interval=0.1,
+                             use_inotify=use_inotify).start()
+    try:
+        assert daemon.wait_idle(10)
+        assert daemon.stats["ingested"] == 1
+
+        # Written elsewhere and moved in, like an upload; then an identical copy
+        make_invoice(tmp_path / "new.pdf", "20.00")
+        os.replace(tmp_path / "new.pdf", raw / "invoice_Aaron Bergman_4821.pdf")
+        time.sleep(0.3)
+        assert daemon.wait_idle(10)
+        shutil.copy(raw / "invoice_Aaron Hawkins_4820.pdf", tmp_path / "copy.pdf")
+        os.replace(tmp_path / "copy.pdf", raw / "invoice_Aaron Hawkins_4820.pdf")
+        time.sleep(0.3)
+        assert daemon.wait_idle(10)
+        assert daemon.stats["ingested"] == 2 and daemon.stats["unchanged"] == 1
+        assert extractor.invoices.count_documents({}) == 2
+        assert set(index.indexed_chunks) == {"invoice_Aaron Hawkins_4820.pdf", "invoice_Aaron Bergman_4821.pdf"}
+
+        os.remove(raw / "invoice_Aaron Bergman_4821.pdf")
+        time.sleep(0.3)
+        assert daemon.wait_idle(10)
+        assert set(index.indexed_chunks) == {"invoice_Aaron Hawkins_4820.pdf"}
+        assert index.saves >= 3
+    finally:
+        daemon.stop()
+
+def test_polling_watcher_reports_changes_and_deletions(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"1")
+    watcher = PollingWatcher(str(tmp_path), interval=0)
+    (tmp_path / "b.pdf").write_bytes(b"2")
+    os.remove(tmp_path / "a.pdf")
+    assert sorted(watcher.poll(1)) == [("a.pdf", True), ("b.pdf", False)]
+    assert watcher.poll(1) == []
@@ -0,0 +1,80 @@
+import os
+from datetime import datetime
+import fitz
+import pytest
+from butterfly.rag import pdf_extractor
+from butterfly.rag.extraction_cache import ExtractionCache
+from butterfly.rag.pdf_extractor import PDFDataExtractor
+from butterfly.utils.jsonl import JSONLWriter, iter_jsonl
+
+RECORDS = [
+    {"filename": "a.pdf", "extraction_date": datetime(2024, 4, 5, 12, 0), "pages": [{"content": "Total: $8.25"}]},
+    {"filename": "b.pdf", "extraction_date": datetime(2024, 4, 6, 9, 30), "pages": []},
+]
+
+@pytest.mark.parametrize("name", ["invoices.jsonl", "invoices.jsonl.gz"])
+def test_jsonl_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    with JSONLWriter(path) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    assert writer.count == 2
+    records = list(iter_jsonl(path))
+    assert [r["filename"] for r in records] == ["a.pdf", "b.pdf"]
+    assert records[0]["extraction_date"] == "2024-04-05T12:00:00"
+
+def test_jsonl_zstd_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    path = str(tmp_path / "invoices.jsonl.zst")
+    with JSONLWriter(path) as writer:
+        writer.write(RECORDS[1])
+    assert list(iter_jsonl(path)) == [{"filename": "b.pdf", "extraction_date": "2024-04-06T09:30:00", "pages": []}]
+
+def test_streaming_export_writes_cached_invoices_as_they_are_read(tmp_path, monkeypatch, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for i in range(4):
+        make_invoice(raw / f"invoice_{i}.pdf", f"{i}0.00", number=i)
+    extractor = PDFDataExtractor(mongo_uri=None, cache=ExtractionCache(str(tmp_path / "extraction.sqlite")))
+    extractor.export_invoices_to_json(str(raw), str(tmp_path / "warm.jsonl"))
+
+    events = []
+    cache_get = extractor.cache.get
+    monkeypatch.setattr(extractor.cache, "get", lambda key: events.append("read") or cache_get(key))
+    class RecordingWriter(JSONLWriter):
+        def write(self, record):
+            events.append(f"write {record['filename']}")
+            super().write(record)
+    monkeypatch.setattr(pdf_extractor, "JSONLWriter", RecordingWriter)
+    extractor.export_invoices_to_json(str(raw), str(tmp_path / "invoices.jsonl"))
+    assert events == [event for i in range(4) for event in ("read", f"write invoice_{i}.pdf")]
+    assert len(list(iter_jsonl(str(tmp_path / "invoices.jsonl")))) == 4
+
+def test_parallel_export_splits_long_files_by_page_counts_from_the_workers(tmp_path, monkeypatch, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    make_invoice(raw / "invoice_a.pdf", "10.00")
+    doc = fitz.open()
+    for i in range(5):
+        doc.new_page().insert_text((72, 72), f"Invoice # {4820 + i}")
+    doc.save(str(raw / "invoice_b.pdf"))
+    (raw / "invoice_c.pdf").write_bytes(b"not a pdf")
+    make_invoice(raw / "invoice_d.pdf", "40.00")
+
+    # Forked workers inherit the wrapper and record their own pid
+    counted_by = tmp_path / "pids"
+    page_count = pdf_extractor._page_count
+    def recording_page_count(pdf_path):
+        with open(counted_by, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return page_count(pdf_path)
+    monkeypatch.setattr(pdf_extractor, "_page_count", recording_page_count)
+
+    output = str(tmp_path / "invoices.jsonl")
+    PDFDataExtractor(mongo_uri=None).export_invoices_to_json(str(raw), output, workers=2, pages_per_task=2)
+    invoices = list(iter_jsonl(output))
+    assert [invoice["filename"] for invoice in invoices] == ["invoice_a.pdf", "invoice_b.pdf", "invoice_d.pdf"]
+    assert [page["page_number"] for page in invoices[1]["pages"]] == [1, 2, 3, 4, 5]
+    assert [page["metadata"]["invoice_number"] for page in invoices[1]["pages"]] == [str(4820 + i) for i in range(5)]
+    pids = counted_by.read_text().split()
+    assert len(pids) == 4 and str(os.getpid()) not in pids
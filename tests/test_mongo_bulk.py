@@ -0,0 +1,33 @@
+import pytest
+from butterfly.rag.pdf_extractor import PDFDataExtractor
+
+mongomock = pytest.importorskip("mongomock")
+
+@pytest.fixture
+def extractor():
+    extractor = PDFDataExtractor(mongo_uri=None)
+    db = mongomock.MongoClient().pdf_rag
+    extractor.invoices, extractor.qa_pairs = db.invoices, db.qa_pairs
+    return extractor
+
+def test_process_directory_upserts_idempotently(tmp_path, extractor, make_invoice):
+    make_invoice(tmp_path / "invoice_Aaron Hawkins_4820.pdf", "10.00")
+    make_invoice(tmp_path / "invoice_Aaron Bergman_4821.pdf", "20.00")
+    extractor.process_directory(str(tmp_path), batch_size=1)
+    extractor.process_directory(str(tmp_path), batch_size=1)
+    assert extractor.invoices.count_documents({}) == 2
+
+    # A changed file is a new (filename, content_hash) version
+    make_invoice(tmp_path / "invoice_Aaron Hawkins_4820.pdf", "15.00")
+    extractor.process_directory(str(tmp_path))
+    assert extractor.invoices.count_documents({"filename": "invoice_Aaron Hawkins_4820.pdf"}) == 2
+
+def test_store_qa_pairs_in_batches(extractor):
+    pairs = [{"question": f"q{i % 3}", "answer": "a", "sources": []} for i in range(7)]
+    counts = extractor.store_qa_pairs(pairs, batch_size=2)
+    assert counts["upserted"] == 3
+    assert extractor.qa_pairs.count_documents({}) == 3
+    first = {doc["question"]: doc["timestamp"] for doc in extractor.qa_pairs.find()}
+    counts = extractor.store_qa_pairs(pairs, batch_size=2)
+    assert counts["upserted"] == 0 and counts["modified"] == 0
+    assert {doc["question"]: doc["timestamp"] for doc in extractor.qa_pairs.find()} == first
@@ -0,0 +1,71 @@
+import numpy as np
+from butterfly.core.preprocess import binarize, denoise
+from butterfly.ocr.cache import OCRCache, image_digest
+from butterfly.ocr.easyocr_engine import EasyOCREngine
+from butterfly.ocr.engine import OCREngine
+
+class CountingEngine(OCREngine):
+    name = "counting"
+
+    def __init__(self, cache):
+        super().__init__(workers=1, cache=cache)
+        self.calls = 0
+
+    def _recognize(self, image, output, config, dpi):
+        self.calls += 1
+        text = f"text {self.calls}"
+        return text if output == "string" else (text, 90.0)
+
+def page(value=0):
+    image = np.full((40, 60), 255, dtype=np.uint8)
+    image[10:20, 5:50] = value
+    return image
+
+def test_image_digest_tracks_pixels_and_shape():
+    assert image_digest(page()) == image_digest(page())
+    assert image_digest(page()) != image_digest(page(1))
+    assert image_digest(np.zeros((4, 6), np.uint8)) != image_digest(np.zeros((6, 4), np.uint8))
+    # Views are hashed by content, whatever their memory layout
+    assert image_digest(page()[:, ::2]) == image_digest(np.ascontiguousarray(page()[:, ::2]))
+
+def test_repeated_calls_are_served_from_the_cache(tmp_path):
+    cache = OCRCache(str(tmp_path / "ocr.sqlite"))
+    with CountingEngine(cache) as engine:
+        first = engine.image_to_scored_string(page(), "--psm 6", 300, binarize)
+        assert engine.image_to_scored_string(page(), "--psm 6", 300, binarize) == first
+        assert engine.calls == 1
+        # Another tier, page segmentation mode, DPI or image is a different result
+        engine.image_to_scored_string(page(), "--psm 6", 300, denoise)
+        engine.image_to_scored_string(page(), "--psm 3", 300, binarize)
+        engine.image_to_scored_string(page(), "--psm 6", 150, binarize)
+        engine.image_to_scored_string(page(1), "--psm 6", 300, binarize)
+        assert engine.calls == 5
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 5
+
+def test_cache_persists_across_engines(tmp_path):
+    path = str(tmp_path / "ocr.sqlite")
+    with CountingEngine(OCRCache(path)) as engine:
+        text = engine.image_to_string(page())
+    with CountingEngine(OCRCache(path)) as engine:
+        assert engine.image_to_string(page()) == text
+        assert engine.calls == 0
+
+def test_easyocr_batches_only_the_misses(tmp_path):
+    class Reader:
+        def __init__(self):
+            self.batches = []
+
+        def readtext_batched(self, images, batch_size=1):
+            self.batches.append(len(images))
+            return [[([[0, 0], [10, 0], [10, 8], [0, 8]], f"v{int(image[0, 0])}", 0.8)] for image in images]
+
+        def readtext(self, image, batch_size=1):
+            return self.readtext_batched([image], batch_size)[0]
+
+    reader = Reader()
+    images = [np.full((20, 30), i, dtype=np.uint8) for i in range(4)]
+    with EasyOCREngine(reader=reader, cache=OCRCache(str(tmp_path / "ocr.sqlite"))) as engine:
+        engine.image_to_string(images[1])
+        reader.batches.clear()
+        assert list(engine.map(images)) == ["v0", "v1", "v2", "v3"]
+    assert reader.batches == [3]
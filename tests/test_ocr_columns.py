@@ -0,0 +1,67 @@
+import json
+import numpy as np
+import pytest
+from PIL import Image
+from butterfly.core.ocr_columns import COLUMNS_FILENAME, load_columns, pack_words, save_columns
+from butterfly.core.pdf_processor import PDFProcessor
+from butterfly.ocr.engine import OCREngine, TSV_COLUMNS
+from butterfly.ocr.tesseract_capi import load_libtesseract
+
+def word(text, x, y, confidence):
+    return {"text": text, "bbox": {"x": x, "y": y, "width": 40, "height": 12}, "confidence": confidence}
+
+def test_columns_round_trip_through_a_memory_map(tmp_path):
+    pages = {"a.jpeg": [word("Invoice", 10, 20, 0.96), word("Größe", 60, 20, 0.75)],
+             "b.jpeg": [],
+             "c.jpeg": [word("$42.00", 3000, 3100, 0.5)]}
+    path = str(tmp_path / COLUMNS_FILENAME)
+    save_columns(path, list(pages), [pack_words(words) for words in pages.values()])
+    columns = load_columns(path)
+    assert isinstance(columns.bbox, np.memmap) and columns.bbox.dtype == np.int16
+    assert columns.confidence.dtype == np.float16
+    assert len(columns) == 3 and columns.word_count == 3
+    for name, words in pages.items():
+        loaded = columns.words(name)
+        assert [w["text"] for w in loaded] == [w["text"] for w in words]
+        assert [w["bbox"] for w in loaded] == [w["bbox"] for w in words]
+        assert [w["confidence"] for w in loaded] == pytest.approx([w["confidence"] for w in words], abs=1e-3)
+    assert load_columns(path, mmap=False).texts("a.jpeg") == ["Invoice", "Größe"]
+
+def test_boxes_beyond_int16_are_widened(tmp_path):
+    path = str(tmp_path / COLUMNS_FILENAME)
+    save_columns(path, ["poster.jpeg"], [pack_words([word("Sale", 40000, 10, 0.9)])])
+    columns = load_columns(path)
+    assert columns.bbox.dtype == np.int32
+    assert columns.words("poster.jpeg")[0]["bbox"]["x"] == 40000
+
+class FixedEngine(OCREngine):
+    name = "fixed"
+
+    def _recognize(self, image, output, config, dpi):
+        data = {column: [] for column in TSV_COLUMNS}
+        for column, value in zip(TSV_COLUMNS, (5, 1, 1, 1, 1, 1, 5, 6, 30, 10, 91, f"w{image.shape[1]}")):
+            data[column].append(value)
+        return data
+
+def test_process_images_writes_json_or_columns(tmp_path):
+    for width in (80, 120):
+        Image.new("L", (width, 60), 255).save(tmp_path / f"page_{width}.jpeg")
+    with FixedEngine(workers=1) as engine:
+        processor = PDFProcessor(ocr_engine=engine)
+        processor.process_images(str(tmp_path))
+        processor.process_images(str(tmp_path), output_format="npz")
+    columns = load_columns(str(tmp_path / COLUMNS_FILENAME))
+    assert columns.image_names == ["page_120.jpeg", "page_80.jpeg"]
+    for name in columns.image_names:
+        assert columns.words(name) == json.loads((tmp_path / name).with_suffix(".json").read_text())
+    assert columns.texts("page_80.jpeg") == ["w80"]
+
+@pytest.mark.skipif(load_libtesseract() is None, reason="libtesseract not installed")
+def test_process_images_in_a_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setenv("BUTTERFLY_OCR_CACHE", "off")
+    Image.new("L", (120, 60), 255).save(tmp_path / "blank_1.jpeg")
+    Image.new("L", (120, 60), 255).save(tmp_path / "blank_2.jpeg")
+    PDFProcessor(ocr_engine="capi").process_images(str(tmp_path), workers=2, output_format="npz")
+    columns = load_columns(str(tmp_path / COLUMNS_FILENAME))
+    assert columns.image_names == ["blank_1.jpeg", "blank_2.jpeg"]
+    assert json.loads((tmp_path / "preprocessing.json").read_text()).keys() == {"blank_1.jpeg", "blank_2.jpeg"}
@@ -0,0 +1,122 @@
+import threading
+import fitz
+import numpy as np
+import pytest
+from butterfly.core.render import render_page
+from butterfly.ocr.easyocr_engine import EasyOCREngine
+from butterfly.ocr.engine import OCREngine, parse_tsv, words_from_data
+from butterfly.ocr.tesseract_capi import TesseractAPIEngine, load_libtesseract, parse_config
+
+class ThreadNameEngine(OCREngine):
+    name = "test"
+
+    def _recognize(self, image, output, config, dpi):
+        return (int(image[0, 0]), threading.current_thread().name)
+
+def test_parse_tsv_matches_pytesseract_dict_layout():
+    tsv = ("level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+           "1\t1\t0\t0\t0\t0\t0\t0\t200\t100\t-1\t\n"
+           "5\t1\t1\t1\t1\t1\t20\t40\t52\t12\t95.123\tTotal:\n")
+    data = parse_tsv(tsv)
+    assert data["level"] == [1, 5]
+    assert data["conf"] == [-1, 95]
+    assert data["text"] == ["", "Total:"]
+    assert data["left"][1] == 20 and data["height"][1] == 12
+
+def test_words_from_data_uses_the_shared_schema():
+    data = {"level": [5, 5, 5], "page_num": [1, 1, 1], "block_num": [1, 1, 1], "par_num": [1, 1, 1],
+            "line_num": [1, 1, 1], "word_num": [1, 2, 3], "left": [10, 60, 90], "top": [5, 5, 5],
+            "width": [40, 20, 30], "height": [12, 12, 12], "conf": [96, 60, -1], "text": ["Total", "42", " "]}
+    assert words_from_data(data) == [
+        {"text": "Total", "bbox": {"x": 10, "y": 5, "width": 40, "height": 12}, "confidence": 0.96},
+        {"text": "42", "bbox": {"x": 60, "y": 5, "width": 20, "height": 12}, "confidence": 0.6},
+    ]
+    assert [w["text"] for w in words_from_data(data, min_confidence=60)] == ["Total"]
+
+def test_parse_config_splits_engine_options():
+    assert parse_config("--psm 6 -l deu --oem 1 -c preserve_interword_spaces=1") == \
+        ("deu", 1, 6, {"preserve_interword_spaces": "1"})
+    assert parse_config("") == (None, None, 3, {})
+
+def test_map_keeps_input_order_and_runs_in_the_pool():
+    images = [np.full((4, 4), i, dtype=np.uint8) for i in range(10)]
+    with ThreadNameEngine(workers=3) as engine:
+        results = list(engine.map(images))
+    assert [value for value, _ in results] == list(range(10))
+    assert all(name.startswith("ocr-test") for _, name in results)
+
+@pytest.mark.skipif(load_libtesseract() is None, reason="libtesseract not installed")
+def test_capi_engine_reads_rendered_text():
+    doc = fitz.open()
+    doc.new_page(width=300, height=100).insert_text((20, 50), "Invoice Total 42", fontsize=20)
+    image = render_page(doc[0], dpi=200)
+    try:
+        engine = TesseractAPIEngine(workers=2)
+    except RuntimeError:
+        pytest.skip("eng.traineddata not found")
+    with engine:
+        texts = list(engine.map([image, image.convert("L")], dpi=200))
+        data = engine.image_to_data(image, config="--psm 6", dpi=200)
+    assert all("Invoice Total 42" in text for text in texts)
+    assert "Invoice" in data["text"]
+    assert max(data["conf"]) > 60
+
+class FakeReader:
+    """Stands in for easyocr.Reader: one detection per image, recording each call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _detections(self, image):
+        value = int(image[0, 0])
+        return [([[30, 2], [50, 2], [50, 12], [30, 12]], f"B{value}", 0.5),
+                ([[2, 0], [20, 0], [20, 10], [2, 10]], f"A{value}", 0.9)]
+
+    def readtext(self, image, batch_size=1):
+        self.calls.append((1, batch_size))
+        return self._detections(image)
+
+    def readtext_batched(self, images, batch_size=1):
+        assert len({image.shape for image in images}) == 1
+        self.calls.append((len(images), batch_size))
+        return [self._detections(image) for image in images]
+
+def test_easyocr_engine_batches_same_sized_pages():
+    reader = FakeReader()
+    images = [np.full((20, 60), i, dtype=np.uint8) for i in range(5)] + [np.full((30, 60), 9, dtype=np.uint8)]
+    with EasyOCREngine(batch_size=8, pages_per_batch=2, reader=reader) as engine:
+        texts = list(engine.map(images))
+    assert texts == [f"A{i} B{i}" for i in range(5)] + ["A9 B9"]
+    assert sorted(reader.calls) == [(1, 8), (1, 8), (2, 8), (2, 8)]
+
+def test_easyocr_engine_shares_the_result_schema():
+    with EasyOCREngine(reader=FakeReader()) as engine:
+        image = np.full((20, 60), 3, dtype=np.uint8)
+        data = engine.image_to_data(image)
+        text, confidence = engine.image_to_scored_string(image)
+        words = engine.image_to_words(image, min_confidence=60)
+    assert data["text"] == ["A3", "B3"] and data["conf"] == [90, 50]
+    assert (data["left"][0], data["top"][0], data["width"][0], data["height"][0]) == (2, 0, 18, 10)
+    assert text == "A3 B3" and confidence == pytest.approx(70)
+    assert words == [{"text": "A3", "bbox": {"x": 2, "y": 0, "width": 18, "height": 10}, "confidence": 0.9}]
+
+def test_pytesseract_scored_output_runs_tesseract_once(monkeypatch):
+    import pytesseract
+    from butterfly.ocr.engine import PytesseractEngine
+    tsv = ("1\t1\t0\t0\t0\t0\t0\t0\t200\t100\t-1\t\n"
+           "5\t1\t1\t1\t1\t1\t10\t5\t40\t12\t90\tInvoice\n"
+           "5\t1\t1\t1\t1\t2\t60\t5\t30\t12\t80\t#4820\n"
+           "5\t1\t1\t1\t2\t1\t10\t25\t40\t12\t70\tBill\n"
+           "5\t1\t2\t1\t1\t1\t10\t60\t40\t12\t60\tTotal:\n")
+    calls = []
+    monkeypatch.setattr(pytesseract, "image_to_data",
+                        lambda image, config, output_type: calls.append(config) or parse_tsv(tsv))
+    monkeypatch.setattr(pytesseract, "image_to_string", lambda *args, **kwargs: pytest.fail("second tesseract run"))
+    with PytesseractEngine(workers=1) as engine:
+        text, confidence = engine.image_to_scored_string(np.zeros((10, 10), dtype=np.uint8), "--psm 6", 300)
+    assert text == "Invoice #4820\nBill\n\nTotal:" and confidence == pytest.approx(75)
+    assert calls == ["--psm 6 --dpi 300"]
+
+def test_engines_must_implement_recognize():
+    with pytest.raises(TypeError):
+        OCREngine()
@@ -0,0 +1,125 @@
+import io
+import fitz
+import numpy as np
+from PIL import Image
+from butterfly.core.page_classifier import ROUTE_HYBRID, ROUTE_OCR, ROUTE_TEXT, classify_page, merge_in_reading_order
+from butterfly.ocr.engine import OCREngine
+from butterfly.rag.pdf_extractor import PDFDataExtractor
+
+TEXT = "Invoice # 4820 Bill To: Aaron Hawkins Total: $10.00 Thanks for your business!"
+
+def png(width=200, height=100):
+    buf = io.BytesIO()
+    Image.fromarray((np.random.default_rng(0).random((height, width)) * 255).astype("uint8")).save(buf, "PNG")
+    return buf.getvalue()
+
+def test_digital_page_routes_to_text_layer():
+    page = fitz.open().new_page()
+    page.insert_text((72, 72), TEXT)
+    result = classify_page(page)
+    assert result["route"] == ROUTE_TEXT
+    assert result["text"] == page.get_text()
+
+def test_scanned_page_with_header_routes_to_ocr():
+    page = fitz.open().new_page()
+    page.insert_image(page.rect, stream=png(210, 297))  # A4-shaped scan filling the page
+    page.insert_text((10, 10), "Scanned by ACME")
+    assert classify_page(page)["route"] == ROUTE_OCR
+
+def test_bare_image_on_digital_page_routes_to_region_ocr(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), TEXT)
+    page.insert_image(fitz.Rect(72, 300, 372, 450), stream=png())
+    result = classify_page(page)
+    assert result["route"] == ROUTE_HYBRID
+    assert result["ocr_regions"] == [(72.0, 300.0, 372.0, 450.0)]
+
+    path = tmp_path / "invoice_Aaron Hawkins_4820.pdf"
+    doc.save(str(path))
+    extractor = PDFDataExtractor(mongo_uri=None)
+    extractor._ocr_page = lambda page, clip=None: {"text": "Paid stamp", "tier": "otsu", "confidence": 91.0}
+    page_data = extractor.extract_invoice_data(str(path))["pages"][0]
+    assert page_data["extraction_method"] == "hybrid"
+    assert page_data["content"].endswith("Paid stamp\n")
+    assert page_data["classification"]["ocr_regions"] == 1
+    assert page_data["classification"]["ocr_tier"] == "otsu"
+
+def test_sparse_page_ocrs_only_the_pasted_image_and_vector_stamp():
+    page = fitz.open().new_page()
+    page.insert_text((72, 72), "Invoice # 4820")
+    page.insert_image(fitz.Rect(72, 100, 172, 150), stream=png())
+    page.draw_rect(fitz.Rect(400, 700, 500, 740), color=None, fill=(0, 0, 0))
+    result = classify_page(page)
+    assert result["route"] == ROUTE_HYBRID
+    assert sorted(result["ocr_regions"]) == [(72.0, 100.0, 172.0, 150.0), (400.0, 700.0, 500.0, 740.0)]
+
+def test_region_text_is_merged_in_reading_order():
+    blocks = [(72, 300, 140, 312, "Total:\n"), (72, 72, 300, 84, "Invoice # 4820\n"), (72, 500, 300, 512, "Thanks!\n")]
+    stamp = (400, 298, 480, 314, "$10.00\n")
+    assert merge_in_reading_order(blocks + [stamp]) == "Invoice # 4820\nTotal:\n$10.00\nThanks!\n"
+
+class PixelCountingEngine(OCREngine):
+    name = "pixels"
+
+    def _recognize(self, image, output, config, dpi):
+        return "Paid stamp", 90.0
+
+def test_hybrid_page_ocrs_an_order_of_magnitude_fewer_pixels(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), TEXT)
+    page.insert_image(fitz.Rect(360, 300, 540, 390), stream=png())
+    path = tmp_path / "invoice_Aaron Hawkins_4820.pdf"
+    doc.save(str(path))
+    with PixelCountingEngine(workers=1) as engine:
+        extractor = PDFDataExtractor(mongo_uri=None, ocr_config={"min_dpi": None}, ocr_engine=engine)
+        page_data = extractor.extract_invoice_data(str(path))["pages"][0]
+    full_page_pixels = round(page.rect.width * 300 / 72) * round(page.rect.height * 300 / 72)
+    assert page_data["classification"]["ocr_pixels"] * 10 < full_page_pixels
+    assert page_data["content"] == TEXT + "\nPaid stamp\n"
+
+# (text, right edge or left edge in points, baseline row); numbers are right-aligned like a printed table
+SCANNED_TABLE = [
+    [("Item", 72, "left"), ("Quantity", 400, "right"), ("Rate", 480, "right"), ("Amount", 560, "right")],
+    [("Avery", 72, "left"), ("Binder", 110, "left"), ("2", 400, "right"), ("$4.45", 480, "right"),
+     ("$8.90", 560, "right")],
+    [("with", 72, "left"), ("warranty", 100, "left"), ("cover", 150, "left")],
+    [("Chair", 72, "left"), ("1", 400, "right"), ("$1,250.00", 480, "right"), ("$1,250.00", 560, "right")],
+    [("Total:", 72, "left"), ("$1,258.90", 560, "right")],
+]
+
+class ScannedTableEngine(OCREngine):
+    """Returns SCANNED_TABLE as Tesseract word boxes, in pixels at the requested DPI."""
+    name = "scanned-table"
+
+    def _recognize(self, image, output, config, dpi):
+        scale = dpi / 72
+        data = {column: [] for column in ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                                          "left", "top", "width", "height", "conf", "text")}
+        for line_num, row in enumerate(SCANNED_TABLE, 1):
+            for word_num, (text, x, anchor) in enumerate(row, 1):
+                width = 6 * len(text)
+                left = x - width if anchor == "right" else x
+                for column, value in zip(data, (5, 1, 1, 1, line_num, word_num, round(left * scale),
+                                                round((100 + 14 * line_num) * scale), round(width * scale),
+                                                round(10 * scale), 95, text)):
+                    data[column].append(value)
+        return data
+
+def test_scanned_page_items_come_from_the_ocr_word_boxes(tmp_path):
+    doc = fitz.open()
+    doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), stream=png(210, 297))
+    path = tmp_path / "scan.pdf"
+    doc.save(str(path))
+    with ScannedTableEngine(workers=1) as engine:
+        extractor = PDFDataExtractor(mongo_uri=None, ocr_config={"min_dpi": None}, ocr_engine=engine)
+        page_data = extractor.extract_invoice_data(str(path))["pages"][0]
+    assert page_data["extraction_method"] == "ocr"
+    assert page_data["content"].splitlines()[1] == "Avery Binder 2 $4.45 $8.90"
+    # The wrapped name only lines up with its item in the boxes; the line parser makes it an item of its own
+    assert page_data["metadata"]["items"] == [
+        {"item": "Avery Binder with warranty cover", "quantity": 2.0, "unit_price": 4.45, "amount": 8.9},
+        {"item": "Chair", "quantity": 1.0, "unit_price": 1250.0, "amount": 1250.0},
+    ]
+    assert page_data["classification"]["ocr_pixels"] > 0
@@ -0,0 +1,54 @@
+import os
+import time
+from butterfly.utils.parallel import imap_ordered, resolve_workers
+
+def _square_or_fail(x):
+    if x == 3:
+        raise ValueError("bad input")
+    if x == 5:
+        os._exit(1)  # simulate a native crash inside the worker
+    return x * x
+
+def _record_start(task):
+    index, directory = task
+    open(os.path.join(directory, str(index)), "w").close()
+    if index == 0:
+        time.sleep(1.5)
+    return index
+
+def test_imap_ordered_keeps_task_order():
+    results = list(imap_ordered(abs, [-3, -1, -2, 0], workers=2))
+    assert [r[1] for r in results] == [3, 1, 2, 0]
+
+def test_imap_ordered_isolates_errors_and_crashes():
+    results = list(imap_ordered(_square_or_fail, range(8), workers=2))
+    assert [task for task, _, _ in results] == list(range(8))
+    assert isinstance(results[3][2], ValueError)
+    assert isinstance(results[5][2], RuntimeError)
+    assert [r for t, r, e in results if e is None] == [0, 1, 4, 16, 36, 49]
+
+def test_resolve_workers_defaults_to_cpu_count():
+    assert resolve_workers(None) == (os.cpu_count() or 1)
+    assert resolve_workers(3) == 3
+
+def test_imap_ordered_bounds_results_buffered_behind_a_slow_task(tmp_path):
+    tasks = [(i, str(tmp_path)) for i in range(40)]
+    for task, result, error in imap_ordered(_record_start, tasks, workers=2, max_in_flight=3):
+        # Every started task is within the window of the one being yielded
+        assert len(os.listdir(tmp_path)) <= result + 3
+    assert len(os.listdir(tmp_path)) == 40
+
+def _split(task):
+    name, size = task
+    return min(size, 2), size
+
+def _rest(task, result):
+    name, size = task
+    _, total = result
+    return [(f"{name}+{start}", min(2, total - start)) for start in range(2, total, 2)] if "+" not in name else []
+
+def test_imap_ordered_runs_expanded_tasks_right_after_their_parent():
+    tasks = [("a", 5), ("b", 1), ("c", 4)]
+    results = list(imap_ordered(_split, tasks, workers=2, max_in_flight=1, expand=_rest))
+    assert [task for task, _, _ in results] == [("a", 5), ("a+2", 2), ("a+4", 1), ("b", 1), ("c", 4), ("c+2", 2)]
+    assert all(error is None for _, _, error in results)
@@ -0,0 +1,156 @@
+import os
+import shutil
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from butterfly.rag import pdf_rag
+from butterfly.rag.answer_cache import AnswerCache
+from butterfly.rag.embedding_cache import EmbeddingCache
+from butterfly.rag.pdf_rag import MANIFEST_FILENAME, PDFRAGSystem
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: list = []
+    queries: list = []
+
+    def embed_documents(self, texts):
+        CountingEmbeddings.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        CountingEmbeddings.queries.append(text)
+        return super().embed_query(text)
+
+    def stats(self):
+        return {"chunks": len(CountingEmbeddings.embedded)}
+
+class FakeLLM:
+    def __init__(self, **kwargs):
+        pass
+    def invoke(self, prompt):
+        return "pong"
+
+@pytest.fixture
+def rag(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_rag, "OllamaEmbeddingClient", lambda model, base_url, **kwargs: CountingEmbeddings(size=16))
+    monkeypatch.setattr(pdf_rag, "OllamaLLM", FakeLLM)
+    CountingEmbeddings.embedded = []
+    CountingEmbeddings.queries = []
+    return lambda **kwargs: PDFRAGSystem(index_dir=str(tmp_path / "index"), **kwargs)
+
+def test_restart_embeds_only_added_and_changed_files(rag, tmp_path, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for i in range(3):
+        make_invoice(raw / f"invoice_{i}.pdf", f"{i}0.00", number=i)
+    first = rag()
+    first.create_vector_store(str(raw))
+    assert len(CountingEmbeddings.embedded) == 3
+    assert os.path.exists(tmp_path / "index" / MANIFEST_FILENAME)
+
+    # Nothing changed: the persisted store is loaded and nothing is embedded
+    CountingEmbeddings.embedded = []
+    second = rag()
+    second.create_vector_store(str(raw))
+    assert CountingEmbeddings.embedded == []
+    assert set(second.indexed_chunks) == {"invoice_0.pdf", "invoice_1.pdf", "invoice_2.pdf"}
+    assert len(second.vector_store.index_to_docstore_id) == 3
+
+    make_invoice(raw / "invoice_1.pdf", "99.00", number=1)
+    make_invoice(raw / "invoice_3.pdf", "30.00", number=3)
+    os.remove(raw / "invoice_0.pdf")
+    third = rag()
+    third.create_vector_store(str(raw))
+    assert sorted(text.split()[2] for text in CountingEmbeddings.embedded) == ["1", "3"]
+    assert set(third.indexed_chunks) == {"invoice_1.pdf", "invoice_2.pdf", "invoice_3.pdf"}
+    sources = {doc.metadata["source"]: doc.page_content for doc in third.vector_store.docstore._dict.values()}
+    assert set(sources) == {"invoice_1.pdf", "invoice_2.pdf", "invoice_3.pdf"}
+    assert "99.00" in sources["invoice_1.pdf"]
+
+    # The synced store was saved again
+    CountingEmbeddings.embedded = []
+    rag().create_vector_store(str(raw))
+    assert CountingEmbeddings.embedded == []
+
+def test_store_that_does_not_match_its_manifest_is_rebuilt(rag, tmp_path, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    make_invoice(raw / "invoice_0.pdf", "10.00")
+    rag().create_vector_store(str(raw))
+    with open(tmp_path / "index" / "index.faiss", "wb") as f:
+        f.write(b"truncated")
+    CountingEmbeddings.embedded = []
+    rebuilt = rag()
+    rebuilt.create_vector_store(str(raw))
+    assert len(CountingEmbeddings.embedded) == 1
+    assert set(rebuilt.indexed_chunks) == {"invoice_0.pdf"}
+
+def test_rebuild_reuses_cached_chunk_embeddings(rag, tmp_path, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for i in range(2):
+        make_invoice(raw / f"invoice_{i}.pdf", "10.00", number=i)
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    rag(embedding_cache=cache).create_vector_store(str(raw))
+    assert len(CountingEmbeddings.embedded) == 2
+    shutil.rmtree(tmp_path / "index")
+    CountingEmbeddings.embedded = []
+    rebuilt = rag(embedding_cache=cache)
+    rebuilt.create_vector_store(str(raw))
+    assert CountingEmbeddings.embedded == []
+    assert rebuilt.embeddings.stats()["hit_rate"] == 1.0
+
+class CountingChain:
+    """Stands in for RetrievalQA; ask_question retrieves itself and only runs the combine step."""
+    def __init__(self, vector_store, output_text="$10.00"):
+        self.queries = []
+        self.output_text = output_text
+        self.combine_documents_chain = self
+
+    def invoke(self, inputs):
+        self.queries.append(inputs["question"])
+        return {"output_text": self.output_text}
+
+def test_answers_are_cached_until_the_index_changes(rag, tmp_path, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    make_invoice(raw / "invoice_0.pdf", "10.00")
+    system = rag(answer_cache=AnswerCache())
+    system.create_vector_store(str(raw))
+    system.qa_chain = CountingChain(system.vector_store)
+    assert system.ask_question("What's the total?") == {"answer": "$10.00",
+                                                        "sources": ["invoice_0.pdf (Page 1, Chunk 1)"]}
+    # The vector the cache lookup computed is the one retrieval uses
+    assert CountingEmbeddings.queries == ["What's the total?"]
+    assert system.ask_question("what's the total")["cached"] == "exact"
+    assert system.qa_chain.queries == ["What's the total?"]
+    make_invoice(raw / "invoice_1.pdf", "20.00")
+    system.index_pdf(str(raw / "invoice_1.pdf"))
+    assert "cached" not in system.ask_question("What's the total?")
+    assert len(system.qa_chain.queries) == 2
+
+def test_retrieval_holds_the_index_lock(rag, tmp_path, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    make_invoice(raw / "invoice_0.pdf", "10.00")
+    system = rag()
+    system.create_vector_store(str(raw))
+    system.qa_chain = CountingChain(system.vector_store)
+    search = system.vector_store.similarity_search_by_vector
+    locked = []
+    def guarded_search(vector, k):
+        locked.append(system._index_lock.locked())
+        return search(vector, k=k)
+    system.vector_store.similarity_search_by_vector = guarded_search
+    assert system.ask_question("What's the total?")["sources"] == ["invoice_0.pdf (Page 1, Chunk 1)"]
+    # Concurrent ingestion (index_pdf / remove_pdf) cannot change the store mid-search
+    assert locked == [True]
+
+def test_empty_model_output_gets_the_fallback_and_is_not_cached(rag, tmp_path, make_invoice):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    make_invoice(raw / "invoice_0.pdf", "10.00")
+    system = rag(answer_cache=AnswerCache())
+    system.create_vector_store(str(raw))
+    system.qa_chain = CountingChain(system.vector_store, output_text=None)
+    assert system.ask_question("What's the total?")["answer"] == pdf_rag.NO_ANSWER
+    assert "cached" not in system.ask_question("What's the total?")
+    assert system.answer_cache.stats()["entries"] == 0
@@ -0,0 +1,61 @@
+import fitz
+import numpy as np
+import pytest
+from butterfly.core.pipeline import STAGES, OCRPipeline
+from butterfly.core.preprocess import binarize
+from butterfly.core.render import render_gray
+from butterfly.ocr.engine import OCREngine
+
+class RecordingEngine(OCREngine):
+    name = "recording"
+
+    def __init__(self):
+        super().__init__(workers=2)
+        self.images = []
+
+    def _recognize(self, image, output, config, dpi):
+        self.images.append(np.array(image))
+        return f"{image.shape[1]}x{image.shape[0]}@{dpi}", 95.0
+
+def write_pdf(path, pages=3):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page(width=300, height=200 + 20 * i).insert_text((20, 50), f"Invoice # {4820 + i}", fontsize=14)
+    doc.save(str(path))
+    return str(path)
+
+@pytest.fixture(scope="module")
+def pipeline():
+    with OCRPipeline(render_workers=2, preprocess_workers=1, engine=RecordingEngine()) as pipeline:
+        yield pipeline
+
+def test_pages_come_back_in_order_from_shared_memory(tmp_path, pipeline):
+    pdf = write_pdf(tmp_path / "invoice.pdf")
+    tasks = [(pdf, page_num, None) for page_num in range(3)] + [(pdf, 0, (0, 0, 150, 100))]
+    results = list(pipeline.run(tasks, max_dpi=100, min_dpi=None))
+    assert [task for task, _, _ in results] == tasks
+    assert [result["text"] for _, result, _ in results] == ["417x278@100", "417x306@100", "417x334@100",
+                                                              "209x139@100"]
+    assert all(error is None and result["render_ms"] >= 0 for _, result, error in results)
+    # The engine was handed the binarization done by the preprocessing process
+    with fitz.open(pdf) as doc:
+        expected = binarize(render_gray(doc[1], 100))
+    assert any(image.shape == expected.shape and np.array_equal(image, expected)
+               for image in pipeline.engine.images)
+
+def test_failed_pages_do_not_stop_the_run(tmp_path, pipeline):
+    pdf = write_pdf(tmp_path / "invoice.pdf", pages=1)
+    results = list(pipeline.run([(str(tmp_path / "missing.pdf"), 0, None), (pdf, 0, None)], max_dpi=100))
+    assert results[0][1] is None and "missing.pdf" in str(results[0][2])
+    assert results[1][1]["text"] == "417x278@100"
+    report = pipeline.report()
+    assert set(report) == set(STAGES)
+    assert report["ocr"]["workers"] == 2 and report["ocr"]["items"] >= 1
+    assert all(0 <= stage["utilization"] <= 1 for stage in report.values())
+
+def test_an_abandoned_run_does_not_leak_into_the_next(tmp_path, pipeline):
+    pdf = write_pdf(tmp_path / "invoice.pdf")
+    for _ in pipeline.run([(pdf, page_num, None) for page_num in range(3)], max_dpi=100):
+        break
+    results = list(pipeline.run([(pdf, 2, None)], max_dpi=100))
+    assert [result["text"] for _, result, _ in results] == ["417x334@100"]
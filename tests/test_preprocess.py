@@ -0,0 +1,65 @@
+import numpy as np
+from butterfly.core.preprocess import TIER_DENOISE, TIER_DENOISE_REGIONS, TIER_OTSU, ocr_data, ocr_text
+from butterfly.ocr.engine import OCREngine, TSV_COLUMNS
+
+class ScriptedEngine(OCREngine):
+    """Returns canned results in call order and records the image shapes it was given."""
+    name = "scripted"
+
+    def __init__(self, responses):
+        super().__init__(workers=1)
+        self.responses = list(responses)
+        self.shapes = []
+
+    def _recognize(self, image, output, config, dpi):
+        self.shapes.append(image.shape)
+        return self.responses.pop(0)
+
+def words(*rows):
+    """Build image_to_data output from (line_num, top, conf, text) word rows."""
+    data = {column: [] for column in TSV_COLUMNS}
+    for line_num, top, conf, text in rows:
+        for column, value in zip(TSV_COLUMNS, (5, 1, 1, 1, line_num, 1, 10, top, 40, 20, conf, text)):
+            data[column].append(value)
+    return data
+
+def page():
+    image = np.full((400, 300), 255, dtype=np.uint8)
+    image[20:60, 10:200] = 0
+    return image
+
+def test_confident_text_is_not_denoised():
+    with ScriptedEngine([("Invoice", 92.0)]) as engine:
+        result = ocr_text(engine, page())
+    assert (result["text"], result["tier"], result["improved"]) == ("Invoice", TIER_OTSU, False)
+
+def test_low_confidence_text_escalates_and_keeps_the_better_result():
+    with ScriptedEngine([("lnv0ice", 41.0), ("Invoice", 88.0)]) as engine:
+        result = ocr_text(engine, page())
+    assert (result["text"], result["tier"], result["confidence"], result["improved"]) == \
+        ("Invoice", TIER_DENOISE, 88.0, True)
+
+def test_blank_page_without_words_is_not_escalated():
+    with ScriptedEngine([("", None)]) as engine:
+        result = ocr_text(engine, np.full((100, 100), 255, dtype=np.uint8))
+    assert result["tier"] == TIER_OTSU
+
+def test_only_low_confidence_lines_are_denoised():
+    first = words((1, 20, 95, "Invoice"), (2, 100, 30, "T0ta1"), (3, 300, 90, "Thanks"))
+    band = words((1, 8, 93, "Total"))  # relative to the cropped band
+    with ScriptedEngine([first, band]) as engine:
+        result = ocr_data(engine, page())
+        crop_shape = engine.shapes[1]
+    assert result["tier"] == TIER_DENOISE_REGIONS and result["regions"] == 1
+    assert result["data"]["text"] == ["Invoice", "Total", "Thanks"]
+    assert result["data"]["top"][1] == 92 + 8
+    assert crop_shape == (20 + 2 * 8, 300)
+
+def test_low_confidence_rerenders_at_full_resolution_before_denoising():
+    sharp = np.full((800, 600), 255, dtype=np.uint8)
+    sharp[40:120, 20:400] = 0
+    with ScriptedEngine([("lnv0ice", 52.0), ("Invoice", 93.0)]) as engine:
+        result = ocr_text(engine, page(), dpi=150, rerender=lambda: (sharp, 300))
+        shapes = engine.shapes
+    assert (result["text"], result["dpi"], result["rerendered"], result["tier"]) == ("Invoice", 300, True, TIER_OTSU)
+    assert shapes == [(400, 300), (800, 600)]
@@ -0,0 +1,82 @@
+import mongomock
+import pytest
+from butterfly.rag.query_router import InvoiceTable, QueryRouter
+
+INVOICES = [
+    {"source": "invoice_Aaron_Hawkins_36001.pdf", "page": 1, "invoice_number": "36001",
+     "customer_name": "Aaron Hawkins", "date": "2012-03-11", "amount": 86.25, "kind": "header"},
+    {"source": "invoice_Aaron_Bergman_36002.pdf", "page": 1, "invoice_number": "36002",
+     "customer_name": "Aaron Bergman", "date": "2012-03-12", "amount": 40.0, "kind": "header"},
+    {"source": "invoice_Aaron_Hawkins_36003.pdf", "page": 1, "invoice_number": "36003",
+     "customer_name": "Aaron Hawkins", "date": "2013-01-05", "amount": 120.5, "kind": "header"},
+    {"source": "invoice_Aaron_Hawkins_36003.pdf", "page": 1, "invoice_number": "36003",
+     "customer_name": "Aaron Hawkins", "date": "2013-01-05", "amount": 120.5, "kind": "items"},
+]
+
+class FakeRAG:
+    def __init__(self, metadatas):
+        self.metadatas = metadatas
+        self.index_version = 1
+        self.questions = []
+
+    def chunk_metadata(self):
+        return self.index_version, self.metadatas
+
+    def ask_question(self, question):
+        self.questions.append(question)
+        return {"answer": "from the LLM", "sources": []}
+
+@pytest.fixture
+def router():
+    return QueryRouter(FakeRAG(list(INVOICES)))
+
+def test_pdf_extractor_questions_are_answered_from_the_table(router):
+    total = router.ask_question("What's the total amount across all invoices?")
+    assert total["route"] == "structured"
+    assert "$246.75" in total["answer"] and len(total["sources"]) == 3
+
+    found = router.ask_question("Find all invoices for Aaron Hawkins")
+    assert found["answer"].startswith("Found 2 invoices for Aaron Hawkins")
+    assert found["sources"] == ["invoice_Aaron_Hawkins_36001.pdf (Page 1)", "invoice_Aaron_Hawkins_36003.pdf (Page 1)"]
+
+    compared = router.ask_question("Compare the invoice amounts between Aaron Hawkins and Aaron Bergman")
+    assert "Aaron Hawkins: 2 invoices, total $206.75" in compared["answer"]
+    assert "Aaron Bergman: 1 invoices, total $40.00" in compared["answer"]
+    assert "higher total, by $166.75" in compared["answer"]
+    assert router.rag_system.questions == []
+
+@pytest.mark.parametrize("question, expected", [
+    ("How many invoices are over $50?", "There are 2 invoices over $50.00."),
+    ("How many invoices in 2012?", "There are 2 invoices dated in 2012."),
+    ("What is the average amount of invoices before 2013-01-01?", "$63.12"),
+    ("Which invoice has the highest amount?", "invoice #36003 for Aaron Hawkins (2013-01-05) at $120.50"),
+    ("Show invoice #36002", "Found 1 invoices numbered #36002"),
+])
+def test_filters_and_aggregates(router, question, expected):
+    assert expected in router.answer_structured(question)["answer"]
+
+def test_open_ended_questions_fall_back_to_rag(router):
+    for question in ("What items did Aaron Hawkins buy?", "What is the shipping address on invoice 36001?",
+                     "Hello, who are you?", "Find all invoices for Bob Ray"):
+        assert router.ask_question(question)["route"] == "rag"
+    assert len(router.rag_system.questions) == 4
+
+def test_table_is_rebuilt_when_the_index_changes(router):
+    assert "2 invoices" in router.answer_structured("How many invoices for Aaron Hawkins?")["answer"]
+    router.rag_system.metadatas.append(dict(INVOICES[0], source="invoice_Aaron_Hawkins_36009.pdf",
+                                            invoice_number="36009"))
+    assert "2 invoices" in router.answer_structured("How many invoices for Aaron Hawkins?")["answer"]
+    router.rag_system.index_version += 1
+    assert "3 invoices" in router.answer_structured("How many invoices for Aaron Hawkins?")["answer"]
+
+def test_table_from_mongo_aggregation():
+    collection = mongomock.MongoClient().db.invoices
+    collection.insert_many([{"filename": row["source"], "content_hash": "h",
+                             "pages": [{"page_number": 1, "content": "...",
+                                        "metadata": {key: row[key] for key in
+                                                     ("invoice_number", "customer_name", "date", "amount")}}]}
+                            for row in INVOICES[:3]])
+    table = InvoiceTable.from_mongo(collection)
+    assert len(table) == 3 and table.amounts.sum() == 246.75
+    router = QueryRouter(FakeRAG([]), invoices=collection)
+    assert "$206.75" in router.answer_structured("Total amount for Aaron Hawkins?")["answer"]
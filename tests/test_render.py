@@ -0,0 +1,55 @@
+import threading
+import fitz
+import pytest
+from butterfly.core.render import iter_page_images
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    doc = fitz.open()
+    for i in range(5):
+        doc.new_page(width=200, height=100).insert_text((20, 50), f"Page {i + 1}")
+    path = tmp_path / "pages.pdf"
+    doc.save(str(path))
+    return str(path)
+
+def test_iter_page_images_is_lazy_and_matches_prefetch(pdf_path):
+    pages = iter_page_images(pdf_path, dpi=72)
+    page_num, img = next(pages)
+    assert page_num == 0 and img.size == (200, 100)
+    plain = [(n, img.tobytes()) for n, img in iter_page_images(pdf_path, dpi=72)]
+    prefetched = [(n, img.tobytes()) for n, img in iter_page_images(pdf_path, dpi=72, prefetch=2)]
+    assert [n for n, _ in plain] == list(range(5))
+    assert plain == prefetched
+    assert [n for n, _ in iter_page_images(pdf_path, dpi=72, pages=[3, 1])] == [3, 1]
+
+def test_closing_early_stops_the_prefetch_thread(pdf_path):
+    pages = iter_page_images(pdf_path, dpi=72, prefetch=1)
+    next(pages)
+    pages.close()
+    assert not any(t.name == "page-prefetch" for t in threading.enumerate())
+
+def test_render_errors_reach_the_caller(tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    with pytest.raises(Exception):
+        list(iter_page_images(str(broken), prefetch=1))
+
+def test_render_gray_is_a_view_that_outlives_the_pixmap(pdf_path):
+    import gc
+    import numpy as np
+    from butterfly.core.render import render_gray, render_page
+    with fitz.open(pdf_path) as doc:
+        gray = render_gray(doc[0], dpi=144)
+        reference = np.asarray(render_page(doc[0], dpi=144).convert("L"))
+        clipped = render_gray(doc[0], dpi=72, clip=fitz.Rect(0, 0, 100, 50))
+    gc.collect()
+    assert gray.shape == (200, 400) and gray.dtype == np.uint8
+    assert not gray.flags.owndata and gray.flags.c_contiguous
+    assert np.abs(gray.astype(int) - reference).max() <= 2
+    assert clipped.shape == (50, 100)
+
+def test_iter_gray_pages_yields_arrays(pdf_path):
+    from butterfly.core.render import iter_gray_pages
+    pages = list(iter_gray_pages(pdf_path, dpi=72, prefetch=2))
+    assert [n for n, _ in pages] == list(range(5))
+    assert all(img.shape == (100, 200) for _, img in pages)
@@ -0,0 +1,63 @@
+import os
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+from butterfly.core import render_cache
+from butterfly.core.render_cache import RenderCache
+
+def write_pdf(path, pages=2, text="Invoice # 4820"):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page(width=300, height=200).insert_text((20, 50), f"{text} page {i + 1}", fontsize=14)
+    doc.save(str(path))
+    return str(path)
+
+def test_repeat_renders_are_served_without_mupdf(tmp_path, monkeypatch):
+    pdf = write_pdf(tmp_path / "invoice.pdf")
+    cache = RenderCache(str(tmp_path / "images"))
+    pages = cache.render_pdf(pdf, dpi=100)
+    assert [dpi for _, dpi in pages] == [100, 100]
+    assert Image.open(pages[0][0]).size == (417, 278)
+
+    def no_mupdf(*args, **kwargs):
+        raise AssertionError("MuPDF was used for a cached render")
+    monkeypatch.setattr(render_cache.fitz, "open", no_mupdf)
+    assert cache.render_pdf(pdf, dpi=100) == pages
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_key_tracks_content_settings_and_format(tmp_path):
+    pdf = write_pdf(tmp_path / "invoice.pdf")
+    cache = RenderCache(str(tmp_path / "images"))
+    first = cache.render_pdf(pdf, dpi=100)
+    assert cache.render_pdf(pdf, dpi=150) != first
+    write_pdf(tmp_path / "invoice.pdf", text="Invoice # 4821")
+    assert cache.render_pdf(pdf, dpi=100) != first
+    gray = RenderCache(str(tmp_path / "images"), image_format="gray").render_pdf(pdf, dpi=100)
+    array = np.load(gray[0][0], mmap_mode="r")
+    assert array.shape == (278, 417) and array.dtype == np.uint8
+
+def test_least_recently_used_documents_are_evicted(tmp_path):
+    directory = tmp_path / "images"
+    directory.mkdir()
+    (directory / "invoice_page_1.jpeg").write_bytes(b"not managed by the cache")
+    cache = RenderCache(str(directory), image_format="png")
+    pdfs = [write_pdf(tmp_path / f"invoice_{i}.pdf", pages=1, text=f"Invoice {i}") for i in range(3)]
+    sizes = []
+    for pdf in pdfs[:2]:
+        cache.render_pdf(pdf, dpi=100)
+        sizes.append(cache.stats()["bytes"])
+    # Room for about two documents; the first one is used again, so the second goes
+    cache.max_bytes = int(sizes[-1] * 1.4)
+    for path in os.listdir(directory):
+        os.utime(directory / path, (1, 1))
+    first = cache.render_pdf(pdfs[0], dpi=100)
+    cache.render_pdf(pdfs[2], dpi=100)
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert all(os.path.exists(path) for path, _ in first)
+    assert not any(name.startswith("invoice_1") for name in os.listdir(directory))
+    assert (directory / "invoice_page_1.jpeg").exists()
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        RenderCache(str(tmp_path), image_format="tiff")
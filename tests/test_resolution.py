@@ -0,0 +1,37 @@
+import io
+import fitz
+import numpy as np
+from PIL import Image
+from butterfly.core.resolution import choose_dpi, embedded_image_dpi, glyph_height
+
+def text_page(fontsize):
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 60
+    while y < 760:
+        page.insert_text((40, y), "Staples Binder 12 $10.50 Invoice Total", fontsize=fontsize)
+        y += fontsize * 1.6
+    return doc, page
+
+def test_large_print_is_rendered_at_the_minimum_dpi():
+    doc, page = text_page(24)
+    assert glyph_height(page) > 10
+    assert choose_dpi(page, min_dpi=150, max_dpi=300) == 150
+
+def test_small_print_keeps_full_resolution():
+    doc, page = text_page(7)
+    assert choose_dpi(page, min_dpi=150, max_dpi=300) == 300
+    assert choose_dpi(page, min_dpi=None, max_dpi=300) == 300
+
+def test_blank_page_falls_back_to_max_dpi():
+    doc = fitz.open()
+    assert choose_dpi(doc.new_page(), min_dpi=150, max_dpi=250) == 250
+
+def test_scan_resolution_bounds_the_render_dpi():
+    doc, page = text_page(7)
+    buf = io.BytesIO()
+    Image.fromarray(np.full((1556, 1100), 128, dtype=np.uint8)).save(buf, format="PNG")
+    # 1100 px across the full 595 pt (A4) page width is about 133 DPI
+    page.insert_image(page.rect, stream=buf.getvalue(), overlay=False)
+    assert round(embedded_image_dpi(page)) == 133
+    assert choose_dpi(page, min_dpi=100, max_dpi=300) == 150
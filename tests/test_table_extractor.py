@@ -0,0 +1,57 @@
+import fitz
+from butterfly.core.table_extractor import extract_table_items, words_from_ocr_results
+
+def right_aligned(page, x, y, text):
+    page.insert_text((x - fitz.get_text_length(text, fontsize=9), y), text, fontsize=9)
+
+def make_table_page(rows):
+    page = fitz.open().new_page()
+    page.insert_text((40, 60), "Item", fontsize=9)
+    for x, header in [(400, "Quantity"), (480, "Rate"), (560, "Amount")]:
+        right_aligned(page, x, 60, header)
+    y = 60
+    for row in rows:
+        y += 12
+        if isinstance(row, str):
+            page.insert_text((40, y), row, fontsize=9)
+            continue
+        name, quantity, rate, amount = row
+        page.insert_text((40, y), name, fontsize=9)
+        for x, value in [(400, quantity), (480, rate), (560, amount)]:
+            right_aligned(page, x, y, value)
+    page.insert_text((40, y + 12), "Subtotal: $9,000.00", fontsize=9)
+    return page
+
+def test_aligned_columns_with_wrapped_names():
+    page = make_table_page([
+        ("Avery Durable Binder 3", "2", "$4.45", "$8.90"),
+        "with extended warranty",
+        ("Global Leather Chair", "1", "$1,250.00", "$1,250.00"),
+    ])
+    assert extract_table_items(page.get_text("words")) == [
+        {"item": "Avery Durable Binder 3 with extended warranty", "quantity": 2.0, "unit_price": 4.45, "amount": 8.9},
+        {"item": "Global Leather Chair", "quantity": 1.0, "unit_price": 1250.0, "amount": 1250.0},
+    ]
+
+def test_reflowed_rows_fall_back_to_last_three_words():
+    page = fitz.open().new_page()
+    for i, line in enumerate(["Item Quantity Rate Amount", "Staples Round Ring Binders 2 $4.45 $8.90",
+                              "Pens 10 $1.00 $10.00", "Total: $18.90"]):
+        page.insert_text((72, 72 + 14 * i), line)
+    words = page.get_text("words")
+    assert extract_table_items(words) == [
+        {"item": "Staples Round Ring Binders", "quantity": 2.0, "unit_price": 4.45, "amount": 8.9},
+        {"item": "Pens", "quantity": 10.0, "unit_price": 1.0, "amount": 10.0},
+    ]
+
+def test_ocr_word_boxes_and_missing_header():
+    results = [
+        {"text": text, "bbox": {"x": x, "y": y, "width": 40, "height": 20}, "confidence": 0.9}
+        for text, x, y in [("Item", 0, 0), ("Quantity", 200, 0), ("Rate", 260, 0), ("Amount", 320, 0),
+                           ("Desk", 0, 30), ("Lamp", 45, 30), ("3", 200, 30), ("$5.00", 260, 30), ("$15.00", 320, 30),
+                           ("Total:", 0, 60), ("$15.00", 320, 60)]
+    ]
+    assert extract_table_items(words_from_ocr_results(results)) == [
+        {"item": "Desk Lamp", "quantity": 3.0, "unit_price": 5.0, "amount": 15.0}
+    ]
+    assert extract_table_items(words_from_ocr_results(results[4:])) is None